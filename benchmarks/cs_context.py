@@ -0,0 +1,284 @@
+"""Command contexts and requests CloudShell passes to the driver.
+
+CloudShell itself is not a part of the benchmark, its API is replaced with
+FakeCloudShellAPI that decrypts nothing and ignores the updates.
+"""
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import patch
+
+from cloudshell.shell.core.driver_context import (
+    AppContext,
+    ConnectivityContext,
+    ReservationContextDetails,
+    ResourceCommandContext,
+    ResourceContextDetails,
+    ResourceRemoteCommandContext,
+)
+from cloudshell.shell.core.session.cloudshell_session import CloudShellSessionContext
+from vcsim import PASSWORD, USER, Inventory
+
+from cloudshell.cp.vcenter.constants import SHELL_NAME, VM_FROM_VM_DEPLOYMENT_PATH
+
+RESOURCE_NAME = "vCenter"
+RESERVATION_ID = "00000000-0000-0000-0000-000000000001"
+APP_MODEL = "Generic App Model"
+APP_FAMILY = "Generic App Family"
+
+
+class FakeCloudShellAPI:
+    """CloudShell API that returns passwords as is and ignores other calls."""
+
+    def DecryptPassword(self, value: str) -> SimpleNamespace:  # noqa: N802
+        return SimpleNamespace(Value=value)
+
+    def __getattr__(self, name: str) -> Any:
+        return lambda *args, **kwargs: None
+
+
+def patch_cloudshell_api():
+    """Make the driver use the fake CloudShell API."""
+    return patch.object(
+        CloudShellSessionContext, "get_api", lambda self: FakeCloudShellAPI()
+    )
+
+
+def _get_resource_attributes(inventory: Inventory) -> dict[str, str]:
+    attrs = {
+        "User": USER,
+        "Password": PASSWORD,
+        "Default Datacenter": inventory.datacenter,
+        "Default dvSwitch": inventory.dv_switch,
+        "Holding Network": inventory.holding_network,
+        "VM Cluster": inventory.cluster,
+        "VM Resource Pool": "",
+        "VM Storage": inventory.datastore,
+        "Saved Sandbox Storage": "",
+        "Behavior during save": "Power Off",
+        "VM Location": "",
+        "Shutdown Method": "hard",
+        "OVF Tool Path": "",
+        "Reserved Networks": "",
+        "Execution Server Selector": "",
+        "Promiscuous Mode": "False",
+        "Forged Transmits": "False",
+        "MAC Address Changes": "False",
+        "Enable Tags": "False",
+    }
+    return {f"{SHELL_NAME}.{k}": v for k, v in attrs.items()}
+
+
+def _get_connectivity() -> ConnectivityContext:
+    return ConnectivityContext(
+        server_address="localhost",
+        cloudshell_api_port="8029",
+        quali_api_port="9000",
+        admin_auth_token="benchmark",
+        cloudshell_version="2023.2",
+        cloudshell_api_scheme="http",
+    )
+
+
+def _get_resource(
+    inventory: Inventory, address: str, app_context: AppContext | None = None
+) -> ResourceContextDetails:
+    return ResourceContextDetails(
+        id=RESOURCE_NAME,
+        name=RESOURCE_NAME,
+        fullname=RESOURCE_NAME,
+        type="Resource",
+        address=address,
+        model=SHELL_NAME,
+        family="Cloud Provider",
+        description="",
+        attributes=_get_resource_attributes(inventory),
+        app_context=app_context or AppContext("", ""),
+        networks_info=None,
+        shell_standard="cloudshell_cloud_provider_standard",
+        shell_standard_version="1.1.0",
+    )
+
+
+def _get_reservation() -> ReservationContextDetails:
+    return ReservationContextDetails(
+        environment_name="Benchmark",
+        environment_path="Benchmark",
+        domain="Global",
+        description="",
+        owner_user="admin",
+        owner_email="",
+        reservation_id=RESERVATION_ID,
+        saved_sandbox_name="",
+        saved_sandbox_id="",
+        running_user="admin",
+        cloud_info_access_key="",
+    )
+
+
+def get_resource_context(inventory: Inventory, address: str) -> ResourceCommandContext:
+    return ResourceCommandContext(
+        connectivity=_get_connectivity(),
+        resource=_get_resource(inventory, address),
+        reservation=_get_reservation(),
+        connectors=[],
+    )
+
+
+def get_remote_context(
+    inventory: Inventory, address: str, app_name: str, vm_uuid: str
+) -> ResourceRemoteCommandContext:
+    """Context of the command that runs on the deployed App."""
+    app_context = AppContext(
+        app_request_json=json.dumps(get_app_request_data()),
+        deployed_app_json=json.dumps(get_deployed_app_data(app_name, vm_uuid)),
+    )
+    endpoint = ResourceContextDetails(
+        id=app_name,
+        name=app_name,
+        fullname=app_name,
+        type="Resource",
+        address="",
+        model=APP_MODEL,
+        family=APP_FAMILY,
+        description="",
+        attributes={},
+        app_context=app_context,
+        networks_info=None,
+        shell_standard="",
+        shell_standard_version="",
+    )
+    return ResourceRemoteCommandContext(
+        connectivity=_get_connectivity(),
+        resource=_get_resource(inventory, address),
+        remote_reservation=_get_reservation(),
+        remote_endpoints=[endpoint],
+    )
+
+
+def _get_app_attributes(refresh_ip_timeout: int = 30) -> dict[str, str]:
+    attrs = {
+        "VM Cluster": "",
+        "VM Storage": "",
+        "VM Resource Pool": "",
+        "VM Location": "",
+        "Behavior during save": "",
+        "Auto Power On": "False",
+        "Auto Power Off": "True",
+        "Wait for IP": "False",
+        "Auto Delete": "True",
+        "Autoload": "False",
+        "IP Regex": "",
+        "Refresh IP Timeout": str(refresh_ip_timeout),
+        "Customization Spec": "",
+        "Hostname": "",
+        "Private IP": "",
+        "CPU": "",
+        "RAM": "",
+        "HDD": "",
+        "Autogenerated Name": "False",
+        "Copy source UUID": "False",
+    }
+    return {f"{VM_FROM_VM_DEPLOYMENT_PATH}.{k}": v for k, v in attrs.items()}
+
+
+def get_app_request_data(refresh_ip_timeout: int = 30) -> dict:
+    attrs = _get_app_attributes(refresh_ip_timeout)
+    return {
+        "deploymentService": {
+            "model": VM_FROM_VM_DEPLOYMENT_PATH,
+            "attributes": [{"name": k, "value": v} for k, v in attrs.items()],
+        }
+    }
+
+
+def get_deployed_app_data(app_name: str, vm_uuid: str) -> dict:
+    return {
+        "name": app_name,
+        "family": APP_FAMILY,
+        "model": APP_MODEL,
+        "address": "",
+        "attributes": [
+            {"name": f"{APP_MODEL}.{name}", "value": ""}
+            for name in ("User", "Password", "Public IP")
+        ],
+        "vmdetails": {
+            "id": vm_uuid,
+            "cloudProviderId": RESOURCE_NAME,
+            "uid": vm_uuid,
+            "vmCustomParams": [],
+        },
+    }
+
+
+def get_deploy_request(app_name: str, source_vm: str) -> str:
+    attrs = _get_app_attributes()
+    attrs[f"{VM_FROM_VM_DEPLOYMENT_PATH}.vCenter VM"] = source_vm
+    action = {
+        "type": "deployApp",
+        "actionId": app_name,
+        "actionParams": {
+            "type": "deployAppParams",
+            "appName": app_name,
+            "deployment": {
+                "type": "deployAppDeploymentInfo",
+                "deploymentPath": VM_FROM_VM_DEPLOYMENT_PATH,
+                "attributes": [
+                    {"type": "attribute", "attributeName": k, "attributeValue": v}
+                    for k, v in attrs.items()
+                ],
+            },
+            "appResource": {"type": "appResourceInfo", "attributes": []},
+        },
+    }
+    return json.dumps({"driverRequest": {"actions": [action]}})
+
+
+def get_vm_details_request(apps: dict[str, str]) -> str:
+    """Request of VM details of the Apps.
+
+    :param apps: VM UUIDs by App names
+    """
+    items = [
+        {
+            "appRequestJson": get_app_request_data(),
+            "deployedAppJson": get_deployed_app_data(name, vm_uuid),
+        }
+        for name, vm_uuid in apps.items()
+    ]
+    return json.dumps({"items": items})
+
+
+def get_connectivity_request(
+    app_name: str, vm_uuid: str, vlan_id: int, vnic: str = ""
+) -> str:
+    vlan_attrs = {
+        "QnQ": "False",
+        "CTag": "",
+        "VLAN ID": str(vlan_id),
+        "Isolation Level": "Exclusive",
+        "Virtual Network": "",
+        "Existing Network": "",
+    }
+    action = {
+        "type": "setVlan",
+        "actionId": f"{app_name}-{vlan_id}",
+        "connectionId": f"{app_name}-{vlan_id}",
+        "connectionParams": {
+            "type": "setVlanParameter",
+            "vlanId": str(vlan_id),
+            "mode": "Access",
+            "vlanServiceAttributes": [
+                {"attributeName": k, "attributeValue": v} for k, v in vlan_attrs.items()
+            ],
+        },
+        "connectorAttributes": [],
+        "actionTarget": {"fullName": app_name, "fullAddress": app_name},
+        "customActionAttributes": [
+            {"attributeName": "VM_UUID", "attributeValue": vm_uuid},
+            {"attributeName": "Vnic Name", "attributeValue": vnic},
+        ],
+    }
+    return json.dumps({"driverRequest": {"actions": [action]}})
@@ -0,0 +1,268 @@
+"""Benchmark of the driver commands against the vCenter simulator.
+
+Runs the driver commands at several concurrency levels and reports throughput,
+p50/p95 latency and vCenter round trips per command. Results can be saved and
+compared with the results of the previous release:
+
+    python benchmarks/run.py --output current.json --baseline previous.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from threading import Lock
+from typing import Any
+from unittest.mock import patch
+
+from attrs import define, field
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import cs_context  # noqa: E402
+from scenarios import SCENARIOS, Environment, Operation  # noqa: E402
+from vcsim import Inventory, Latency, VcSim  # noqa: E402
+
+from driver import VMwarevCenterCloudProviderShell2GDriver  # noqa: E402
+
+from cloudshell.cp.vcenter.handlers import si_handler  # noqa: E402
+from cloudshell.cp.vcenter.utils.client_helpers import get_si  # noqa: E402
+
+logger = logging.getLogger("benchmark")
+
+METRICS_PREFIX = "Command metrics: "
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Percentile with the linear interpolation between the closest values."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    pos = (len(values) - 1) * pct / 100
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+@define
+class Result:
+    command: str
+    concurrency: int
+    wall_time: float = 0.0
+    latencies: list[float] = field(factory=list)
+    errors: list[str] = field(factory=list)
+    round_trips: list[int] = field(factory=list)
+
+    @property
+    def throughput(self) -> float:
+        return len(self.latencies) / self.wall_time if self.wall_time else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "command": self.command,
+            "concurrency": self.concurrency,
+            "operations": len(self.latencies) + len(self.errors),
+            "errors": len(self.errors),
+            "throughput": round(self.throughput, 3),
+            "p50": round(percentile(self.latencies, 50), 4),
+            "p95": round(percentile(self.latencies, 95), 4),
+            "round_trips": (
+                round(statistics.mean(self.round_trips), 1) if self.round_trips else 0
+            ),
+        }
+
+
+class _MetricsCollector(logging.Handler):
+    """Collects round trips the driver logs at the end of every command."""
+
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self._lock = Lock()
+        self.round_trips: list[int] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        message = record.getMessage()
+        if message.startswith(METRICS_PREFIX):
+            data = json.loads(message[len(METRICS_PREFIX) :])
+            with self._lock:
+                self.round_trips.append(data["round_trips"])
+
+    def pop(self) -> list[int]:
+        with self._lock:
+            round_trips, self.round_trips = self.round_trips, []
+        return round_trips
+
+
+def _run_operation(operation: Operation, result: Result, lock: Lock) -> None:
+    start = time.perf_counter()
+    try:
+        operation()
+    except Exception as e:
+        logger.debug("Operation failed", exc_info=True)
+        with lock:
+            result.errors.append(f"{type(e).__name__}: {e}")
+    else:
+        with lock:
+            result.latencies.append(time.perf_counter() - start)
+
+
+def _patch_port(port: int):
+    """The driver always connects to the port 443."""
+    return patch.object(si_handler, "get_si", partial(get_si, port=port))
+
+
+def run_level(
+    env: Environment,
+    command: str,
+    concurrency: int,
+    iterations: int,
+    collector: _MetricsCollector,
+) -> Result:
+    prepare = SCENARIOS[command]
+    operations = [prepare(env, i) for i in range(iterations)]
+    result = Result(command, concurrency)
+    lock = Lock()
+    collector.pop()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(
+            executor.map(partial(_run_operation, result=result, lock=lock), operations)
+        )
+    result.wall_time = time.perf_counter() - start
+    result.round_trips = collector.pop()
+    return result
+
+
+def compare(
+    results: list[dict[str, Any]], baseline: list[dict[str, Any]], threshold: float
+) -> list[str]:
+    """Commands whose p95 latency grew by more than threshold since the baseline."""
+    previous = {(r["command"], r["concurrency"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        prev = previous.get((r["command"], r["concurrency"]))
+        if prev and prev["p95"] and r["p95"] > prev["p95"] * (1 + threshold):
+            regressions.append(
+                f"{r['command']} x{r['concurrency']}: "
+                f"p95 {prev['p95']:.3f}s -> {r['p95']:.3f}s"
+            )
+    return regressions
+
+
+def format_table(results: list[dict[str, Any]]) -> str:
+    header = ("command", "conc", "ops", "errors", "ops/s", "p50 s", "p95 s", "calls")
+    rows = [header] + [
+        (
+            r["command"],
+            str(r["concurrency"]),
+            str(r["operations"]),
+            str(r["errors"]),
+            f"{r['throughput']:.2f}",
+            f"{r['p50']:.3f}",
+            f"{r['p95']:.3f}",
+            str(r["round_trips"]),
+        )
+        for r in results
+    ]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--commands",
+        default=",".join(SCENARIOS),
+        help=f"comma separated commands, from {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument("--concurrency", default="1,4,16", help="comma separated")
+    parser.add_argument("--iterations", type=int, default=20, help="per level")
+    parser.add_argument("--warmup", type=int, default=1, help="per command")
+    parser.add_argument("--details-batch", type=int, default=10)
+    parser.add_argument("--vcsim", default="vcsim", help="vcsim executable")
+    parser.add_argument("--port", type=int, default=8989)
+    parser.add_argument("--clusters", type=int, default=1)
+    parser.add_argument("--hosts", type=int, default=3, help="per cluster")
+    parser.add_argument("--vms", type=int, default=16, help="per resource pool")
+    parser.add_argument("--networks", type=int, default=4)
+    parser.add_argument("--datastores", type=int, default=1)
+    parser.add_argument("--delay", type=int, default=0, help="ms, every call")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument(
+        "--method-delay", default="", help="ms per method, Method1:ms,Method2:ms"
+    )
+    parser.add_argument("--output", help="save the results to the JSON file")
+    parser.add_argument("--baseline", help="compare with the saved results")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="allowed p95 regression"
+    )
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    logger.setLevel(logging.INFO)
+    collector = _MetricsCollector()
+    metrics_logger = logging.getLogger("driver_helpers.metrics")
+    metrics_logger.setLevel(logging.INFO)
+    metrics_logger.addHandler(collector)
+
+    commands = [c.strip() for c in args.commands.split(",") if c.strip()]
+    unknown = set(commands) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown commands: {', '.join(sorted(unknown))}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    inventory = Inventory(
+        args.clusters, args.hosts, args.vms, args.networks, args.datastores
+    )
+    latency = Latency.from_string(args.delay, args.jitter, args.method_delay)
+    sim = VcSim(inventory, latency, executable=args.vcsim, port=args.port)
+    results = []
+    with sim, cs_context.patch_cloudshell_api(), _patch_port(sim.port):
+        driver = VMwarevCenterCloudProviderShell2GDriver()
+        env = Environment(driver, inventory, sim, details_batch=args.details_batch)
+        try:
+            for command in commands:
+                if args.warmup:
+                    run_level(env, command, 1, args.warmup, collector)
+                for concurrency in levels:
+                    result = run_level(
+                        env, command, concurrency, args.iterations, collector
+                    )
+                    logger.info(f"{command} x{concurrency}: {result.to_dict()}")
+                    if result.errors:
+                        logger.warning(f"{command} failed: {result.errors[0]}")
+                    results.append(result.to_dict())
+        finally:
+            env.close()
+            driver.cleanup()
+
+    sys.stdout.write(format_table(results) + "\n")
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            sys.stdout.write(f"Regression: {regression}\n")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Driver commands measured by the benchmark.
+
+Every scenario prepares the i-th operation outside of the measured time and
+returns the call of the driver command that is measured.
+"""
+from __future__ import annotations
+
+import itertools
+import ssl
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+import cs_context
+from attrs import define, field
+from cloudshell.shell.core.driver_context import CancellationContext
+from pyVim.connect import Disconnect, SmartConnect
+from pyVim.task import WaitForTask
+from pyVmomi import vim
+from vcsim import PASSWORD, USER, Inventory, VcSim
+
+from driver import VMwarevCenterCloudProviderShell2GDriver
+
+Operation = Callable[[], Any]
+
+_counter = itertools.count()
+
+
+@define
+class Environment:
+    """The driver and the simulated vCenter the scenarios run against."""
+
+    driver: VMwarevCenterCloudProviderShell2GDriver
+    inventory: Inventory
+    sim: VcSim
+    details_batch: int = 10
+    _vc_si: vim.ServiceInstance = field(init=False)
+    vms: dict[str, vim.VirtualMachine] = field(init=False)
+
+    def __attrs_post_init__(self):
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        self._vc_si = SmartConnect(
+            host=self.sim.host,
+            user=USER,
+            pwd=PASSWORD,
+            port=self.sim.port,
+            sslContext=context,
+        )
+        search_index = self._vc_si.content.searchIndex
+        dc = search_index.FindByInventoryPath(self.inventory.datacenter)
+        self.vms = {}
+        for name in self.inventory.get_vm_names():
+            self.vms[name] = search_index.FindChild(dc.vmFolder, name)
+
+    def close(self) -> None:
+        Disconnect(self._vc_si)
+
+    @property
+    def address(self) -> str:
+        return self.sim.host
+
+    def get_vm(self, i: int) -> tuple[str, vim.VirtualMachine]:
+        names = list(self.vms)
+        name = names[i % len(names)]
+        return name, self.vms[name]
+
+    def power_off(self, vm: vim.VirtualMachine) -> None:
+        if vm.runtime.powerState != vim.VirtualMachinePowerState.poweredOff:
+            WaitForTask(vm.PowerOffVM_Task())
+
+    def power_on(self, vm: vim.VirtualMachine) -> None:
+        if vm.runtime.powerState != vim.VirtualMachinePowerState.poweredOn:
+            WaitForTask(vm.PowerOnVM_Task())
+
+    def set_guest_ip(self, vm: vim.VirtualMachine, ip: str) -> None:
+        """Set the guest IP, vcsim reads VM properties from the SET. extra config."""
+        spec = vim.vm.ConfigSpec(
+            extraConfig=[vim.option.OptionValue(key="SET.guest.ipAddress", value=ip)]
+        )
+        WaitForTask(vm.ReconfigVM_Task(spec))
+
+
+def _deploy(env: Environment, i: int) -> Operation:
+    source_vm, _ = env.get_vm(0)
+    app_name = f"bench-{next(_counter)}"
+    return partial(
+        env.driver.Deploy,
+        cs_context.get_resource_context(env.inventory, env.address),
+        cs_context.get_deploy_request(app_name, source_vm),
+        CancellationContext(),
+    )
+
+
+def _remote_context(env: Environment, name: str, vm: vim.VirtualMachine):
+    return cs_context.get_remote_context(
+        env.inventory, env.address, name, vm.config.instanceUuid
+    )
+
+
+def _power_on(env: Environment, i: int) -> Operation:
+    name, vm = env.get_vm(i)
+    env.power_off(vm)
+    return partial(env.driver.PowerOn, _remote_context(env, name, vm), [])
+
+
+def _power_off(env: Environment, i: int) -> Operation:
+    name, vm = env.get_vm(i)
+    env.power_on(vm)
+    return partial(env.driver.PowerOff, _remote_context(env, name, vm), [])
+
+
+def _get_vm_details(env: Environment, i: int) -> Operation:
+    apps = {}
+    for j in range(env.details_batch):
+        name, vm = env.get_vm(i * env.details_batch + j)
+        apps[name] = vm.config.instanceUuid
+    return partial(
+        env.driver.GetVmDetails,
+        cs_context.get_resource_context(env.inventory, env.address),
+        cs_context.get_vm_details_request(apps),
+        CancellationContext(),
+    )
+
+
+def _apply_connectivity_changes(env: Environment, i: int) -> Operation:
+    name, vm = env.get_vm(i)
+    return partial(
+        env.driver.ApplyConnectivityChanges,
+        cs_context.get_resource_context(env.inventory, env.address),
+        cs_context.get_connectivity_request(name, vm.config.instanceUuid, 100 + i % 50),
+    )
+
+
+def _get_vm_uuid(env: Environment, i: int) -> Operation:
+    name, _ = env.get_vm(i)
+    return partial(
+        env.driver.get_vm_uuid,
+        cs_context.get_resource_context(env.inventory, env.address),
+        name,
+    )
+
+
+def _refresh_ip(env: Environment, i: int) -> Operation:
+    name, vm = env.get_vm(i)
+    env.power_on(vm)
+    if not vm.guest.ipAddress:
+        env.set_guest_ip(vm, f"192.168.{i // 250 % 250}.{i % 250 + 1}")
+    return partial(
+        env.driver.remote_refresh_ip,
+        _remote_context(env, name, vm),
+        CancellationContext(),
+        [],
+    )
+
+
+SCENARIOS: dict[str, Callable[[Environment, int], Operation]] = {
+    "Deploy": _deploy,
+    "PowerOn": _power_on,
+    "PowerOff": _power_off,
+    "GetVmDetails": _get_vm_details,
+    "ApplyConnectivityChanges": _apply_connectivity_changes,
+    "get_vm_uuid": _get_vm_uuid,
+    "remote_refresh_ip": _refresh_ip,
+}
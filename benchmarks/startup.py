@@ -0,0 +1,85 @@
+"""Startup time of the driver process for the first command.
+
+Every sample runs in a new Python process that imports the driver, creates it
+and loads the modules of the command. The command is called with an empty
+context, it loads its modules and fails before connecting anywhere, so no
+vCenter is needed:
+
+    python benchmarks/startup.py --commands get_vm_uuid,PowerOff,Deploy
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+CHILD_CODE = """
+import inspect, json, sys, time
+start = time.perf_counter()
+import driver
+imported = time.perf_counter()
+instance = driver.VMwarevCenterCloudProviderShell2GDriver()
+created = time.perf_counter()
+command = getattr(instance, sys.argv[1])
+params = inspect.signature(inspect.unwrap(command)).parameters
+try:
+    command(*[None] * (len(params) - 1))
+except Exception:
+    pass
+loaded = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "init": created - imported,
+    "command": loaded - created,
+    "modules": len(sys.modules),
+}))
+"""
+
+
+def measure(command: str) -> dict[str, float]:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE, command],
+        cwd=SRC_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    # the driver may log to stdout, the result is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", default="get_vm_uuid,PowerOff,Deploy")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="save the results to the JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for command in filter(None, map(str.strip, args.commands.split(","))):
+        samples = [measure(command) for _ in range(args.repeat)]
+        result = {"command": command}
+        for key in ("import", "init", "command"):
+            result[key] = round(statistics.median(s[key] for s in samples), 4)
+        result["total"] = round(
+            result["import"] + result["init"] + result["command"], 4
+        )
+        result["modules"] = samples[-1]["modules"]
+        results.append(result)
+        sys.stdout.write(
+            f"{command}: total {result['total']:.3f}s "
+            f"(import {result['import']:.3f}s, init {result['init']:.3f}s, "
+            f"command {result['command']:.3f}s), {result['modules']} modules\n"
+        )
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
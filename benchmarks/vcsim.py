@@ -0,0 +1,156 @@
+"""The vCenter simulator (vcsim) the benchmarks run against.
+
+vcsim is a part of govmomi, install it with
+``go install github.com/vmware/govmomi/vcsim@latest`` or use the vmware/vcsim
+container image. It serves the vSphere SOAP API from an in-memory inventory.
+"""
+from __future__ import annotations
+
+import logging
+import socket
+import subprocess
+import time
+
+from attrs import define, field
+
+logger = logging.getLogger(__name__)
+
+USER = "user"
+PASSWORD = "pass"
+
+
+@define
+class Inventory:
+    """Size of the simulated inventory, names are generated by vcsim."""
+
+    clusters: int = 1
+    hosts: int = 3  # per cluster
+    vms: int = 16  # per resource pool
+    networks: int = 4  # DV port groups
+    datastores: int = 1
+
+    @property
+    def datacenter(self) -> str:
+        return "DC0"
+
+    @property
+    def cluster(self) -> str:
+        return "DC0_C0"
+
+    @property
+    def datastore(self) -> str:
+        return "LocalDS_0"
+
+    @property
+    def dv_switch(self) -> str:
+        return "DVS0"
+
+    @property
+    def holding_network(self) -> str:
+        return "VM Network"
+
+    def get_vm_names(self) -> list[str]:
+        """Names of the VMs in the cluster resource pools."""
+        return [
+            f"DC0_C{cluster}_RP0_VM{vm}"
+            for cluster in range(self.clusters)
+            for vm in range(self.vms)
+        ]
+
+    def get_args(self) -> list[str]:
+        return [
+            "-dc=1",
+            f"-cluster={self.clusters}",
+            f"-host={self.hosts}",
+            "-standalone-host=0",
+            f"-vm={self.vms}",
+            f"-pg={self.networks}",
+            f"-ds={self.datastores}",
+        ]
+
+
+@define
+class Latency:
+    """Response delay of the simulated vCenter."""
+
+    delay: int = 0  # ms, every method
+    jitter: float = 0.0  # coefficient of variation of the delay
+    method_delays: dict[str, int] = field(factory=dict)  # ms, by method name
+
+    @classmethod
+    def from_string(cls, delay: int, jitter: float, method_delays: str) -> Latency:
+        """Parses method delays in the form of 'Method1:ms,Method2:ms'."""
+        delays = {}
+        for item in filter(None, method_delays.split(",")):
+            name, _, ms = item.partition(":")
+            delays[name.strip()] = int(ms)
+        return cls(delay, jitter, delays)
+
+    def get_args(self) -> list[str]:
+        args = [f"-delay={self.delay}", f"-delay-jitter={self.jitter}"]
+        if self.method_delays:
+            delays = ",".join(f"{k}:{v}" for k, v in self.method_delays.items())
+            args.append(f"-method-delay={delays}")
+        return args
+
+
+@define
+class VcSim:
+    """Runs vcsim in a subprocess for the time of the benchmark."""
+
+    inventory: Inventory
+    latency: Latency
+    executable: str = "vcsim"
+    host: str = "127.0.0.1"
+    port: int = 8989
+    _process: subprocess.Popen | None = field(init=False, default=None)
+
+    def __enter__(self) -> VcSim:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self, timeout: float = 60) -> None:
+        args = [
+            self.executable,
+            f"-l={self.host}:{self.port}",
+            f"-username={USER}",
+            f"-password={PASSWORD}",
+            # vcsim exits when the benchmark dies and closes its stdin
+            "-stdinexit",
+            *self.inventory.get_args(),
+            *self.latency.get_args(),
+        ]
+        logger.info(f"Starting {' '.join(args)}")
+        self._process = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self._wait_listening(timeout)
+
+    def stop(self) -> None:
+        if self._process is None:
+            return
+        self._process.terminate()
+        try:
+            self._process.wait(10)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+        self._process = None
+
+    def _wait_listening(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(f"vcsim exited with code {self._process.returncode}")
+            try:
+                with socket.create_connection((self.host, self.port), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise TimeoutError(f"vcsim didn't start listening in {timeout} seconds")
@@ -1,61 +1,16 @@
 from __future__ import annotations
 
-import time
+import sys
+from threading import Thread
 from typing import TYPE_CHECKING
 
-from cloudshell.cp.core.cancellation_manager import CancellationContextManager
-from cloudshell.cp.core.request_actions.save_restore_app import (
-    SaveRestoreRequestActions,
-)
-from cloudshell.cp.core.reservation_info import ReservationInfo
 from cloudshell.shell.core.resource_driver_interface import ResourceDriverInterface
-from cloudshell.shell.core.session.cloudshell_session import CloudShellSessionContext
 from cloudshell.shell.core.session.logging_session import LoggingSessionContext
-from cloudshell.shell.flows.connectivity.parse_request_service import (
-    ParseConnectivityRequestService,
-)
-from cloudshell.shell.standards.core.utils import split_list_of_values
-
-from cloudshell.cp.vcenter.flows import (
-    DeleteFlow,
-    SnapshotFlow,
-    VCenterAutoloadFlow,
-    VCenterPowerFlow,
-    get_cluster_usage,
-    get_deploy_flow,
-    get_hints,
-    get_vm_uuid_by_name,
-    get_vm_web_console,
-    reconfigure_vm,
-    refresh_ip,
-    validate_attributes,
-)
-from cloudshell.cp.vcenter.flows.affinity_rules_flow import AffinityRulesFlow
-from cloudshell.cp.vcenter.flows.connectivity_flow import VCenterConnectivityFlow
-from cloudshell.cp.vcenter.flows.customize_guest_os import customize_guest_os
-from cloudshell.cp.vcenter.flows.save_restore_app import SaveRestoreAppFlow
-from cloudshell.cp.vcenter.flows.vm_details import VCenterGetVMDetailsFlow
-from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
-from cloudshell.cp.vcenter.models.connectivity_action_model import (
-    VcenterConnectivityActionModel,
-)
-from cloudshell.cp.vcenter.models.deploy_app import (
-    VCenterDeployVMRequestActions,
-    VMFromImageDeployApp,
-    VMFromLinkedCloneDeployApp,
-    VMFromTemplateDeployApp,
-    VMFromVMDeployApp,
-)
-from cloudshell.cp.vcenter.models.deployed_app import (
-    StaticVCenterDeployedApp,
-    VCenterDeployedVMActions,
-    VCenterGetVMDetailsRequestActions,
-    VMFromImageDeployedApp,
-    VMFromLinkedCloneDeployedApp,
-    VMFromTemplateDeployedApp,
-    VMFromVMDeployedApp,
-)
-from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+from driver_helpers import settings
+from driver_helpers.context_cache import ResourceContextCache
+from driver_helpers.metrics import command_metrics
+from driver_helpers.si_pool import si_pool
 
 if TYPE_CHECKING:
     from cloudshell.shell.core.driver_context import (
@@ -68,32 +23,47 @@ if TYPE_CHECKING:
         UnreservedResourceCommandContext,
     )
 
+# Commands import the flows they use, so a new driver process loads only the
+# modules of the commands it runs. Process-wide helpers are closed on cleanup
+# if a command has loaded them, the session pool is closed last.
+CLEANUP_HELPERS = (
+    ("driver_helpers.deploy_pipeline", "shared_preparation", "clear"),
+    ("driver_helpers.hints_cache", "hints_cache", "clear"),
+    ("driver_helpers.standby_pool", "standby_pools", "close"),
+    ("driver_helpers.usage_sampler", "usage_samplers", "close"),
+    ("driver_helpers.inventory_index", "inventory_indexes", "close"),
+)
+
 
 class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
     def cleanup(self):
-        pass
+        self._context_cache.clear()
+        for module_name, helper_name, method_name in CLEANUP_HELPERS:
+            if module := sys.modules.get(module_name):
+                getattr(getattr(module, helper_name), method_name)()
+        si_pool.close()
 
     def __init__(self):
-        for deploy_app_cls in (
-            VMFromVMDeployApp,
-            VMFromTemplateDeployApp,
-            VMFromLinkedCloneDeployApp,
-            VMFromImageDeployApp,
-        ):
-            VCenterDeployVMRequestActions.register_deployment_path(deploy_app_cls)
-
-        for deployed_app_cls in (
-            VMFromVMDeployedApp,
-            VMFromTemplateDeployedApp,
-            VMFromLinkedCloneDeployedApp,
-            VMFromImageDeployedApp,
-            StaticVCenterDeployedApp,
-        ):
-            VCenterDeployedVMActions.register_deployment_path(deployed_app_cls)
+        # deployment paths are registered by the commands that parse the Apps
+        self._context_cache = ResourceContextCache()
 
     def initialize(self, context: InitCommandContext):
-        pass
-
+        if settings.ATTRIBUTE_HINTS_PREFETCH:
+            # the hints and the resource config are loaded in the background
+            # to not delay the start
+            Thread(
+                target=self._prefetch_hints,
+                args=(context,),
+                name="hints-prefetch",
+                daemon=True,
+            ).start()
+
+    def _prefetch_hints(self, context: InitCommandContext) -> None:
+        from driver_helpers.flows.attribute_hints import prefetch_hints
+
+        prefetch_hints(si_pool, lambda: self._context_cache.get(context)[1])
+
+    @command_metrics
     def get_inventory(self, context: AutoLoadCommandContext) -> AutoLoadDetails:
         """Called when the cloud provider resource is created in the inventory.
 
@@ -106,14 +76,16 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
         :return Attribute and sub-resource information for the Shell resource
         you can return an AutoLoadDetails object
         """
+        from driver_helpers.flows.autoload import ParallelAutoloadFlow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Autoload command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
-            with SiHandler.from_config(resource_config) as si:
-                autoload_flow = VCenterAutoloadFlow(si, resource_config)
+            api, resource_config = self._context_cache.get(context)
+            with si_pool.session(resource_config) as si:
+                autoload_flow = ParallelAutoloadFlow(si, resource_config)
                 return autoload_flow.discover()
 
+    @command_metrics
     def Deploy(
         self,
         context: ResourceCommandContext,
@@ -126,18 +98,23 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
         container. If App deployment fails, return a "success false" action result.
         :param request: A JSON string with the list of requested deployment actions
         """
+        from cloudshell.cp.core.cancellation_manager import CancellationContextManager
+        from cloudshell.cp.core.reservation_info import ReservationInfo
+
+        from driver_helpers.deployment_paths import get_deploy_request_actions
+        from driver_helpers.flows.deploy import get_deploy_flow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Deploy command")
             logger.debug(f"Request: {request}")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
 
             cancellation_manager = CancellationContextManager(cancellation_context)
             reservation_info = ReservationInfo.from_resource_context(context)
 
-            request_actions = VCenterDeployVMRequestActions.from_request(request, api)
+            request_actions = get_deploy_request_actions().from_request(request, api)
             deploy_flow_class = get_deploy_flow(request_actions)
-            with SiHandler.from_config(resource_config) as si:
+            with si_pool.session(resource_config) as si:
                 deploy_flow = deploy_flow_class(
                     si=si,
                     resource_config=resource_config,
@@ -147,6 +124,7 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
                 )
                 return deploy_flow.deploy(request_actions=request_actions)
 
+    @command_metrics
     def PowerOn(self, context: ResourceRemoteCommandContext, ports: list[str]):
         """Called when reserving a sandbox during setup.
 
@@ -154,17 +132,21 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
         the sandbox end-user from the deployed App's commands pane.
         Method spins up the VM If the operation fails, method should raise an exception.
         """
+        from driver_helpers.deployment_paths import get_deployed_vm_actions
+
+        from cloudshell.cp.vcenter.flows import VCenterPowerFlow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Power On command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             resource = context.remote_endpoints[0]
-            actions = VCenterDeployedVMActions.from_remote_resource(resource, api)
-            with SiHandler.from_config(resource_config) as si:
+            actions = get_deployed_vm_actions().from_remote_resource(resource, api)
+            with si_pool.session(resource_config) as si:
                 return VCenterPowerFlow(
                     si, actions.deployed_app, resource_config
                 ).power_on()
 
+    @command_metrics
     def PowerOff(self, context: ResourceRemoteCommandContext, ports: list[str]):
         """Called during sandbox's teardown.
 
@@ -172,32 +154,91 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
         App's commands pane. Method shuts down (or powers off) the VM instance.
         If the operation fails, method should raise an exception.
         """
+        from driver_helpers.deployment_paths import get_deployed_vm_actions
+
+        from cloudshell.cp.vcenter.flows import VCenterPowerFlow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Power Off command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             resource = context.remote_endpoints[0]
-            actions = VCenterDeployedVMActions.from_remote_resource(resource, api)
-            with SiHandler.from_config(resource_config) as si:
+            actions = get_deployed_vm_actions().from_remote_resource(resource, api)
+            with si_pool.session(resource_config) as si:
                 return VCenterPowerFlow(
                     si, actions.deployed_app, resource_config
                 ).power_off()
 
+    @command_metrics
+    def power_on_apps(self, context: ResourceCommandContext, app_names: str) -> str:
+        """Powers on many deployed Apps at once.
+
+        :param app_names: names of the deployed Apps separated by ';'
+        :return: JSON list with the result for every App
+        """
+        from cloudshell.shell.standards.core.utils import split_list_of_values
+
+        from driver_helpers.bulk import get_apps_vm_uuids
+        from driver_helpers.flows.bulk_power import BulkPowerFlow
+
+        with LoggingSessionContext(context) as logger:
+            logger.info("Starting Power On Apps command")
+            api, resource_config = self._context_cache.get(context)
+            vm_uuids = get_apps_vm_uuids(api, split_list_of_values(app_names))
+            with si_pool.session(resource_config) as si:
+                flow = BulkPowerFlow(si, resource_config)
+                return flow.power_on(vm_uuids).to_json()
+
+    @command_metrics
+    def power_off_apps(self, context: ResourceCommandContext, app_names: str) -> str:
+        """Powers off many deployed Apps at once.
+
+        :param app_names: names of the deployed Apps separated by ';'
+        :return: JSON list with the result for every App
+        """
+        from cloudshell.shell.standards.core.utils import split_list_of_values
+
+        from driver_helpers.bulk import get_apps_vm_uuids
+        from driver_helpers.flows.bulk_power import BulkPowerFlow
+
+        with LoggingSessionContext(context) as logger:
+            logger.info("Starting Power Off Apps command")
+            api, resource_config = self._context_cache.get(context)
+            vm_uuids = get_apps_vm_uuids(api, split_list_of_values(app_names))
+            with si_pool.session(resource_config) as si:
+                flow = BulkPowerFlow(si, resource_config)
+                return flow.power_off(vm_uuids).to_json()
+
+    @command_metrics
     def PowerCycle(
-        self, context: ResourceRemoteCommandContext, ports: list[str], delay
+        self,
+        context: ResourceRemoteCommandContext,
+        ports: list[str],
+        delay,
+        cancellation_context: CancellationContext,
     ):
+        """Power cycles all the remote endpoints together.
+
+        The vCenter session is released during the delay and the delay can be
+        cancelled.
+        """
+        from cloudshell.cp.core.cancellation_manager import CancellationContextManager
+
+        from driver_helpers.deployment_paths import get_deployed_vm_actions
+        from driver_helpers.flows.power_cycle import PowerCycleFlow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Power Cycle command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
-            resource = context.remote_endpoints[0]
-            actions = VCenterDeployedVMActions.from_remote_resource(resource, api)
-            with SiHandler.from_config(resource_config) as si:
-                power_flow = VCenterPowerFlow(si, actions.deployed_app, resource_config)
-                power_flow.power_off()
-                time.sleep(float(delay))
-                power_flow.power_on()
-
+            api, resource_config = self._context_cache.get(context)
+            cancellation_manager = CancellationContextManager(cancellation_context)
+            vm_uuids = {}
+            for resource in context.remote_endpoints:
+                actions = get_deployed_vm_actions().from_remote_resource(resource, api)
+                deployed_app = actions.deployed_app
+                vm_uuids[deployed_app.name] = deployed_app.vmdetails.uid
+            flow = PowerCycleFlow(si_pool, resource_config, cancellation_manager)
+            flow.power_cycle(vm_uuids, float(delay)).raise_on_failures()
+
+    @command_metrics
     def remote_refresh_ip(
         self,
         context: ResourceRemoteCommandContext,
@@ -212,18 +253,23 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
         resource. Both private and public IPs are retrieved, as appropriate. If the
         operation fails, method should raise an exception.
         """
+        from cloudshell.cp.core.cancellation_manager import CancellationContextManager
+
+        from driver_helpers.deployment_paths import get_deployed_vm_actions
+        from driver_helpers.flows.refresh_ip import refresh_ip
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Remote Refresh IP command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             resource = context.remote_endpoints[0]
-            actions = VCenterDeployedVMActions.from_remote_resource(resource, api)
+            actions = get_deployed_vm_actions().from_remote_resource(resource, api)
             cancellation_manager = CancellationContextManager(cancellation_context)
-            with SiHandler.from_config(resource_config) as si:
+            with si_pool.session(resource_config) as si:
                 return refresh_ip(
                     si, actions.deployed_app, resource_config, cancellation_manager
                 )
 
+    @command_metrics
     def GetVmDetails(
         self,
         context: ResourceCommandContext,
@@ -238,94 +284,159 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
         returns that as a json serialized driver response containing a list of
         VmDetailsData. If the operation fails, method should raise an exception.
         """
+        from cloudshell.cp.core.cancellation_manager import CancellationContextManager
+
+        from driver_helpers.deployment_paths import get_vm_details_request_actions
+        from driver_helpers.flows.vm_details import BulkVMDetailsFlow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Get VM Details command")
             logger.debug(f"Requests: {requests}")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             cancellation_manager = CancellationContextManager(cancellation_context)
-            actions = VCenterGetVMDetailsRequestActions.from_request(requests, api)
-            with SiHandler.from_config(resource_config) as si:
-                return VCenterGetVMDetailsFlow(
+            actions = get_vm_details_request_actions().from_request(requests, api)
+            with si_pool.session(resource_config) as si:
+                return BulkVMDetailsFlow(
                     si, resource_config, cancellation_manager
                 ).get_vm_details(actions)
 
+    @command_metrics
     def ApplyConnectivityChanges(self, context: ResourceCommandContext, request: str):
+        from cloudshell.cp.core.reservation_info import ReservationInfo
+        from cloudshell.shell.flows.connectivity.parse_request_service import (
+            ParseConnectivityRequestService,
+        )
+
+        from driver_helpers.flows.connectivity import BatchedConnectivityFlow
+
+        from cloudshell.cp.vcenter.models.connectivity_action_model import (
+            VcenterConnectivityActionModel,
+        )
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Apply Connectivity Changes command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             reservation_info = ReservationInfo.from_resource_context(context)
             parse_connectivity_req_service = ParseConnectivityRequestService(
                 is_vlan_range_supported=True,
                 is_multi_vlan_supported=True,
                 connectivity_model_cls=VcenterConnectivityActionModel,
             )
-            with SiHandler.from_config(resource_config) as si:
-                return VCenterConnectivityFlow(
+            with si_pool.session(resource_config) as si:
+                return BatchedConnectivityFlow(
                     parse_connectivity_req_service,
                     si,
                     resource_config,
                     reservation_info,
                 ).apply_connectivity(request)
 
+    @command_metrics
     def DeleteInstance(self, context: ResourceRemoteCommandContext, ports: list[str]):
         """Called when removing a deployed App from the sandbox.
 
         Method deletes the VM from the cloud provider. If the operation fails, method
         should raise an exception.
         """
+        from cloudshell.cp.core.reservation_info import ReservationInfo
+
+        from driver_helpers.deployment_paths import get_deployed_vm_actions
+
+        from cloudshell.cp.vcenter.flows import DeleteFlow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Delete Instance command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             resource = context.remote_endpoints[0]
-            actions = VCenterDeployedVMActions.from_remote_resource(resource, api)
+            actions = get_deployed_vm_actions().from_remote_resource(resource, api)
             try:
                 reservation_info = ReservationInfo.from_remote_resource_context(context)
             except AttributeError:
                 # The sandbox in which the app is deployed failed and was removed.
                 # And the command was called not in the sandbox
                 reservation_info = None
-            with SiHandler.from_config(resource_config) as si:
+            with si_pool.session(resource_config) as si:
                 DeleteFlow(
                     si, actions.deployed_app, resource_config, reservation_info
                 ).delete()
 
+    @command_metrics
+    def delete_apps(self, context: ResourceCommandContext, app_names: str) -> str:
+        """Deletes VMs of many deployed Apps at once.
+
+        The sandbox folder, port groups and tags left unused are cleaned up once
+        after all VMs are deleted.
+
+        :param app_names: names of the deployed Apps separated by ';'
+        :return: JSON list with the result for every App
+        """
+        from cloudshell.cp.core.reservation_info import ReservationInfo
+        from cloudshell.shell.standards.core.utils import split_list_of_values
+
+        from driver_helpers.bulk import get_apps_vm_uuids
+        from driver_helpers.flows.bulk_delete import BulkDeleteFlow
+
+        with LoggingSessionContext(context) as logger:
+            logger.info("Starting Delete Apps command")
+            api, resource_config = self._context_cache.get(context)
+            vm_uuids = get_apps_vm_uuids(api, split_list_of_values(app_names))
+            try:
+                reservation_info = ReservationInfo.from_resource_context(context)
+            except AttributeError:
+                # called outside of a sandbox
+                reservation_info = None
+            with si_pool.session(resource_config) as si:
+                flow = BulkDeleteFlow(si, resource_config, reservation_info)
+                return flow.delete(vm_uuids).to_json()
+
+    @command_metrics
     def SaveApp(
         self,
         context: ResourceCommandContext,
         request: str,
         cancellation_context: CancellationContext,
     ) -> str:
+        from cloudshell.cp.core.cancellation_manager import CancellationContextManager
+        from cloudshell.cp.core.request_actions.save_restore_app import (
+            SaveRestoreRequestActions,
+        )
+
+        from driver_helpers.flows.save_restore_app import BulkSaveRestoreAppFlow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Save App command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             cancellation_manager = CancellationContextManager(cancellation_context)
             actions = SaveRestoreRequestActions.from_request(request)
-            with SiHandler.from_config(resource_config) as si:
-                return SaveRestoreAppFlow(
+            with si_pool.session(resource_config) as si:
+                return BulkSaveRestoreAppFlow(
                     si, resource_config, api, cancellation_manager
                 ).save_apps(actions.save_app_actions)
 
+    @command_metrics
     def DeleteSavedApps(
         self,
         context: UnreservedResourceCommandContext,
         request: str,
         cancellation_context: CancellationContext,
     ) -> str:
+        from cloudshell.cp.core.cancellation_manager import CancellationContextManager
+        from cloudshell.cp.core.request_actions.save_restore_app import (
+            SaveRestoreRequestActions,
+        )
+
+        from driver_helpers.flows.save_restore_app import BulkSaveRestoreAppFlow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Delete Saved App command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             cancellation_manager = CancellationContextManager(cancellation_context)
             actions = SaveRestoreRequestActions.from_request(request)
-            with SiHandler.from_config(resource_config) as si:
-                return SaveRestoreAppFlow(
+            with si_pool.session(resource_config) as si:
+                return BulkSaveRestoreAppFlow(
                     si, resource_config, api, cancellation_manager
                 ).delete_saved_apps(actions.delete_saved_app_actions)
 
+    @command_metrics
     def remote_save_snapshot(
         self,
         context: ResourceRemoteCommandContext,
@@ -334,19 +445,23 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
         save_memory: str,
     ) -> str:
         """Saves virtual machine to a snapshot."""
+        from driver_helpers.deployment_paths import get_deployed_vm_actions
+
+        from cloudshell.cp.vcenter.flows import SnapshotFlow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Remote Save Snapshot command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             resource = context.remote_endpoints[0]
-            actions = VCenterDeployedVMActions.from_remote_resource(resource, api)
-            with SiHandler.from_config(resource_config) as si:
+            actions = get_deployed_vm_actions().from_remote_resource(resource, api)
+            with si_pool.session(resource_config) as si:
                 return SnapshotFlow(
                     si,
                     resource_config,
                     actions.deployed_app,
                 ).save_snapshot(snapshot_name, save_memory)
 
+    @command_metrics
     def remote_restore_snapshot(
         self,
         context: ResourceRemoteCommandContext,
@@ -354,36 +469,44 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
         snapshot_name: str,
     ):
         """Restores virtual machine from a snapshot."""
+        from driver_helpers.deployment_paths import get_deployed_vm_actions
+
+        from cloudshell.cp.vcenter.flows import SnapshotFlow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Remote Restore Snapshot command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             resource = context.remote_endpoints[0]
-            actions = VCenterDeployedVMActions.from_remote_resource(resource, api)
-            with SiHandler.from_config(resource_config) as si:
+            actions = get_deployed_vm_actions().from_remote_resource(resource, api)
+            with si_pool.session(resource_config) as si:
                 return SnapshotFlow(
                     si,
                     resource_config,
                     actions.deployed_app,
                 ).restore_from_snapshot(api, snapshot_name)
 
+    @command_metrics
     def remote_get_snapshots(
         self, context: ResourceRemoteCommandContext, ports: list[str]
     ) -> str:
         """Returns list of snapshots."""
+        from driver_helpers.deployment_paths import get_deployed_vm_actions
+
+        from cloudshell.cp.vcenter.flows import SnapshotFlow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Remote Get Snapshots command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             resource = context.remote_endpoints[0]
-            actions = VCenterDeployedVMActions.from_remote_resource(resource, api)
-            with SiHandler.from_config(resource_config) as si:
+            actions = get_deployed_vm_actions().from_remote_resource(resource, api)
+            with si_pool.session(resource_config) as si:
                 return SnapshotFlow(
                     si,
                     resource_config,
                     actions.deployed_app,
                 ).get_snapshot_paths()
 
+    @command_metrics
     def remote_remove_snapshot(
         self,
         context: ResourceRemoteCommandContext,
@@ -391,19 +514,82 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
         snapshot_name: str,
         remove_child: str,
     ):
+        from driver_helpers.deployment_paths import get_deployed_vm_actions
+
+        from cloudshell.cp.vcenter.flows import SnapshotFlow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Remote Remove Snapshot command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             resource = context.remote_endpoints[0]
-            actions = VCenterDeployedVMActions.from_remote_resource(resource, api)
-            with SiHandler.from_config(resource_config) as si:
+            actions = get_deployed_vm_actions().from_remote_resource(resource, api)
+            with si_pool.session(resource_config) as si:
                 return SnapshotFlow(
                     si,
                     resource_config,
                     actions.deployed_app,
                 ).remove_snapshot(snapshot_name, remove_child)
 
+    @command_metrics
+    def save_apps_snapshot(
+        self,
+        context: ResourceCommandContext,
+        app_names: str,
+        snapshot_name: str = "",
+        save_memory: str = "No",
+        quiesce: str = "No",
+    ) -> str:
+        """Takes snapshots of many deployed Apps at once.
+
+        :param app_names: names of the deployed Apps separated by ';'
+        :return: saved details of all the snapshots for restore_apps_snapshot
+        """
+        from cloudshell.shell.standards.core.utils import split_list_of_values
+
+        from driver_helpers.bulk import get_apps_vm_uuids
+        from driver_helpers.flows.sandbox_snapshot import (
+            SandboxSnapshotFlow,
+            parse_yes_no,
+        )
+
+        with LoggingSessionContext(context) as logger:
+            logger.info("Starting Save Apps Snapshot command")
+            api, resource_config = self._context_cache.get(context)
+            dump_memory = parse_yes_no("save_memory", save_memory)
+            quiesce = parse_yes_no("quiesce", quiesce)
+            vm_uuids = get_apps_vm_uuids(api, split_list_of_values(app_names))
+            with si_pool.session(resource_config) as si:
+                flow = SandboxSnapshotFlow(si, resource_config)
+                return flow.save(vm_uuids, snapshot_name, dump_memory, quiesce)
+
+    @command_metrics
+    def restore_apps_snapshot(
+        self,
+        context: ResourceCommandContext,
+        saved_details: str,
+        power_on_order: str = "",
+    ) -> str:
+        """Restores many deployed Apps from the snapshots taken together.
+
+        :param saved_details: result of the save_apps_snapshot command
+        :param power_on_order: groups of App names to power on one after another,
+            groups separated by ';' and names in a group separated by ','
+        :return: JSON list with the result for every App
+        """
+        from driver_helpers.flows.sandbox_snapshot import (
+            SandboxSnapshotFlow,
+            parse_power_on_order,
+        )
+
+        with LoggingSessionContext(context) as logger:
+            logger.info("Starting Restore Apps Snapshot command")
+            api, resource_config = self._context_cache.get(context)
+            order = parse_power_on_order(power_on_order)
+            with si_pool.session(resource_config) as si:
+                flow = SandboxSnapshotFlow(si, resource_config)
+                return flow.restore(saved_details, api, order).to_json()
+
+    @command_metrics
     def orchestration_save(
         self,
         context: ResourceRemoteCommandContext,
@@ -411,56 +597,86 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
         mode: str = "shallow",
         custom_params=None,
     ) -> str:
+        from driver_helpers.deployment_paths import get_deployed_vm_actions
+
+        from cloudshell.cp.vcenter.flows import SnapshotFlow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Orchestration Save command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             resource = context.remote_endpoints[0]
-            actions = VCenterDeployedVMActions.from_remote_resource(resource, api)
-            with SiHandler.from_config(resource_config) as si:
+            actions = get_deployed_vm_actions().from_remote_resource(resource, api)
+            with si_pool.session(resource_config) as si:
                 return SnapshotFlow(
                     si,
                     resource_config,
                     actions.deployed_app,
                 ).orchestration_save()
 
+    @command_metrics
     def orchestration_restore(
         self,
         context: ResourceRemoteCommandContext,
         ports: list[str],
         saved_details: str,
     ):
+        from driver_helpers.deployment_paths import get_deployed_vm_actions
+
+        from cloudshell.cp.vcenter.flows import SnapshotFlow
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Orchestration Restore command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             resource = context.remote_endpoints[0]
-            actions = VCenterDeployedVMActions.from_remote_resource(resource, api)
-            with SiHandler.from_config(resource_config) as si:
+            actions = get_deployed_vm_actions().from_remote_resource(resource, api)
+            with si_pool.session(resource_config) as si:
                 return SnapshotFlow(
                     si,
                     resource_config,
                     actions.deployed_app,
                 ).orchestration_restore(saved_details, api)
 
+    @command_metrics
     def get_vm_uuid(self, context: ResourceCommandContext, vm_name: str) -> str:
+        from driver_helpers.flows.vm_uuid_by_name import get_vm_uuid_by_name
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Get VM UUID command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
-            with SiHandler.from_config(resource_config) as si:
+            api, resource_config = self._context_cache.get(context)
+            with si_pool.session(resource_config) as si:
                 return get_vm_uuid_by_name(si, resource_config, vm_name)
 
+    @command_metrics
     def get_cluster_usage(
-        self, context: ResourceCommandContext, datastore_name: str
+        self,
+        context: ResourceCommandContext,
+        datastore_name: str,
+        force_refresh: str = "False",
+        history_size: str = "0",
     ) -> str:
+        """Returns the usage of the VM cluster and the datastore.
+
+        The usage is sampled in the background, the result includes the age of
+        the sample in seconds.
+
+        :param force_refresh: "True" to query the vCenter instead of the sample
+        :param history_size: number of the previous samples to include
+        """
+        from driver_helpers.flows.cluster_usage import get_cluster_usage
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Get Cluster Usage command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
-            with SiHandler.from_config(resource_config) as si:
-                return get_cluster_usage(si, resource_config, datastore_name)
+            api, resource_config = self._context_cache.get(context)
+            with si_pool.session(resource_config) as si:
+                return get_cluster_usage(
+                    si,
+                    resource_config,
+                    datastore_name,
+                    force_refresh=force_refresh.lower() == "true",
+                    history_size=int(history_size or 0),
+                )
 
+    @command_metrics
     def reconfigure_vm(
         self,
         context: ResourceRemoteCommandContext,
@@ -469,13 +685,16 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
         ram: str | None,
         hdd: str | None,
     ):
+        from driver_helpers.deployment_paths import get_deployed_vm_actions
+
+        from cloudshell.cp.vcenter.flows import reconfigure_vm
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Reconfigure VM command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             resource = context.remote_endpoints[0]
-            actions = VCenterDeployedVMActions.from_remote_resource(resource, api)
-            with SiHandler.from_config(resource_config) as si:
+            actions = get_deployed_vm_actions().from_remote_resource(resource, api)
+            with si_pool.session(resource_config) as si:
                 reconfigure_vm(
                     si,
                     resource_config,
@@ -485,34 +704,68 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
                     hdd,
                 )
 
+    @command_metrics
+    def reconfigure_apps(
+        self,
+        context: ResourceCommandContext,
+        app_names: str,
+        cpu: str | None,
+        ram: str | None,
+        hdd: str | None,
+    ) -> str:
+        """Reconfigures VMs of many deployed Apps at once.
+
+        :param app_names: names of the deployed Apps separated by ';'
+        :return: JSON list with the result for every App
+        """
+        from cloudshell.shell.standards.core.utils import split_list_of_values
+
+        from driver_helpers.bulk import get_apps_vm_uuids
+        from driver_helpers.flows.bulk_configure import BulkConfigureFlow
+
+        with LoggingSessionContext(context) as logger:
+            logger.info("Starting Reconfigure Apps command")
+            api, resource_config = self._context_cache.get(context)
+            vm_uuids = get_apps_vm_uuids(api, split_list_of_values(app_names))
+            with si_pool.session(resource_config) as si:
+                flow = BulkConfigureFlow(si, resource_config)
+                return flow.reconfigure(vm_uuids, cpu, ram, hdd).to_json()
+
+    @command_metrics
     def get_vm_web_console(
         self, context: ResourceRemoteCommandContext, ports: list[str]
     ) -> str:
+        from driver_helpers.deployment_paths import get_deployed_vm_actions
+
+        from cloudshell.cp.vcenter.flows import get_vm_web_console
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Get VM WEB Console command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             resource = context.remote_endpoints[0]
-            actions = VCenterDeployedVMActions.from_remote_resource(resource, api)
-            with SiHandler.from_config(resource_config) as si:
+            actions = get_deployed_vm_actions().from_remote_resource(resource, api)
+            with si_pool.session(resource_config) as si:
                 return get_vm_web_console(si, resource_config, actions.deployed_app)
 
+    @command_metrics
     def get_attribute_hints(self, context: ResourceCommandContext, request: str) -> str:
+        from driver_helpers.flows.attribute_hints import get_hints
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Get attribute hints command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
-            with SiHandler.from_config(resource_config) as si:
-                return get_hints(si, resource_config, request)
+            api, resource_config = self._context_cache.get(context)
+            return get_hints(si_pool, resource_config, request)
 
+    @command_metrics
     def validate_attributes(self, context: ResourceCommandContext, request: str) -> str:
+        from driver_helpers.flows.attribute_hints import validate_attributes
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Validate attributes command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
-            with SiHandler.from_config(resource_config) as si:
-                return validate_attributes(si, resource_config, request)
+            api, resource_config = self._context_cache.get(context)
+            return validate_attributes(si_pool, resource_config, request)
 
+    @command_metrics
     def customize_guest_os(
         self,
         context: ResourceRemoteCommandContext,
@@ -521,13 +774,16 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
         custom_spec_params: str,
         override_custom_spec: bool,
     ):
+        from driver_helpers.deployment_paths import get_deployed_vm_actions
+
+        from cloudshell.cp.vcenter.flows.customize_guest_os import customize_guest_os
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Customize Guest OS command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
             resource = context.remote_endpoints[0]
-            actions = VCenterDeployedVMActions.from_remote_resource(resource, api)
-            with SiHandler.from_config(resource_config) as si:
+            actions = get_deployed_vm_actions().from_remote_resource(resource, api)
+            with si_pool.session(resource_config) as si:
                 return customize_guest_os(
                     si,
                     resource_config,
@@ -537,20 +793,94 @@ class VMwarevCenterCloudProviderShell2GDriver(ResourceDriverInterface):
                     override_custom_spec,
                 )
 
+    @command_metrics
+    def customize_apps_guest_os(
+        self,
+        context: ResourceCommandContext,
+        app_names: str,
+        custom_spec_name: str,
+        custom_spec_params: str,
+        override_custom_spec: str = "False",
+    ) -> str:
+        """Prepares customization specs of VMs of many deployed Apps at once.
+
+        :param app_names: names of the deployed Apps separated by ';'
+        :return: JSON list with the result for every App
+        """
+        from cloudshell.shell.standards.core.utils import split_list_of_values
+
+        from driver_helpers.bulk import get_apps_vm_uuids
+        from driver_helpers.flows.bulk_configure import BulkConfigureFlow
+
+        with LoggingSessionContext(context) as logger:
+            logger.info("Starting Customize Apps Guest OS command")
+            api, resource_config = self._context_cache.get(context)
+            vm_uuids = get_apps_vm_uuids(api, split_list_of_values(app_names))
+            with si_pool.session(resource_config) as si:
+                flow = BulkConfigureFlow(si, resource_config)
+                return flow.customize_guest_os(
+                    vm_uuids,
+                    custom_spec_name,
+                    custom_spec_params,
+                    str(override_custom_spec).lower() == "true",
+                ).to_json()
+
+    @command_metrics
     def add_vm_to_affinity_rule(
         self,
         context: ResourceCommandContext,
         vm_uuids: str,
         affinity_rule_name: str | None,
     ) -> str:
+        from cloudshell.cp.core.reservation_info import ReservationInfo
+        from cloudshell.shell.standards.core.utils import split_list_of_values
+
+        from driver_helpers.flows.affinity_rules import (
+            AffinityRuleRequest,
+            BatchAffinityRulesFlow,
+        )
+
         with LoggingSessionContext(context) as logger:
             logger.info("Starting Add VMs to Affinity Rule command")
-            api = CloudShellSessionContext(context).get_api()
-            resource_config = VCenterResourceConfig.from_context(context, api=api)
+            api, resource_config = self._context_cache.get(context)
+            reservation_info = ReservationInfo.from_resource_context(context)
+            request = AffinityRuleRequest(
+                list(split_list_of_values(vm_uuids)), affinity_rule_name or None
+            )
+            with si_pool.session(resource_config) as si:
+                flow = BatchAffinityRulesFlow(
+                    si, resource_config, reservation_info.reservation_id
+                )
+                return flow.add_vms_to_affinity_rules([request])[0]
+
+    @command_metrics
+    def add_vms_to_affinity_rules(
+        self, context: ResourceCommandContext, request: str
+    ) -> str:
+        """Adds VMs to many affinity rules with one cluster reconfigure.
+
+        :param request: JSON list of the rules, e.g.
+            [{"affinity_rule_name": "web", "vm_uuids": ["uuid1", "uuid2"]}],
+            a new rule is created for a rule without a name
+        :return: JSON list with the names of the rules in the requested order
+        """
+        import json
+
+        from cloudshell.cp.core.reservation_info import ReservationInfo
+
+        from driver_helpers.flows.affinity_rules import (
+            BatchAffinityRulesFlow,
+            parse_affinity_rules_request,
+        )
+
+        with LoggingSessionContext(context) as logger:
+            logger.info("Starting Add VMs to Affinity Rules command")
+            logger.debug(f"Request: {request}")
+            api, resource_config = self._context_cache.get(context)
             reservation_info = ReservationInfo.from_resource_context(context)
-            with SiHandler.from_config(resource_config) as si:
-                flow = AffinityRulesFlow(
+            rule_requests = parse_affinity_rules_request(request)
+            with si_pool.session(resource_config) as si:
+                flow = BatchAffinityRulesFlow(
                     si, resource_config, reservation_info.reservation_id
                 )
-                vm_uuids = list(split_list_of_values(vm_uuids))
-                return flow.add_vms_to_affinity_rule(vm_uuids, affinity_rule_name)
+                return json.dumps(flow.add_vms_to_affinity_rules(rule_requests))
@@ -0,0 +1,165 @@
+"""Helpers for the commands that work on many deployed Apps at once."""
+from __future__ import annotations
+
+import json
+import logging
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+
+from attrs import asdict, define
+from cloudshell.api.cloudshell_api import CloudShellAPISession
+from cloudshell.cp.core.cancellation_manager import CancellationContextManager
+from pyVmomi import vim
+
+from driver_helpers import settings
+from driver_helpers.task_waiter import wait_for_tasks
+
+from cloudshell.cp.vcenter.exceptions import BaseVCenterException
+from cloudshell.cp.vcenter.handlers.dc_handler import DcHandler
+from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+from cloudshell.cp.vcenter.handlers.task import Task, TaskState
+from cloudshell.cp.vcenter.handlers.vm_handler import VmHandler, VmNotFound
+
+logger = logging.getLogger(__name__)
+
+
+class BulkCommandFailed(BaseVCenterException):
+    def __init__(self, failed: list[AppResult]):
+        self.failed = failed
+        errors = "; ".join(f"{r.app_name}: {r.error}" for r in failed)
+        super().__init__(f"Command failed for {len(failed)} App(s). {errors}")
+
+
+@define
+class AppResult:
+    app_name: str
+    success: bool = True
+    error: str | None = None
+
+
+@define
+class BulkResults:
+    """Per App results of a bulk command kept in the requested order."""
+
+    _results: dict[str, AppResult]
+
+    @classmethod
+    def from_names(cls, app_names: Iterable[str]) -> BulkResults:
+        return cls({name: AppResult(name) for name in app_names})
+
+    def __iter__(self):
+        return iter(self._results.values())
+
+    def fail(self, app_name: str, error: Exception | str) -> None:
+        logger.warning(f"Failed to process the App '{app_name}'. {error}")
+        result = self._results[app_name]
+        result.success = False
+        result.error = str(error)
+
+    def is_failed(self, app_name: str) -> bool:
+        return not self._results[app_name].success
+
+    def check_tasks(self, tasks: dict[str, Task]) -> None:
+        for app_name, task in tasks.items():
+            if task.state is TaskState.error:
+                self.fail(app_name, task.error_msg)
+
+    @property
+    def failed(self) -> list[AppResult]:
+        return [result for result in self if not result.success]
+
+    @property
+    def succeeded(self) -> list[str]:
+        return [result.app_name for result in self if result.success]
+
+    def raise_on_failures(self) -> None:
+        if self.failed:
+            raise BulkCommandFailed(self.failed)
+
+    def to_json(self) -> str:
+        return json.dumps([asdict(result) for result in self])
+
+
+def get_apps_vm_uuids(
+    cs_api: CloudShellAPISession, app_names: Iterable[str]
+) -> dict[str, str]:
+    return {name: cs_api.GetResourceDetails(name).VmDetails.UID for name in app_names}
+
+
+def find_vms_by_uuid(dc: DcHandler, vm_uuids: Iterable[str]) -> dict[str, VmHandler]:
+    """Find the VMs of the datacenter by UUIDs.
+
+    Every UUID is found with the search index by the instance UUID or by the BIOS
+    UUID, the searches run concurrently.
+    :return: found VMs by the requested UUIDs
+    """
+    vm_uuids = list(dict.fromkeys(vm_uuids))
+    if not vm_uuids:
+        return {}
+
+    def find(uuid: str) -> VmHandler | None:
+        with suppress(VmNotFound):
+            return dc.get_vm_by_uuid(uuid)
+        return None
+
+    workers = min(len(vm_uuids), settings.VM_SEARCH_WORKERS)
+    with ThreadPoolExecutor(workers) as executor:
+        found = dict(zip(vm_uuids, executor.map(find, vm_uuids)))
+    return {uuid: vm for uuid, vm in found.items() if vm is not None}
+
+
+def get_vms(
+    dc: DcHandler, vm_uuids: dict[str, str], results: BulkResults
+) -> dict[str, VmHandler]:
+    try:
+        found = find_vms_by_uuid(dc, vm_uuids.values())
+    except Exception as e:
+        for app_name in vm_uuids:
+            results.fail(app_name, e)
+        return {}
+    vms = {}
+    for app_name, vm_uuid in vm_uuids.items():
+        if vm_uuid in found:
+            vms[app_name] = found[vm_uuid]
+        else:
+            results.fail(app_name, VmNotFound(dc, uuid=vm_uuid))
+    return vms
+
+
+def run_tasks(
+    si: SiHandler,
+    start_task_funcs: dict[str, Callable[[], vim.Task | None]],
+    results: BulkResults,
+    limit: int = settings.BULK_TASKS_LIMIT,
+    cancellation_manager: CancellationContextManager | None = None,
+) -> dict[str, Task]:
+    """Run the tasks of the Apps, at most ``limit`` of them at once.
+
+    A start function returns None if there is nothing to do for the App.
+    Returns the tasks that succeeded.
+    """
+    names = list(start_task_funcs)
+    limit = max(limit, 1)
+    succeeded = {}
+    for i in range(0, len(names), limit):
+        vc_tasks = {}
+        for name in names[i : i + limit]:
+            try:
+                vc_task = start_task_funcs[name]()
+            except Exception as e:
+                results.fail(name, e)
+            else:
+                if vc_task is not None:
+                    vc_tasks[name] = vc_task
+        tasks = dict(
+            zip(
+                vc_tasks,
+                wait_for_tasks(si, vc_tasks.values(), cancellation_manager),
+            )
+        )
+        results.check_tasks(tasks)
+        succeeded.update(
+            {name: task for name, task in tasks.items() if not results.is_failed(name)}
+        )
+    return succeeded
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING, Union
+
+from attrs import define, evolve, field
+from cloudshell.api.cloudshell_api import CloudShellAPISession
+from cloudshell.shell.core.session.cloudshell_session import CloudShellSessionContext
+
+from driver_helpers import metrics, settings
+
+if TYPE_CHECKING:
+    from cloudshell.shell.core.driver_context import (
+        AutoLoadCommandContext,
+        InitCommandContext,
+        ResourceCommandContext,
+        ResourceRemoteCommandContext,
+        UnreservedResourceCommandContext,
+    )
+
+    from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+    CONTEXT_TYPES = Union[
+        AutoLoadCommandContext,
+        InitCommandContext,
+        ResourceCommandContext,
+        ResourceRemoteCommandContext,
+        UnreservedResourceCommandContext,
+    ]
+
+logger = logging.getLogger(__name__)
+
+CacheKey = tuple[str, str, str, str]
+
+# the domain of the commands without a reservation, e.g. Autoload
+DEFAULT_DOMAIN = "Global"
+
+
+def get_cache_key(context: CONTEXT_TYPES) -> CacheKey:
+    resource = context.resource
+    connectivity = context.connectivity
+    attrs = sorted((resource.attributes or {}).items())
+    # the token is new for every command, the API session is refreshed separately
+    attrs_hash = hashlib.sha256(repr(attrs).encode()).hexdigest()
+    return resource.name, connectivity.server_address, get_domain(context), attrs_hash
+
+
+def get_domain(context: CONTEXT_TYPES) -> str:
+    reservation = getattr(context, "reservation", None) or getattr(
+        context, "remote_reservation", None
+    )
+    return reservation.domain if reservation else DEFAULT_DOMAIN
+
+
+@define
+class _CacheEntry:
+    api: CloudShellAPISession
+    resource_config: VCenterResourceConfig
+    api_expires: float
+
+
+@define
+class ResourceContextCache:
+    """Cache of the parsed resource config and the CloudShell API session.
+
+    Parsing the resource config decrypts the password through the CloudShell API,
+    so it is done once per resource and attributes. When the resource attributes
+    change the key changes too and the old entries of the resource are dropped.
+    The API session is reused for the TTL and then opened again with the token of
+    the current command, the parsed config is kept.
+    """
+
+    ttl: float = settings.CONTEXT_CACHE_TTL
+    max_size: int = settings.CONTEXT_CACHE_SIZE
+    hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+    _lock: Lock = field(init=False, factory=Lock)
+    _entries: OrderedDict[CacheKey, _CacheEntry] = field(
+        init=False, factory=OrderedDict
+    )
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(
+        self, context: CONTEXT_TYPES
+    ) -> tuple[CloudShellAPISession, VCenterResourceConfig]:
+        with metrics.phase("resource_config"):
+            return self._get(context)
+
+    def _get(
+        self, context: CONTEXT_TYPES
+    ) -> tuple[CloudShellAPISession, VCenterResourceConfig]:
+        key = get_cache_key(context)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._log_stats()
+            else:
+                self.misses += 1
+
+        if entry and entry.api_expires > time.monotonic():
+            return entry.api, entry.resource_config
+
+        api = CloudShellSessionContext(context).get_api()
+        if entry:
+            resource_config = evolve(entry.resource_config, api=api)
+        else:
+            from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+            resource_config = VCenterResourceConfig.from_context(context, api=api)
+        entry = _CacheEntry(api, resource_config, time.monotonic() + self.ttl)
+
+        with self._lock:
+            self._drop_resource(key)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._log_stats()
+        return api, resource_config
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _drop_resource(self, key: CacheKey) -> None:
+        name, server_address, _, attrs_hash = key
+        for old_key in list(self._entries):
+            if old_key[:2] == (name, server_address) and old_key[3] != attrs_hash:
+                del self._entries[old_key]
+
+    def _log_stats(self) -> None:
+        logger.debug(
+            f"Resource context cache hits: {self.hits}, misses: {self.misses}, "
+            f"hit rate: {self.hit_rate:.0%}"
+        )
@@ -0,0 +1,129 @@
+"""Shared state of the Deploy commands running at the same time.
+
+CloudShell calls Deploy for every App of a sandbox concurrently. Apps cloned from
+the same source need the same lookups, the first Deploy prepares them and the
+others reuse the result. Clones are limited per datastore and per compute
+entity, so many Apps don't overload the same storage.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections import defaultdict
+from collections.abc import Callable, Hashable, Iterator
+from contextlib import ExitStack, contextmanager
+from threading import BoundedSemaphore, Lock
+from typing import Any, TypeVar
+
+from attrs import define, field
+from cloudshell.cp.core.cancellation_manager import CancellationContextManager
+
+from driver_helpers import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CANCELLATION_CHECK_INTERVAL = 1
+
+
+@define
+class SharedPreparation:
+    """Short-lived results of the preparation steps keyed by what they depend on.
+
+    Concurrent calls with the same key wait for the first one instead of
+    repeating the preparation. Failures are not stored.
+    """
+
+    ttl: float = settings.DEPLOY_PREPARATION_TTL
+    hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+    _lock: Lock = field(init=False, factory=Lock)
+    _key_locks: dict[Hashable, Lock] = field(init=False, factory=dict)
+    _entries: dict[Hashable, tuple[float, Any]] = field(init=False, factory=dict)
+
+    def get(
+        self,
+        key: Hashable,
+        prepare: Callable[[], T],
+        is_valid: Callable[[T], bool] | None = None,
+    ) -> T:
+        """Get the prepared value or prepare it.
+
+        :param is_valid: checks that the stored value can still be used
+        """
+        with self._lock:
+            self._drop_expired()
+            key_lock = self._key_locks.setdefault(key, Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and (is_valid is None or is_valid(entry[1])):
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            value = prepare()
+            with self._lock:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _drop_expired(self) -> None:
+        now = time.monotonic()
+        for key, (expires, _) in list(self._entries.items()):
+            if expires < now:
+                del self._entries[key]
+        for key, key_lock in list(self._key_locks.items()):
+            if key not in self._entries and not key_lock.locked():
+                del self._key_locks[key]
+
+
+@define
+class CloneLimits:
+    """Limits the number of clones running at once per datastore and per host."""
+
+    per_datastore: int = settings.DEPLOY_CLONES_PER_DATASTORE
+    per_host: int = settings.DEPLOY_CLONES_PER_HOST
+    _lock: Lock = field(init=False, factory=Lock)
+    _datastores: dict[Hashable, BoundedSemaphore] = field(init=False)
+    _hosts: dict[Hashable, BoundedSemaphore] = field(init=False)
+
+    @_datastores.default
+    def _datastores_default(self):
+        return defaultdict(lambda: BoundedSemaphore(self.per_datastore))
+
+    @_hosts.default
+    def _hosts_default(self):
+        return defaultdict(lambda: BoundedSemaphore(self.per_host))
+
+    @contextmanager
+    def slot(
+        self,
+        datastore_key: Hashable,
+        host_key: Hashable,
+        cancellation_manager: CancellationContextManager,
+    ) -> Iterator[None]:
+        """Wait for a free clone slot on the datastore and the host.
+
+        The datastore slot is always taken first, so waiting clones can't lock
+        each other.
+        """
+        with self._lock:
+            semaphores = (self._datastores[datastore_key], self._hosts[host_key])
+
+        with ExitStack() as stack:
+            for semaphore in semaphores:
+                while not semaphore.acquire(timeout=CANCELLATION_CHECK_INTERVAL):
+                    with cancellation_manager:
+                        pass
+                stack.callback(semaphore.release)
+            yield
+
+
+shared_preparation = SharedPreparation()
+clone_limits = CloneLimits()
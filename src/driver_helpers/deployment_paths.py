@@ -0,0 +1,56 @@
+"""Request actions with the deployment paths of the Shell registered.
+
+The deployment paths are registered when the request actions are used for the
+first time, so the driver doesn't load the App models when it starts.
+"""
+from __future__ import annotations
+
+from functools import cache
+
+from cloudshell.cp.vcenter.models.deploy_app import (
+    VCenterDeployVMRequestActions,
+    VMFromImageDeployApp,
+    VMFromLinkedCloneDeployApp,
+    VMFromTemplateDeployApp,
+    VMFromVMDeployApp,
+)
+from cloudshell.cp.vcenter.models.deployed_app import (
+    StaticVCenterDeployedApp,
+    VCenterDeployedVMActions,
+    VCenterGetVMDetailsRequestActions,
+    VMFromImageDeployedApp,
+    VMFromLinkedCloneDeployedApp,
+    VMFromTemplateDeployedApp,
+    VMFromVMDeployedApp,
+)
+
+
+@cache
+def get_deploy_request_actions() -> type[VCenterDeployVMRequestActions]:
+    for deploy_app_cls in (
+        VMFromVMDeployApp,
+        VMFromTemplateDeployApp,
+        VMFromLinkedCloneDeployApp,
+        VMFromImageDeployApp,
+    ):
+        VCenterDeployVMRequestActions.register_deployment_path(deploy_app_cls)
+    return VCenterDeployVMRequestActions
+
+
+@cache
+def get_deployed_vm_actions() -> type[VCenterDeployedVMActions]:
+    for deployed_app_cls in (
+        VMFromVMDeployedApp,
+        VMFromTemplateDeployedApp,
+        VMFromLinkedCloneDeployedApp,
+        VMFromImageDeployedApp,
+        StaticVCenterDeployedApp,
+    ):
+        VCenterDeployedVMActions.register_deployment_path(deployed_app_cls)
+    return VCenterDeployedVMActions
+
+
+def get_vm_details_request_actions() -> type[VCenterGetVMDetailsRequestActions]:
+    # VM details request shares the registered deployed App paths
+    get_deployed_vm_actions()
+    return VCenterGetVMDetailsRequestActions
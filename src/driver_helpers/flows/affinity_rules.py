@@ -0,0 +1,160 @@
+"""Adds VMs to many affinity rules at once.
+
+Cluster reconfigures are serialized by vCenter and slow, so all rule changes of
+the request are merged into one ClusterConfigSpecEx and applied with one
+reconfigure task.
+"""
+from __future__ import annotations
+
+import json
+import logging
+
+from attrs import define, field
+from pyVmomi import vim
+
+from driver_helpers.bulk import find_vms_by_uuid
+from driver_helpers.inventory_index import IndexedInventory
+from driver_helpers.property_collector import retrieve_properties
+from driver_helpers.task_waiter import wait_for_tasks
+
+from cloudshell.cp.vcenter.handlers.cluster_handler import ClusterHandler
+from cloudshell.cp.vcenter.handlers.cluster_specs import (
+    AffinityRule,
+    AffinityRuleNotFound,
+    AffinityRulesHasConflicts,
+    ClusterConfigSpec,
+)
+from cloudshell.cp.vcenter.handlers.dc_handler import DcHandler
+from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+from cloudshell.cp.vcenter.handlers.task import TaskFailed, TaskState
+from cloudshell.cp.vcenter.handlers.vm_handler import VmNotFound
+from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+logger = logging.getLogger(__name__)
+
+RULES_PATH = "configuration.rule"
+
+
+@define
+class AffinityRuleRequest:
+    vm_uuids: list[str]
+    # a new rule is created if the name is not set
+    affinity_rule_name: str | None = None
+
+
+def parse_affinity_rules_request(request: str) -> list[AffinityRuleRequest]:
+    """Parse the JSON list of rules.
+
+    Example: [{"affinity_rule_name": "web", "vm_uuids": ["uuid1", "uuid2"]}]
+    """
+    return [
+        AffinityRuleRequest(
+            vm_uuids=list(rule["vm_uuids"]),
+            affinity_rule_name=rule.get("affinity_rule_name") or None,
+        )
+        for rule in json.loads(request)
+    ]
+
+
+@define
+class BatchAffinityRulesFlow:
+    _si: SiHandler
+    _resource_config: VCenterResourceConfig
+    _reservation_id: str
+    _inventory: IndexedInventory = field(init=False)
+
+    def __attrs_post_init__(self):
+        self._inventory = IndexedInventory(self._si, self._resource_config)
+
+    def add_vms_to_affinity_rules(
+        self, requests: list[AffinityRuleRequest]
+    ) -> list[str]:
+        """Add the VMs to the rules with one cluster reconfigure.
+
+        Existing rules are updated, missing rules are created, rules without
+        a name get a new name based on the reservation ID. Requests for the same
+        rule are merged.
+        :return: names of the rules in the requested order
+        """
+        dc = self._inventory.get_dc()
+        cluster = self._get_cluster(dc)
+        vms = find_vms_by_uuid(dc, (uuid for r in requests for uuid in r.vm_uuids))
+        for request in requests:
+            for uuid in request.vm_uuids:
+                if uuid not in vms:
+                    raise VmNotFound(dc, uuid=uuid)
+
+        existing_rules = self._get_vc_rules(cluster)
+        rules: dict[str, AffinityRule] = {}
+        rule_names = []
+        for request in requests:
+            name = request.affinity_rule_name or self._get_new_rule_name(
+                existing_rules.keys() | rules.keys()
+            )
+            if name not in rules:
+                if vc_rule := existing_rules.get(name):
+                    rules[name] = AffinityRule.from_vcenter_rule(vc_rule, self._si)
+                else:
+                    rules[name] = AffinityRule(
+                        name=name, enabled=True, mandatory=True, vms=[]
+                    )
+            rules[name].add_vm(*(vms[uuid] for uuid in request.vm_uuids))
+            rule_names.append(name)
+
+        if rules:
+            logger.info(f"Updating {len(rules)} affinity rules in the {cluster}")
+            self._reconfigure(cluster, ClusterConfigSpec(rules=list(rules.values())))
+            self._check_rules_enabled(cluster, rules)
+        return rule_names
+
+    def _get_cluster(self, dc: DcHandler) -> ClusterHandler:
+        # affinity rules can be added only for cluster,
+        # compute resource is not supported
+        cluster_name = self._resource_config.vm_cluster
+        entity = self._inventory.get_compute_entity(dc, cluster_name)
+        if isinstance(entity, ClusterHandler):
+            return entity
+        return dc.get_cluster(cluster_name)
+
+    def _get_vc_rules(self, cluster: ClusterHandler) -> dict[str, vim.cluster.RuleInfo]:
+        # only the rules are retrieved, not the whole cluster configuration
+        vc_cluster = cluster.get_vc_obj()
+        props = retrieve_properties(
+            self._si, [vc_cluster], vim.ClusterComputeResource, [RULES_PATH]
+        )
+        vc_rules = props.get(vc_cluster, {}).get(RULES_PATH) or []
+        return {vc_rule.name: vc_rule for vc_rule in vc_rules}
+
+    def _get_new_rule_name(self, taken_names: set[str]) -> str:
+        name = self._reservation_id
+        index = 1
+        while name in taken_names:
+            name = f"{self._reservation_id} ({index})"
+            index += 1
+        return name
+
+    def _reconfigure(self, cluster: ClusterHandler, spec: ClusterConfigSpec) -> None:
+        # Required Privileges Host.Inventory.EditCluster
+        vc_task = cluster.get_vc_obj().ReconfigureEx(
+            spec.get_vc_obj(),
+            # if modify is False all skipped properties will be reset to default
+            modify=True,
+        )
+        (task,) = wait_for_tasks(self._si, [vc_task])
+        if task.state is not TaskState.success:
+            raise TaskFailed(task)
+
+    def _check_rules_enabled(
+        self, cluster: ClusterHandler, rules: dict[str, AffinityRule]
+    ) -> None:
+        # vCenter disables the rules that conflict with other rules
+        vc_rules = self._get_vc_rules(cluster)
+        not_enabled = []
+        for name in rules:
+            vc_rule = vc_rules.get(name)
+            if vc_rule is None:
+                raise AffinityRuleNotFound(name, cluster)
+            if not vc_rule.enabled:
+                not_enabled.append(AffinityRule.from_vcenter_rule(vc_rule, self._si))
+        if not_enabled:
+            raise AffinityRulesHasConflicts(not_enabled)
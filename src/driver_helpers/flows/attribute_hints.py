@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+
+import jsonpickle
+from cloudshell.cp.core.request_actions.models import (
+    ValidateAttributes,
+    ValidateAttributesResponse,
+)
+
+from driver_helpers.hints_cache import hints_cache
+from driver_helpers.si_pool import SiPool, get_vcenter_key
+
+from cloudshell.cp.vcenter.flows import validate_attributes as _validate_attributes
+from cloudshell.cp.vcenter.flows.get_attribute_hints.attribute_hints import (
+    AbstractAttributeHint,
+)
+from cloudshell.cp.vcenter.flows.get_attribute_hints.deployment_type_handlers import (
+    VMFromImageHintsHandler,
+    VMFromLinkedCloneHintsHandler,
+    VMFromTemplateHintsHandler,
+    VMFromVMHintsHandler,
+    get_handler,
+)
+from cloudshell.cp.vcenter.handlers.dc_handler import DcHandler
+from cloudshell.cp.vcenter.models.DeployDataHolder import DeployDataHolder
+from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+logger = logging.getLogger(__name__)
+
+HINTS_HANDLERS = (
+    VMFromVMHintsHandler,
+    VMFromTemplateHintsHandler,
+    VMFromLinkedCloneHintsHandler,
+    VMFromImageHintsHandler,
+)
+
+
+def _get_hint_class(
+    request: DeployDataHolder,
+) -> type[AbstractAttributeHint] | None:
+    handler = get_handler(request, None)
+    return next(
+        (
+            attr
+            for attr in handler.ATTRIBUTES
+            if request.AttributeName.endswith(f".{attr.ATTR_NAME}")
+        ),
+        None,
+    )
+
+
+def _get_parent_value(
+    request: DeployDataHolder, hint_cls: type[AbstractAttributeHint]
+) -> str | None:
+    """Value of the attribute the hints depend on."""
+    depends_on = getattr(hint_cls, "DEPENDS_ON", None)
+    if not depends_on:
+        return None
+    attribute_values = getattr(request, "AttributeValues", None) or []
+    return next(
+        (
+            attr.Values[0]
+            for attr in attribute_values
+            if attr.AttributeName.endswith(f".{depends_on}") and attr.Values
+        ),
+        None,
+    )
+
+
+def _load_hints(
+    si_pool: SiPool,
+    resource_conf: VCenterResourceConfig,
+    request: DeployDataHolder,
+    hint_cls: type[AbstractAttributeHint],
+) -> list[str]:
+    logger.info(f"Loading hints of the {hint_cls.ATTR_NAME}")
+    with si_pool.session(resource_conf) as si:
+        dc = DcHandler.get_dc(resource_conf.default_datacenter, si)
+        return hint_cls(request, dc).prepare_hints()["Values"]
+
+
+def get_hints(
+    si_pool: SiPool, resource_conf: VCenterResourceConfig, request: str
+) -> str:
+    """Same as the library's get_hints but the hints are cached.
+
+    Values are cached by the hint and the value of the attribute it depends on,
+    so they are shared by all deployment paths.
+    """
+    request = DeployDataHolder(jsonpickle.decode(request))
+    hint_cls = _get_hint_class(request)
+    response = []
+    if hint_cls:
+        key = get_vcenter_key(
+            resource_conf,
+            "hints",
+            hint_cls.__name__,
+            _get_parent_value(request, hint_cls),
+        )
+        values = hints_cache.get_or_load(
+            key, lambda: _load_hints(si_pool, resource_conf, request, hint_cls)
+        )
+        response.append(
+            {
+                "AttributeName": f"{request.DeploymentPath}.{hint_cls.ATTR_NAME}",
+                "Values": values,
+            }
+        )
+    return jsonpickle.encode(response, unpicklable=False)
+
+
+def validate_attributes(
+    si_pool: SiPool, resource_conf: VCenterResourceConfig, request: str
+) -> str:
+    """Same as the library's validate_attributes but successes are cached."""
+    action = ValidateAttributes.from_request(request)
+    key = get_vcenter_key(
+        resource_conf,
+        "validate",
+        action.deployment_path,
+        tuple(sorted((k, str(v)) for k, v in action.attributes.items())),
+    )
+
+    def validate() -> bool:
+        with si_pool.session(resource_conf) as si:
+            _validate_attributes(si, resource_conf, request)
+        return True
+
+    hints_cache.get_or_load(key, validate)
+    result = ValidateAttributesResponse(action.actionId)
+    return jsonpickle.encode(result, unpicklable=False)
+
+
+def prefetch_hints(
+    si_pool: SiPool, get_resource_conf: Callable[[], VCenterResourceConfig]
+) -> None:
+    """Load the hints that don't depend on other attributes, errors are logged."""
+    try:
+        _prefetch_hints(si_pool, get_resource_conf())
+    except Exception:
+        logger.warning("Failed to prefetch attribute hints", exc_info=True)
+
+
+def _prefetch_hints(si_pool: SiPool, resource_conf: VCenterResourceConfig) -> None:
+    hint_classes = {}
+    for handler in HINTS_HANDLERS:
+        for hint_cls in handler.ATTRIBUTES:
+            if not getattr(hint_cls, "DEPENDS_ON", None):
+                hint_classes.setdefault(hint_cls, handler.DEPLOYMENT_PATH)
+
+    with si_pool.session(resource_conf) as si:
+        dc = DcHandler.get_dc(resource_conf.default_datacenter, si)
+        for hint_cls, deployment_path in hint_classes.items():
+            request = DeployDataHolder(
+                {
+                    "DeploymentPath": deployment_path,
+                    "AttributeName": f"{deployment_path}.{hint_cls.ATTR_NAME}",
+                }
+            )
+            key = get_vcenter_key(resource_conf, "hints", hint_cls.__name__, None)
+            try:
+                hints_cache.get_or_load(
+                    key, lambda: hint_cls(request, dc).prepare_hints()["Values"]
+                )
+            except Exception:
+                logger.warning(
+                    f"Failed to prefetch hints of the {hint_cls.ATTR_NAME}",
+                    exc_info=True,
+                )
+    logger.info(f"Prefetched {len(hint_classes)} attribute hints")
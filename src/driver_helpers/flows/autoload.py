@@ -0,0 +1,180 @@
+"""Autoload that validates the resource config objects concurrently.
+
+Every check resolves the vCenter objects of a few resource attributes. Checks run
+at the same time after the datacenter is found. In the incremental mode
+fingerprints of the checked attributes are stored after a successful Autoload
+and the checks whose attributes didn't change are skipped next time. Checks that
+create the objects missing in the vCenter are never skipped.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from attrs import define
+from cloudshell.shell.core.driver_context import AutoLoadDetails
+
+from driver_helpers import settings
+from driver_helpers.inventory_index import IndexedInventory
+
+from cloudshell.cp.vcenter.actions.validation import ValidationActions
+from cloudshell.cp.vcenter.constants import DEPLOYED_APPS_FOLDER
+from cloudshell.cp.vcenter.flows.autoload import VCenterAutoloadFlow
+from cloudshell.cp.vcenter.handlers.cluster_handler import ClusterHandler
+from cloudshell.cp.vcenter.handlers.dc_handler import DcHandler
+from cloudshell.cp.vcenter.handlers.vcenter_path import VcenterPath
+from cloudshell.cp.vcenter.handlers.vcenter_tag_handler import VCenterTagsManager
+from cloudshell.cp.vcenter.handlers.vsphere_sdk_handler import VSphereSDKHandler
+
+logger = logging.getLogger(__name__)
+
+# resource config fields every check depends on
+CHECK_FIELDS = {
+    "cluster": ("vm_cluster", "vm_resource_pool"),
+    "holding_network": ("holding_network",),
+    "vm_storage": ("vm_storage",),
+    "saved_sandbox_storage": ("saved_sandbox_storage",),
+    "dv_switch": ("default_dv_switch", "vm_cluster"),
+}
+# checks that create the folder and the tag categories if they were deleted
+ALWAYS_CHECKED = ("deployed_apps_folder",)
+
+
+@define
+class ParallelAutoloadFlow(VCenterAutoloadFlow):
+    """Validates the resource config like VCenterAutoloadFlow but concurrently."""
+
+    incremental: bool = bool(settings.AUTOLOAD_INCREMENTAL)
+    state_dir: str = settings.AUTOLOAD_STATE_DIR
+
+    def discover(self) -> AutoLoadDetails:
+        validation_actions = ValidationActions(self._si, self._resource_config)
+        validation_actions.validate_resource_conf()
+
+        fingerprints = self._get_fingerprints()
+        stored = self._load_fingerprints() if self.incremental else {}
+        to_check = [
+            name for name in CHECK_FIELDS if stored.get(name) != fingerprints[name]
+        ]
+        skipped = set(CHECK_FIELDS) - set(to_check)
+        if skipped:
+            logger.info(f"Attributes of {', '.join(sorted(skipped))} didn't change")
+        to_check.extend(ALWAYS_CHECKED)
+
+        inventory = IndexedInventory(self._si, self._resource_config)
+        dc = inventory.get_dc()
+        self._run_checks(
+            {name: getattr(self, f"_check_{name}") for name in to_check},
+            dc,
+            inventory,
+        )
+        self._store_fingerprints(fingerprints)
+        return AutoLoadDetails([], [])
+
+    @staticmethod
+    def _run_checks(
+        checks: dict[str, Callable[[DcHandler, IndexedInventory], None]],
+        dc: DcHandler,
+        inventory: IndexedInventory,
+    ) -> None:
+        """Run the checks concurrently and raise the error of the first failed."""
+        logger.info(f"Validating {', '.join(checks)}")
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            futures = {
+                name: executor.submit(check, dc, inventory)
+                for name, check in checks.items()
+            }
+        errors = []
+        for name, future in futures.items():
+            if e := future.exception():
+                logger.error(f"Validation of the {name} failed: {e}")
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+    def _check_cluster(self, dc: DcHandler, inventory: IndexedInventory) -> None:
+        conf = self._resource_config
+        compute_entity = inventory.get_compute_entity(dc, conf.vm_cluster)
+        if isinstance(compute_entity, ClusterHandler):
+            ValidationActions.validate_cluster(compute_entity)
+        if conf.vm_resource_pool:
+            compute_entity.get_resource_pool(conf.vm_resource_pool)
+
+    def _check_holding_network(
+        self, dc: DcHandler, inventory: IndexedInventory
+    ) -> None:
+        dc.get_network(self._resource_config.holding_network)
+
+    def _check_vm_storage(self, dc: DcHandler, inventory: IndexedInventory) -> None:
+        inventory.get_datastore(dc, self._resource_config.vm_storage)
+
+    def _check_saved_sandbox_storage(
+        self, dc: DcHandler, inventory: IndexedInventory
+    ) -> None:
+        if self._resource_config.saved_sandbox_storage:
+            inventory.get_datastore(dc, self._resource_config.saved_sandbox_storage)
+
+    def _check_dv_switch(self, dc: DcHandler, inventory: IndexedInventory) -> None:
+        conf = self._resource_config
+        if conf.default_dv_switch:
+            compute_entity = inventory.get_compute_entity(dc, conf.vm_cluster)
+            validation_actions = ValidationActions(self._si, conf)
+            validation_actions._validate_switch(dc, compute_entity)
+
+    def _check_deployed_apps_folder(
+        self, dc: DcHandler, inventory: IndexedInventory
+    ) -> None:
+        """Validates VM location, creates the folder and the tag categories."""
+        dc.get_vm_folder(self._resource_config.vm_location)
+        deployed_apps_folder_path = VcenterPath(self._resource_config.vm_location)
+        deployed_apps_folder_path.append(DEPLOYED_APPS_FOLDER)
+        deployed_apps_folder = dc.get_or_create_vm_folder(deployed_apps_folder_path)
+
+        vsphere_client = VSphereSDKHandler.from_config(
+            resource_config=self._resource_config,
+            reservation_info=None,
+            si=self._si,
+        )
+        if vsphere_client is not None:
+            vsphere_client.create_categories()
+            tags = VCenterTagsManager.get_tags_created_by()
+            vsphere_client.assign_tags(deployed_apps_folder, tags)
+
+    def _get_fingerprints(self) -> dict[str, str]:
+        conf = self._resource_config
+        fingerprints = {}
+        for name, fields in CHECK_FIELDS.items():
+            values = [conf.address, conf.default_datacenter]
+            values.extend(str(getattr(conf, f)) for f in fields)
+            fingerprints[name] = hashlib.sha256(json.dumps(values).encode()).hexdigest()
+        return fingerprints
+
+    @property
+    def _state_path(self) -> str:
+        conf = self._resource_config
+        name = hashlib.sha256(f"{conf.name}/{conf.address}".encode()).hexdigest()
+        return os.path.join(self.state_dir, f"{name}.json")
+
+    def _load_fingerprints(self) -> dict[str, str]:
+        try:
+            with open(self._state_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception:
+            logger.warning("Failed to read Autoload fingerprints", exc_info=True)
+            return {}
+
+    def _store_fingerprints(self, fingerprints: dict[str, str]) -> None:
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            tmp_path = f"{self._state_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(fingerprints, f)
+            os.replace(tmp_path, self._state_path)
+        except Exception:
+            logger.warning("Failed to store Autoload fingerprints", exc_info=True)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from attrs import define
+from pyVmomi import vim
+
+from driver_helpers import settings
+from driver_helpers.bulk import BulkResults, get_vms, run_tasks
+from driver_helpers.inventory_index import IndexedInventory
+
+from cloudshell.cp.vcenter.flows.customize_guest_os import CustomSpecExists
+from cloudshell.cp.vcenter.handlers.config_spec_handler import ConfigSpecHandler
+from cloudshell.cp.vcenter.handlers.custom_spec_handler import (
+    create_custom_spec_from_spec_params,
+    get_custom_spec_from_vim_spec,
+)
+from cloudshell.cp.vcenter.handlers.si_handler import CustomSpecNotFound, SiHandler
+from cloudshell.cp.vcenter.handlers.vm_handler import VmHandler
+from cloudshell.cp.vcenter.models.custom_spec import get_custom_spec_params_from_json
+from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+from cloudshell.cp.vcenter.utils.customization_params import prepare_custom_spec
+
+logger = logging.getLogger(__name__)
+
+
+@define
+class BulkConfigureFlow:
+    """Reconfigures and customizes many VMs at once.
+
+    Requested changes are parsed and the source customization spec is read once.
+    Every VM gets one reconfigure task with all changes, at most
+    BULK_TASKS_LIMIT tasks or customizations run at once.
+    """
+
+    _si: SiHandler
+    _resource_config: VCenterResourceConfig
+
+    def reconfigure(
+        self,
+        vm_uuids: dict[str, str],
+        cpu: str | None,
+        ram: str | None,
+        hdd: str | None,
+    ) -> BulkResults:
+        """Changes CPU, RAM and disks of the VMs.
+
+        :param vm_uuids: VM UUIDs by deployed App names
+        """
+        config_spec = ConfigSpecHandler.from_strings(cpu, ram, hdd)
+        results = BulkResults.from_names(vm_uuids)
+        vms = get_vms(self._get_dc(), vm_uuids, results)
+
+        specs = {}
+        for name, vm in vms.items():
+            try:
+                specs[name] = config_spec.get_spec_for_vm(vm)
+            except Exception as e:
+                results.fail(name, e)
+
+        logger.info(f"Reconfiguring {len(specs)} VMs with {config_spec}")
+        run_tasks(
+            self._si,
+            {
+                name: partial(vms[name].get_vc_obj().ReconfigVM_Task, spec)
+                for name, spec in specs.items()
+            },
+            results,
+        )
+        return results
+
+    def customize_guest_os(
+        self,
+        vm_uuids: dict[str, str],
+        custom_spec_name: str,
+        custom_spec_params: str,
+        override_custom_spec: bool,
+    ) -> BulkResults:
+        """Prepares customization specs of the VMs applied on the next power on.
+
+        :param vm_uuids: VM UUIDs by deployed App names
+        """
+        results = BulkResults.from_names(vm_uuids)
+        vms = get_vms(self._get_dc(), vm_uuids, results)
+        spec_manager = self._si.get_vc_obj().content.customizationSpecManager
+        existing_specs = {info.name for info in spec_manager.info}
+        source_spec = None
+        if custom_spec_name:
+            try:
+                source_spec = spec_manager.GetCustomizationSpec(custom_spec_name)
+            except vim.fault.NotFound:
+                raise CustomSpecNotFound(custom_spec_name)
+
+        def customize(name: str) -> None:
+            vm = vms[name]
+            try:
+                self._customize_vm(
+                    vm,
+                    vm.name in existing_specs,
+                    custom_spec_name,
+                    source_spec,
+                    custom_spec_params,
+                    override_custom_spec,
+                )
+            except Exception as e:
+                results.fail(name, e)
+
+        logger.info(f"Preparing customization specs of {len(vms)} VMs")
+        with ThreadPoolExecutor(settings.BULK_TASKS_LIMIT) as executor:
+            list(executor.map(customize, vms))
+        return results
+
+    def _customize_vm(
+        self,
+        vm: VmHandler,
+        spec_exists: bool,
+        custom_spec_name: str,
+        source_spec: vim.CustomizationSpecItem | None,
+        custom_spec_params: str,
+        override_custom_spec: bool,
+    ) -> None:
+        """Same as customize_guest_os but with the source spec that is read once."""
+        spec_params = get_custom_spec_params_from_json(custom_spec_params, vm)
+        if spec_exists:
+            if override_custom_spec:
+                self._si.delete_customization_spec(vm.name)
+            elif custom_spec_name:
+                raise CustomSpecExists(custom_spec_name)
+            else:
+                # update the existing spec
+                prepare_custom_spec(spec_params, vm.name, vm, vm.name, self._si)
+                return
+
+        if source_spec:
+            vc_spec = copy.deepcopy(source_spec)
+            vc_spec.info.name = vm.name
+            vc_spec.info.changeVersion = None
+            vc_spec.info.lastUpdateTime = None
+            spec = get_custom_spec_from_vim_spec(vc_spec)
+        elif spec_params:
+            spec = create_custom_spec_from_spec_params(spec_params, vm.name)
+        else:
+            return
+
+        if spec_params:
+            spec.set_custom_spec_params(spec_params, len(vm.vnics))
+        self._si.create_customization_spec(spec)
+
+    def _get_dc(self):
+        return IndexedInventory(self._si, self._resource_config).get_dc()
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from functools import partial
+
+from attrs import define, field
+from cloudshell.cp.core.reservation_info import ReservationInfo
+from pyVmomi import vim
+
+from driver_helpers.bulk import BulkResults, run_tasks
+from driver_helpers.inventory_index import IndexedInventory
+
+from cloudshell.cp.vcenter.flows.connectivity_flow import network_lock
+from cloudshell.cp.vcenter.flows.delete_instance import folder_delete_lock
+from cloudshell.cp.vcenter.handlers.folder_handler import (
+    FolderHandler,
+    FolderIsNotEmpty,
+)
+from cloudshell.cp.vcenter.handlers.managed_entity_handler import ManagedEntityNotFound
+from cloudshell.cp.vcenter.handlers.network_handler import DVPortGroupHandler
+from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+from cloudshell.cp.vcenter.handlers.vm_handler import PowerState, VmHandler, VmNotFound
+from cloudshell.cp.vcenter.handlers.vsphere_sdk_handler import VSphereSDKHandler
+from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+from cloudshell.cp.vcenter.utils.connectivity_helpers import is_network_generated_name
+
+logger = logging.getLogger(__name__)
+
+
+@define
+class _CleanupTargets:
+    """Objects left after the VMs are deleted, collected before deleting them."""
+
+    tags: set[str] = field(factory=set)
+    folders: dict[str, FolderHandler] = field(factory=dict)
+    port_groups: dict[str, DVPortGroupHandler] = field(factory=dict)
+
+    def update(self, other: _CleanupTargets) -> None:
+        self.tags |= other.tags
+        self.folders.update(other.folders)
+        self.port_groups.update(other.port_groups)
+
+
+@define
+class BulkDeleteFlow:
+    """Deletes many deployed Apps at once.
+
+    Power off and destroy tasks of the VMs are started together, up to
+    BULK_TASKS_LIMIT at once. The reservation
+    folders, the DV port groups created by the Shell and the tags that are left
+    unused are cleaned up once after all VMs are deleted.
+    """
+
+    _si: SiHandler
+    _resource_config: VCenterResourceConfig
+    _reservation_info: ReservationInfo | None
+    _vsphere_client: VSphereSDKHandler | None = field(init=False)
+
+    def __attrs_post_init__(self):
+        self._vsphere_client = VSphereSDKHandler.from_config(
+            resource_config=self._resource_config,
+            reservation_info=self._reservation_info,
+            si=self._si,
+        )
+
+    def delete(self, vm_uuids: dict[str, str]) -> BulkResults:
+        """Deletes the VMs.
+
+        :param vm_uuids: VM UUIDs by deployed App names
+        """
+        results = BulkResults.from_names(vm_uuids)
+        vms = self._get_vms(vm_uuids, results)
+        targets = _CleanupTargets()
+        with ThreadPoolExecutor() as executor:
+            for vm_targets in executor.map(self._prepare_vm, vms.values()):
+                targets.update(vm_targets)
+
+        to_power_off = {
+            name: vm for name, vm in vms.items() if vm.power_state is not PowerState.OFF
+        }
+        logger.info(f"Powering off {len(to_power_off)} of {len(vms)} VMs")
+        run_tasks(
+            self._si,
+            {
+                name: partial(self._start_task, name, vm.get_vc_obj().PowerOff)
+                for name, vm in to_power_off.items()
+            },
+            results,
+        )
+
+        to_delete = {
+            name: vm for name, vm in vms.items() if not results.is_failed(name)
+        }
+        logger.info(f"Deleting {len(to_delete)} VMs")
+        run_tasks(
+            self._si,
+            {
+                name: partial(self._start_task, name, vm.get_vc_obj().Destroy_Task)
+                for name, vm in to_delete.items()
+            },
+            results,
+        )
+
+        self._cleanup(targets)
+        return results
+
+    def _get_vms(
+        self, vm_uuids: dict[str, str], results: BulkResults
+    ) -> dict[str, VmHandler]:
+        dc = IndexedInventory(self._si, self._resource_config).get_dc()
+        vms = {}
+        for name, vm_uuid in vm_uuids.items():
+            try:
+                vms[name] = dc.get_vm_by_uuid(vm_uuid)
+            except VmNotFound:
+                logger.warning(f"Trying to remove vm {vm_uuid} but it is not exists")
+            except Exception as e:
+                results.fail(name, e)
+        return vms
+
+    def _prepare_vm(self, vm: VmHandler) -> _CleanupTargets:
+        """Collects the objects to clean up, the VM is deleted anyway."""
+        targets = _CleanupTargets()
+        try:
+            folder = vm.parent
+            targets.folders[str(folder.get_vc_obj()._moId)] = folder
+            for vnic in vm.vnics:
+                network = vnic.network
+                if isinstance(
+                    network, DVPortGroupHandler
+                ) and is_network_generated_name(network.name):
+                    targets.port_groups[network.name] = network
+            self._si.delete_customization_spec(vm.name)
+            targets.tags |= self._get_tags(vm)
+        except Exception:
+            logger.warning(f"Failed to prepare the cleanup of the {vm}", exc_info=True)
+        return targets
+
+    @staticmethod
+    def _start_task(name: str, start_task: Callable[[], vim.Task]) -> vim.Task | None:
+        try:
+            return start_task()
+        except ManagedEntityNotFound:
+            logger.info(f"The VM of {name} is already deleted")
+            return None
+
+    def _cleanup(self, targets: _CleanupTargets) -> None:
+        tags = set(targets.tags)
+        for folder in targets.folders.values():
+            try:
+                tags |= self._delete_folder(folder)
+            except Exception:
+                logger.warning(f"Failed to delete the {folder}", exc_info=True)
+        for port_group in targets.port_groups.values():
+            try:
+                tags |= self._delete_port_group(port_group)
+            except Exception:
+                logger.warning(f"Failed to delete the {port_group}", exc_info=True)
+        if self._vsphere_client and tags:
+            self._vsphere_client.delete_unused_tags(tags)
+
+    def _delete_folder(self, folder: FolderHandler) -> set[str]:
+        tags = set()
+        with folder_delete_lock:
+            if folder.is_exists() and folder.is_empty():
+                tags |= self._get_tags(folder)
+                with suppress(FolderIsNotEmpty):
+                    folder.destroy()
+        return tags
+
+    def _delete_port_group(self, port_group: DVPortGroupHandler) -> set[str]:
+        """Deletes the port group if no VM is connected to it anymore."""
+        tags = set()
+        with network_lock.lock(port_group.name), suppress(ManagedEntityNotFound):
+            if not port_group.in_use:
+                tags |= self._get_tags(port_group)
+                port_group.destroy()
+        return tags
+
+    def _get_tags(self, obj) -> set[str]:
+        tags = set()
+        if self._vsphere_client:
+            tags |= set(self._vsphere_client.get_attached_tags(obj))
+        return tags
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import logging
+from functools import partial
+
+from attrs import define
+
+from driver_helpers.bulk import BulkResults, get_vms, run_tasks
+from driver_helpers.inventory_index import IndexedInventory
+
+from cloudshell.cp.vcenter.handlers.custom_spec_handler import CustomSpecHandler
+from cloudshell.cp.vcenter.handlers.si_handler import CustomSpecNotFound, SiHandler
+from cloudshell.cp.vcenter.handlers.vm_handler import PowerState, VmHandler
+from cloudshell.cp.vcenter.resource_config import ShutdownMethod, VCenterResourceConfig
+
+logger = logging.getLogger(__name__)
+
+
+@define
+class BulkPowerFlow:
+    """Powers many VMs at once.
+
+    Power tasks are started together, up to BULK_TASKS_LIMIT at once, and waited
+    together, so powering N VMs takes about the same time as powering one.
+    """
+
+    _si: SiHandler
+    _resource_config: VCenterResourceConfig
+
+    def power_on(self, vm_uuids: dict[str, str]) -> BulkResults:
+        """Powers on the VMs.
+
+        :param vm_uuids: VM UUIDs by deployed App names
+        """
+        results = BulkResults.from_names(vm_uuids)
+        vms = self._get_vms_to_switch(vm_uuids, results, PowerState.ON)
+
+        specs = self._get_customization_specs(vms, results)
+        run_tasks(
+            self._si,
+            {
+                name: partial(vms[name].get_vc_obj().CustomizeVM_Task, spec.spec.spec)
+                for name, spec in specs.items()
+            },
+            results,
+        )
+
+        tasks = run_tasks(
+            self._si,
+            {
+                name: vm.get_vc_obj().PowerOn
+                for name, vm in vms.items()
+                if not results.is_failed(name)
+            },
+            results,
+        )
+
+        for name, task in tasks.items():
+            if name in specs:
+                vm = vms[name]
+                try:
+                    vm.wait_for_customization_ready(task.complete_time)
+                    self._si.delete_customization_spec(vm.name)
+                except Exception as e:
+                    results.fail(name, e)
+        return results
+
+    def power_off(self, vm_uuids: dict[str, str]) -> BulkResults:
+        """Powers off the VMs.
+
+        :param vm_uuids: VM UUIDs by deployed App names
+        """
+        results = BulkResults.from_names(vm_uuids)
+        vms = self._get_vms_to_switch(vm_uuids, results, PowerState.OFF)
+
+        if self._resource_config.shutdown_method is ShutdownMethod.SOFT:
+            # guest shutdown doesn't return a task, nothing to wait for
+            for name, vm in vms.items():
+                try:
+                    vm.power_off(soft=True)
+                except Exception as e:
+                    results.fail(name, e)
+        else:
+            run_tasks(
+                self._si,
+                {name: vm.get_vc_obj().PowerOff for name, vm in vms.items()},
+                results,
+            )
+        return results
+
+    def _get_vms_to_switch(
+        self, vm_uuids: dict[str, str], results: BulkResults, power_state: PowerState
+    ) -> dict[str, VmHandler]:
+        dc = IndexedInventory(self._si, self._resource_config).get_dc()
+        vms = {}
+        for name, vm in get_vms(dc, vm_uuids, results).items():
+            if vm.power_state is power_state:
+                logger.info(f"The {vm} is already {power_state.value}")
+            else:
+                vms[name] = vm
+        return vms
+
+    def _get_customization_specs(
+        self, vms: dict[str, VmHandler], results: BulkResults
+    ) -> dict[str, CustomSpecHandler]:
+        specs = {}
+        for name, vm in vms.items():
+            try:
+                specs[name] = self._si.get_customization_spec(vm.name)
+            except CustomSpecNotFound:
+                logger.info(f"No VM Customization Spec found for the {vm}")
+            except Exception as e:
+                results.fail(name, e)
+        return specs
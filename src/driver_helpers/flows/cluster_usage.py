@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any
+
+from driver_helpers.inventory_index import IndexedInventory
+from driver_helpers.usage_sampler import usage_samplers
+
+from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+logger = logging.getLogger(__name__)
+
+
+def query_cluster_usage(
+    si: SiHandler,
+    resource_conf: VCenterResourceConfig,
+    datastore_name: str,
+) -> dict[str, Any]:
+    inventory = IndexedInventory(si, resource_conf)
+    dc = inventory.get_dc()
+    compute_entity = inventory.get_compute_entity(dc, resource_conf.vm_cluster)
+    datastore = inventory.get_datastore(dc, datastore_name)
+    logger.info(f"Found {compute_entity}")
+    return {
+        "datastore": datastore.usage_info.to_dict(),
+        "cpu": compute_entity.cpu_usage.to_dict(),
+        "ram": compute_entity.ram_usage.to_dict(),
+    }
+
+
+def get_cluster_usage(
+    si: SiHandler,
+    resource_conf: VCenterResourceConfig,
+    datastore_name: str,
+    force_refresh: bool = False,
+    history_size: int = 0,
+):
+    """Latest usage sample with its age and optionally the previous samples."""
+    datastore_name = datastore_name or resource_conf.vm_storage
+    sampler = usage_samplers.get(
+        resource_conf,
+        datastore_name,
+        lambda si_: query_cluster_usage(si_, resource_conf, datastore_name),
+    )
+    sample = sampler.get(si, force_refresh)
+    logger.info(f"Cluster usage sampled {sample.age:.1f}s ago")
+    result = sample.to_dict()
+    if history_size:
+        result["history"] = [s.to_dict() for s in sampler.history(history_size)]
+    return json.dumps(result)
@@ -0,0 +1,313 @@
+"""Connectivity flow that batches the vCenter changes.
+
+Missing DV port groups of one switch are created with one AddDVPortgroup task and
+all vNIC changes of one VM are applied with one ReconfigVM task. VMs are
+reconfigured concurrently.
+"""
+from __future__ import annotations
+
+import logging
+from collections.abc import Collection
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from cloudshell.shell.flows.connectivity.abstrace_flow import _get_response_emsg
+from cloudshell.shell.flows.connectivity.models.connectivity_model import (
+    get_vm_uuid,
+    get_vnic,
+    is_set_action,
+)
+from cloudshell.shell.flows.connectivity.models.driver_response import (
+    ConnectivityActionResult,
+)
+from pyVmomi import vim
+
+from cloudshell.cp.vcenter.exceptions import BaseVCenterException
+from cloudshell.cp.vcenter.flows.connectivity_flow import (
+    VCenterConnectivityFlow,
+    network_lock,
+)
+from cloudshell.cp.vcenter.handlers.network_handler import (
+    DVPortGroupHandler,
+    NetworkHandler,
+    NetworkNotFound,
+)
+from cloudshell.cp.vcenter.handlers.si_handler import CustomSpecNotFound
+from cloudshell.cp.vcenter.handlers.switch_handler import DvSwitchHandler, get_vlan_spec
+from cloudshell.cp.vcenter.handlers.task import Task
+from cloudshell.cp.vcenter.handlers.vm_handler import VmHandler
+from cloudshell.cp.vcenter.handlers.vnic_handler import Vnic, VnicWithMacNotFound
+from cloudshell.cp.vcenter.models.connectivity_action_model import (
+    VcenterConnectivityActionModel,
+)
+from cloudshell.cp.vcenter.utils.connectivity_helpers import NetworkSettings
+
+logger = logging.getLogger(__name__)
+
+MAX_VNICS = 10
+DV_PORT_GROUP_PORTS = 32
+
+
+def get_dv_port_group_spec(
+    net_settings: NetworkSettings,
+) -> vim.dvs.DistributedVirtualPortgroup.ConfigSpec:
+    """Same DV port group as DvSwitchHandler.create_port_group creates."""
+    dvs = vim.dvs.VmwareDistributedVirtualSwitch
+    port_conf_policy = dvs.VmwarePortConfigPolicy(
+        securityPolicy=dvs.SecurityPolicy(
+            allowPromiscuous=vim.BoolPolicy(value=net_settings.promiscuous_mode),
+            forgedTransmits=vim.BoolPolicy(value=net_settings.forged_transmits),
+            macChanges=vim.BoolPolicy(value=net_settings.mac_changes),
+            inherited=False,
+        ),
+        vlan=get_vlan_spec(net_settings.port_mode, net_settings.vlan_id),
+    )
+    return vim.dvs.DistributedVirtualPortgroup.ConfigSpec(
+        name=net_settings.name,
+        numPorts=DV_PORT_GROUP_PORTS,
+        type=vim.dvs.DistributedVirtualPortgroup.PortgroupType.earlyBinding,
+        defaultPortConfig=port_conf_policy,
+    )
+
+
+def get_connect_spec(
+    vnic: Vnic, network: NetworkHandler | DVPortGroupHandler
+) -> vim.vm.device.VirtualDeviceSpec:
+    if isinstance(network, NetworkHandler):
+        return vnic._create_spec_for_connecting_network(network)
+    return vnic._create_spec_for_connecting_dv_port_group(network)
+
+
+class BatchedConnectivityFlow(VCenterConnectivityFlow):
+    def pre_connectivity(
+        self,
+        actions: Collection[VcenterConnectivityActionModel],
+        executor: ThreadPoolExecutor,
+    ) -> None:
+        existed_pg_names = set()
+        dv_nets_to_create = {}  # {switch_name: {pg_name: net_settings}}
+        host_nets_to_create = {}  # {(pg_name, host_name): net_settings}
+
+        for action in filter(is_set_action, actions):
+            net_settings = self._get_network_settings(action)
+            if net_settings.existed:
+                existed_pg_names.add(net_settings.name)
+            elif isinstance(self._get_switch(net_settings), DvSwitchHandler):
+                switch_nets = dv_nets_to_create.setdefault(net_settings.switch_name, {})
+                switch_nets[net_settings.name] = net_settings
+            else:
+                # for VSwitch creates a port group on every host that is used by VM
+                vm = self.get_target(action)
+                key = (net_settings.name, vm.host.name)
+                host_nets_to_create[key] = net_settings
+
+        # check that existed networks exist
+        self._networks.update(
+            {n: self._networks_watcher.get_network(n) for n in existed_pg_names}
+        )
+
+        # create networks
+        dv_nets = [list(nets.values()) for nets in dv_nets_to_create.values()]
+        futures = [
+            executor.submit(self._get_or_create_dv_port_groups, nets)
+            for nets in dv_nets
+        ]
+        futures.extend(
+            executor.submit(self._get_or_create_network, net_settings)
+            for net_settings in host_nets_to_create.values()
+        )
+        for future in futures:
+            future.result()
+
+    def _get_or_create_dv_port_groups(self, nets: list[NetworkSettings]) -> None:
+        """Get or create DV port groups of one DvSwitch."""
+        switch = self._get_switch(nets[0])
+        with ExitStack() as stack:
+            # sorted to avoid deadlocks with other commands
+            for name in sorted(net.name for net in nets):
+                stack.enter_context(network_lock.lock(name))
+
+            missing = []
+            for net_settings in nets:
+                if net_settings.exclusive:
+                    self._clear_networks_for_exclusive(net_settings)
+                else:
+                    self._clear_exclusive_networks(net_settings)
+                try:
+                    network = self._networks_watcher.get_network(net_settings.name)
+                except NetworkNotFound:
+                    missing.append(net_settings)
+                else:
+                    self._networks[net_settings.name] = network
+
+            if missing:
+                self._create_dv_port_groups(switch, missing)
+
+    def _create_dv_port_groups(
+        self, switch: DvSwitchHandler, nets: list[NetworkSettings]
+    ) -> None:
+        logger.info(f"Creating {len(nets)} dv port groups on the {switch}")
+        try:
+            vc_task = switch.get_vc_obj().AddDVPortgroup_Task(
+                list(map(get_dv_port_group_spec, nets))
+            )
+            Task(vc_task).wait()
+        except Exception:
+            # one of the port groups could be created by another command
+            logger.warning(
+                f"Failed to create dv port groups on the {switch} at once, "
+                "creating them one by one",
+                exc_info=True,
+            )
+            for net_settings in nets:
+                try:
+                    network = self._networks_watcher.get_network(net_settings.name)
+                except NetworkNotFound:
+                    network = self._create_network(switch, net_settings)
+                self._networks[net_settings.name] = network
+        else:
+            for net_settings in nets:
+                network = self._networks_watcher.wait_appears(net_settings.name)
+                self._add_tags(network)
+                self._networks[net_settings.name] = network
+
+    def _prepare_set_actions(
+        self, actions: Collection[VcenterConnectivityActionModel]
+    ) -> list[tuple[VcenterConnectivityActionModel, ...]]:
+        """One group of actions for every VM.
+
+        Existing vNICs first and new vNICs in the right order.
+        """
+        groups = {}
+        for group in super()._prepare_set_actions(actions):
+            groups.setdefault(get_vm_uuid(group[0]), []).extend(group)
+        return list(map(tuple, groups.values()))
+
+    def _prepare_remove_actions(
+        self, actions: Collection[VcenterConnectivityActionModel]
+    ) -> list[tuple[VcenterConnectivityActionModel, ...]]:
+        """One group of actions for every VM."""
+        groups = {}
+        for (action,) in super()._prepare_remove_actions(actions):
+            groups.setdefault(get_vm_uuid(action), []).append(action)
+        return list(map(tuple, groups.values()))
+
+    def set_vlans(self, actions: Collection[VcenterConnectivityActionModel]) -> None:
+        vm = self.get_target(actions[0])
+        try:
+            vnic_networks = [
+                (
+                    get_vnic(action),
+                    self._networks[self._get_network_settings(action).name],
+                )
+                for action in actions
+            ]
+            macs = self._connect_vnics(vm, vnic_networks)
+        except Exception as e:
+            self._fail_actions(actions, e)
+        else:
+            for action, mac in zip(actions, macs):
+                self._add_result(
+                    ConnectivityActionResult.success_result(action, iface=mac)
+                )
+
+    def remove_vlans(self, actions: Collection[VcenterConnectivityActionModel]) -> None:
+        vm = self.get_target(actions[0])
+        if not isinstance(vm, VmHandler):
+            # remove_vlan skips disconnecting vNICs of deleted VMs
+            for action in actions:
+                self._execute_actions(self.remove_vlan, (action,))
+            return
+
+        vnics = {vnic.mac_address: vnic for vnic in vm.vnics}
+        actions_to_run = []
+        for action in actions:
+            mac = action.connector_attrs.interface.upper()
+            if mac in vnics:
+                actions_to_run.append(action)
+            else:
+                self._fail_actions((action,), VnicWithMacNotFound(mac, vm))
+
+        macs = {a.connector_attrs.interface.upper() for a in actions_to_run}
+        specs = [get_connect_spec(vnics[mac], self._holding_network) for mac in macs]
+        if not specs:
+            return
+
+        logger.info(f"Disconnecting {len(specs)} vNICs of the {vm}")
+        try:
+            vm._reconfigure(vim.vm.ConfigSpec(deviceChange=specs))
+        except Exception as e:
+            self._fail_actions(actions_to_run, e)
+        else:
+            for action in actions_to_run:
+                mac = action.connector_attrs.interface.upper()
+                self._add_result(
+                    ConnectivityActionResult.success_result(action, iface=mac)
+                )
+
+    def _connect_vnics(
+        self,
+        vm: VmHandler,
+        vnic_networks: list[tuple[str, NetworkHandler | DVPortGroupHandler]],
+    ) -> list[str]:
+        """Connect the vNICs to the networks with one reconfigure task.
+
+        Returns MAC addresses of the vNICs.
+        """
+        vnics = {vnic.index: vnic for vnic in vm.vnics}
+        new_indexes = [int(i) for i, _ in vnic_networks if int(i) not in vnics]
+        if len(vnics) + len(new_indexes) > MAX_VNICS:
+            raise BaseVCenterException(f"Limit of vNICs per VM is {MAX_VNICS}")
+
+        specs = []
+        for vnic_index, network in vnic_networks:
+            vnic = vnics.get(int(vnic_index))
+            if vnic is None:
+                vnic = self._create_vnic(vm, vnics)
+                # new devices need unique temporary keys
+                vnic.get_vc_obj().key = -len(specs) - 1
+            logger.info(f"Connecting {network} to the {vm}.{vnic_index} iface")
+            specs.append(get_connect_spec(vnic, network))
+
+        vm._reconfigure(vim.vm.ConfigSpec(deviceChange=specs))
+        if new_indexes:
+            self._add_vnics_to_custom_spec(vm, len(new_indexes))
+
+        # vCenter gives the new vNICs keys in the order they were added
+        new_vnics = sorted(
+            (vnic for vnic in vm.vnics if vnic.index not in vnics), key=lambda v: v.key
+        )
+        vnics.update(zip(new_indexes, new_vnics))
+        return [vnics[int(vnic_index)].mac_address for vnic_index, _ in vnic_networks]
+
+    @staticmethod
+    def _create_vnic(vm: VmHandler, vnics: dict[int, Vnic]) -> Vnic:
+        try:
+            return next(iter(vnics.values()))._create_new_vnic_same_type()
+        except StopIteration:
+            return vm.vnic_class(vim.vm.device.VirtualEthernetCard())
+
+    @staticmethod
+    def _add_vnics_to_custom_spec(vm: VmHandler, number: int) -> None:
+        try:
+            custom_spec = vm.si.get_customization_spec(vm.name)
+        except CustomSpecNotFound:
+            return
+        # we need to have the same number of interfaces on the VM and in the
+        # customization spec
+        if custom_spec.number_of_vnics > 0:
+            logger.info(f"Adding {number} vNICs to the customization spec of {vm}")
+            for _ in range(number):
+                custom_spec.add_new_vnic()
+            vm.si.overwrite_customization_spec(custom_spec)
+
+    def _fail_actions(
+        self, actions: Collection[VcenterConnectivityActionModel], e: Exception
+    ) -> None:
+        for action in actions:
+            emsg = _get_response_emsg(action, e)
+            logger.error(emsg)
+            self._add_result(ConnectivityActionResult.fail_result(action, emsg))
+
+    def _add_result(self, result: ConnectivityActionResult) -> None:
+        self.results[result.actionId].append(result)
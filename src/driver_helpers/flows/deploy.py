@@ -0,0 +1,680 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import time
+import uuid
+from collections.abc import Callable
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from cloudshell.cp.core.cancellation_manager import CancellationContextManager
+from cloudshell.cp.core.request_actions.models import DeployAppResult
+from cloudshell.cp.core.rollback import RollbackCommand, RollbackCommandsManager
+from pyVmomi import vim
+
+from driver_helpers import settings
+from driver_helpers.deploy_pipeline import clone_limits, shared_preparation
+from driver_helpers.inventory_index import IndexedInventory
+from driver_helpers.ovf_import import (
+    OvfImporter,
+    OvfImportOptions,
+    get_native_import_options,
+)
+from driver_helpers.property_collector import rebind, retrieve_properties
+from driver_helpers.si_pool import get_vcenter_key
+from driver_helpers.standby_pool import (
+    StandbyPool,
+    StandbySource,
+    get_claimed_vm_spec,
+    get_standby_folder_path,
+    standby_pools,
+)
+from driver_helpers.task_waiter import wait_for_tasks
+
+from cloudshell.cp.vcenter.actions.validation import ValidationActions
+from cloudshell.cp.vcenter.flows.deploy_vm import (
+    VCenterDeployVMFromImageFlow,
+    VCenterDeployVMFromLinkedCloneFlow,
+    VCenterDeployVMFromTemplateFlow,
+    VCenterDeployVMFromVMFlow,
+)
+from cloudshell.cp.vcenter.flows.deploy_vm.base_flow import AbstractVCenterDeployVMFlow
+from cloudshell.cp.vcenter.flows.deploy_vm.commands import CloneVMCommand
+from cloudshell.cp.vcenter.handlers.config_spec_handler import ConfigSpecHandler
+from cloudshell.cp.vcenter.handlers.datastore_handler import DatastoreHandler
+from cloudshell.cp.vcenter.handlers.dc_handler import DcHandler
+from cloudshell.cp.vcenter.handlers.folder_handler import (
+    FolderHandler,
+    FolderIsNotEmpty,
+)
+from cloudshell.cp.vcenter.handlers.resource_pool import ResourcePoolHandler
+from cloudshell.cp.vcenter.handlers.snapshot_handler import SnapshotHandler
+from cloudshell.cp.vcenter.handlers.task import (
+    ON_TASK_PROGRESS_TYPE,
+    Task,
+    TaskFailed,
+    TaskState,
+)
+from cloudshell.cp.vcenter.handlers.vcenter_path import VcenterPath
+from cloudshell.cp.vcenter.handlers.vm_handler import VmHandler
+from cloudshell.cp.vcenter.models import deploy_app
+from cloudshell.cp.vcenter.models.deploy_app import (
+    BaseVCenterDeployApp,
+    VCenterDeployVMRequestActions,
+    VMFromImageDeployApp,
+)
+
+logger = logging.getLogger(__name__)
+
+# unfinished imports of the image templates have it in the name
+IMPORTING_MARK = "-importing-"
+
+
+class ClaimStandbyVMCommand(RollbackCommand):
+    """Moves the claimed standby VM to the sandbox folder and renames it."""
+
+    def __init__(
+        self,
+        rollback_manager: RollbackCommandsManager,
+        cancellation_manager: CancellationContextManager,
+        vm: VmHandler,
+        vm_name: str,
+        vm_folder: FolderHandler,
+        config_spec: ConfigSpecHandler,
+        on_task_progress: ON_TASK_PROGRESS_TYPE | None = None,
+    ):
+        super().__init__(rollback_manager, cancellation_manager)
+        self._vm = vm
+        self._vm_name = vm_name
+        self._vm_folder = vm_folder
+        self._config_spec = config_spec
+        self._on_task_progress = on_task_progress
+
+    def _execute(self) -> VmHandler:
+        try:
+            self._vm_folder.put_inside(self._vm)
+            spec = get_claimed_vm_spec(self._vm_name)
+            Task(self._vm.get_vc_obj().ReconfigVM_Task(spec)).wait()
+            self._vm.reconfigure_vm(self._config_spec, self._on_task_progress)
+        except Exception:
+            self._vm.delete()
+            raise
+        return self._vm
+
+    def rollback(self):
+        self._vm.delete()
+        with suppress(FolderIsNotEmpty):
+            self._vm_folder.destroy()
+
+
+class ImportVMCommand(RollbackCommand):
+    """Imports the image to a new VM without the OVF Tool."""
+
+    def __init__(
+        self,
+        rollback_manager: RollbackCommandsManager,
+        cancellation_manager: CancellationContextManager,
+        import_vm: Callable[[], VmHandler],
+    ):
+        super().__init__(rollback_manager, cancellation_manager)
+        self._import_vm = import_vm
+        self._vm: VmHandler | None = None
+
+    def _execute(self) -> VmHandler:
+        self._vm = self._import_vm()
+        return self._vm
+
+    def rollback(self):
+        if self._vm:
+            self._vm.delete()
+
+
+def get_image_template_name(
+    image: str, placement_key: tuple, version_key: tuple
+) -> str:
+    """Name of the template of the image version, e.g. ``ubuntu-1a2b3c-4d5e6f7a8b9c``.
+
+    Templates of all versions of the image on the same placement share
+    the name up to the version hash.
+    """
+    placement_hash = hashlib.sha1(repr(placement_key).encode()).hexdigest()[:6]
+    version_hash = hashlib.sha1(repr(version_key).encode()).hexdigest()[:12]
+    image_name = os.path.splitext(os.path.basename(image))[0]
+    # the name of the unfinished import is longer, the limit is 80 characters
+    return f"{image_name[:40]}-{placement_hash}-{version_hash}"
+
+
+def get_source_key(app: BaseVCenterDeployApp) -> tuple[str, str, str]:
+    """Apps with the same source key are cloned from the same VM or image."""
+    source = (
+        getattr(app, "vcenter_template", None)
+        or getattr(app, "vcenter_vm", None)
+        or getattr(app, "vcenter_image", None)
+    )
+    snapshot = getattr(app, "vcenter_vm_snapshot", None)
+    return type(app).__name__, source or "", snapshot or ""
+
+
+class SharedPlacementMixin(AbstractVCenterDeployVMFlow):
+    """Shares validation, placement lookups and the folder between Deploys.
+
+    Clones wait for a free slot on their datastore and cluster and report their
+    progress.
+    """
+
+    def _deploy(
+        self, request_actions: VCenterDeployVMRequestActions
+    ) -> DeployAppResult:
+        conf = self._resource_config
+        # noinspection PyTypeChecker
+        app: BaseVCenterDeployApp = request_actions.deploy_app
+        start = time.monotonic()
+
+        with self._cancellation_manager:
+            self._validate_deploy_app(app)
+
+        if app.autogenerated_name:
+            vm_name = self.generate_name(app.app_name)
+        else:
+            vm_name = app.app_name
+        logger.info(f"Generated name for the VM: {vm_name}")
+
+        vm_folder_path = self._prepare_vm_folder_path(app)
+        logger.info(f"Prepared folder for the VM: {vm_folder_path}")
+
+        with self._cancellation_manager:
+            dc = IndexedInventory(self._si, conf).get_dc()
+
+        with self._cancellation_manager:
+            vm_resource_pool = self._get_vm_resource_pool(app, dc)
+        logger.info(f"Received VM resource pool: {vm_resource_pool}")
+
+        vm_storage_name = app.vm_storage or conf.vm_storage
+        with self._cancellation_manager:
+            vm_storage = self._get_vm_storage(vm_storage_name, dc)
+
+        with self._rollback_manager:
+            vm_folder = self._get_or_create_vm_folder(vm_folder_path, dc)
+
+            self._on_task_progress = self._get_progress_reporter(vm_name)
+            create_start = time.monotonic()
+            deployed_vm = self._claim_standby_vm(
+                app, vm_name, vm_resource_pool, vm_storage, vm_folder, dc
+            )
+            if deployed_vm is None:
+                logger.info(f"Waiting for a free slot to create VM {vm_name}")
+                with clone_limits.slot(
+                    self._key("datastore", vm_storage_name),
+                    self._key("host", app.vm_cluster or conf.vm_cluster),
+                    self._cancellation_manager,
+                ):
+                    create_start = time.monotonic()
+                    logger.info(
+                        f"Creating VM {vm_name}, "
+                        f"prepared in {create_start - start:.1f}s"
+                    )
+                    deployed_vm = self._create_vm(
+                        deploy_app=app,
+                        vm_name=vm_name,
+                        vm_resource_pool=vm_resource_pool,
+                        vm_storage=vm_storage,
+                        vm_folder=vm_folder,
+                        dc=dc,
+                    )
+            logger.info(
+                f"VM {vm_name} created in {time.monotonic() - create_start:.1f}s"
+            )
+            self._add_tags(deployed_vm, vm_folder)
+
+        logger.info(f"Preparing Deploy App result for the {deployed_vm}")
+        return self._prepare_deploy_app_result(
+            deployed_vm=deployed_vm,
+            deploy_app=app,
+            vm_name=vm_name,
+        )
+
+    def _key(self, *parts: Any) -> tuple:
+        return get_vcenter_key(self._resource_config, *parts)
+
+    def _claim_standby_vm(
+        self,
+        app: BaseVCenterDeployApp,
+        vm_name: str,
+        vm_resource_pool: ResourcePoolHandler,
+        vm_storage: DatastoreHandler,
+        vm_folder: FolderHandler,
+        dc: DcHandler,
+    ) -> VmHandler | None:
+        """Get a ready VM instead of creating it, if there is one."""
+        return None
+
+    def _get_progress_reporter(self, vm_name: str) -> ON_TASK_PROGRESS_TYPE:
+        check_if_cancelled = self._on_task_progress
+
+        def on_progress(task: Task, progress: Any) -> None:
+            if progress is not None:
+                logger.info(f"Creating VM {vm_name}: {task} is {progress}% done")
+            check_if_cancelled(task, progress)
+
+        return on_progress
+
+    def _validate_deploy_app(self, app: BaseVCenterDeployApp) -> None:
+        conf = self._resource_config
+        validate = super()._validate_deploy_app
+        key = self._key(
+            "validation",
+            *get_source_key(app),
+            app.vm_location or conf.vm_location,
+            app.vm_cluster or conf.vm_cluster,
+            app.vm_storage or conf.vm_storage,
+        )
+        shared_preparation.get(key, lambda: validate(app))
+
+    def _get_vm_resource_pool(
+        self, app: BaseVCenterDeployApp, dc: DcHandler
+    ) -> ResourcePoolHandler:
+        conf = self._resource_config
+        get_resource_pool = super()._get_vm_resource_pool
+        key = self._key(
+            "resource pool",
+            app.vm_cluster or conf.vm_cluster,
+            app.vm_resource_pool or conf.vm_resource_pool,
+        )
+        vc_pool = shared_preparation.get(
+            key, lambda: get_resource_pool(app, dc).get_vc_obj()
+        )
+        return ResourcePoolHandler(rebind(vc_pool, self._si), self._si)
+
+    def _get_vm_storage(self, name: str, dc: DcHandler) -> DatastoreHandler:
+        def get_datastore():
+            datastore = IndexedInventory(self._si, conf).get_datastore(dc, name)
+            # a datastore of the datastore cluster is picked for every VM
+            from_cluster = datastore.name != VcenterPath(name).name
+            return datastore.get_vc_obj(), from_cluster
+
+        conf = self._resource_config
+        logger.info(f"Getting VM storage {name}")
+        vc_datastore, _ = shared_preparation.get(
+            self._key("datastore", name),
+            get_datastore,
+            is_valid=lambda value: not value[1],
+        )
+        return DatastoreHandler(rebind(vc_datastore, self._si), self._si)
+
+    def _get_or_create_vm_folder(
+        self, folder_path: VcenterPath, dc: DcHandler
+    ) -> FolderHandler:
+        get_or_create = super()._get_or_create_vm_folder
+        vc_folder = shared_preparation.get(
+            self._key("folder", str(folder_path)),
+            lambda: get_or_create(folder_path, dc).get_vc_obj(),
+            # the folder is removed if the first VM inside it fails to deploy
+            is_valid=lambda vc_obj: self._get_folder(vc_obj).is_exists(),
+        )
+        return self._get_folder(vc_folder)
+
+    def _get_folder(self, vc_folder) -> FolderHandler:
+        return FolderHandler(rebind(vc_folder, self._si), self._si)
+
+
+class SharedSourceMixin(SharedPlacementMixin):
+    """Shares the source VM and snapshot lookups between Deploys."""
+
+    def _get_vm_template(self, app: BaseVCenterDeployApp, dc: DcHandler) -> VmHandler:
+        get_template = super()._get_vm_template
+        _, source, _ = get_source_key(app)
+        vc_vm = shared_preparation.get(
+            self._key("source", source),
+            lambda: get_template(app, dc).get_vc_obj(),
+        )
+        return VmHandler(rebind(vc_vm, self._si), self._si)
+
+    def _get_vm_snapshot(
+        self, app: BaseVCenterDeployApp, vm_template: VmHandler
+    ) -> SnapshotHandler | None:
+        get_snapshot = super()._get_vm_snapshot
+        _, source, snapshot = get_source_key(app)
+        if not snapshot:
+            return get_snapshot(app, vm_template)
+
+        vc_snapshot = shared_preparation.get(
+            self._key("snapshot", source, snapshot),
+            lambda: get_snapshot(app, vm_template).get_vc_obj(),
+        )
+        return SnapshotHandler(rebind(vc_snapshot, self._si))
+
+
+class StandbyPoolMixin(SharedSourceMixin):
+    """Claims linked clones from the standby pool of the source snapshot."""
+
+    def _claim_standby_vm(
+        self,
+        app: BaseVCenterDeployApp,
+        vm_name: str,
+        vm_resource_pool: ResourcePoolHandler,
+        vm_storage: DatastoreHandler,
+        vm_folder: FolderHandler,
+        dc: DcHandler,
+    ) -> VmHandler | None:
+        if not standby_pools.enabled:
+            return None
+
+        conf = self._resource_config
+        with self._cancellation_manager:
+            vm_template = self._get_vm_template(app, dc)
+            snapshot = self._get_vm_snapshot(app, vm_template)
+
+        key = self._key(
+            "standby",
+            *get_source_key(app),
+            vm_resource_pool.get_vc_obj()._moId,
+            vm_storage.get_vc_obj()._moId,
+        )
+        # the pool folder is of the snapshot, the pool is drained when it changes
+        folder_key = (key, snapshot.get_vc_obj()._moId)
+        source = StandbySource(
+            vc_vm=vm_template.get_vc_obj(),
+            vc_snapshot=snapshot.get_vc_obj(),
+            vc_resource_pool=vm_resource_pool.get_vc_obj(),
+            vc_datastore=vm_storage.get_vc_obj(),
+            folder_path=get_standby_folder_path(
+                app.vm_location or conf.vm_location, folder_key
+            ),
+            datastore_key=self._key("datastore", app.vm_storage or conf.vm_storage),
+            host_key=self._key("host", app.vm_cluster or conf.vm_cluster),
+        )
+        pool = standby_pools.get(
+            key,
+            source,
+            lambda: StandbyPool(
+                vm_template.name, conf, source, size=standby_pools.size
+            ),
+        )
+        vm = pool.claim(self._si)
+        standby_pools.refill_soon()
+        if vm is None:
+            return None
+
+        with self._cancellation_manager:
+            self._create_vm_customization_spec(app, vm_template, vm_name)
+
+        config_spec = ConfigSpecHandler.from_deploy_add(app)
+        if app.copy_source_uuid:
+            config_spec.bios_uuid = vm_template.bios_uuid
+
+        return ClaimStandbyVMCommand(
+            rollback_manager=self._rollback_manager,
+            cancellation_manager=self._cancellation_manager,
+            vm=vm,
+            vm_name=vm_name,
+            vm_folder=vm_folder,
+            config_spec=config_spec,
+            on_task_progress=self._on_task_progress,
+        ).execute()
+
+
+class NativeImageImportMixin(SharedPlacementMixin):
+    """Imports local OVF/OVA images without the OVF Tool.
+
+    With the image templates the image is imported once per resource pool and
+    datastore as a template in the image templates folder and the Apps are cloned
+    from it. The template of a changed image file is imported again and the
+    template of the previous file is deleted.
+    """
+
+    def _get_import_options(self, app: VMFromImageDeployApp) -> OvfImportOptions | None:
+        args = tuple(app.vcenter_image_arguments)
+        return shared_preparation.get(
+            self._key("ovf import options", app.vcenter_image, args),
+            lambda: get_native_import_options(app.vcenter_image, list(args)),
+        )
+
+    def _get_importer(self) -> OvfImporter:
+        return OvfImporter(self._si, self._resource_config, self._cancellation_manager)
+
+    def _get_import_progress_reporter(self, vm_name: str) -> Callable[[int], None]:
+        def on_progress(percent: int) -> None:
+            logger.info(f"Importing VM {vm_name}: {percent}% uploaded")
+
+        return on_progress
+
+    def _validate_deploy_app(self, app: VMFromImageDeployApp) -> None:
+        if self._get_import_options(app) is None:
+            return super()._validate_deploy_app(app)
+
+        def validate():
+            # the OVF Tool isn't validated, it's not used
+            AbstractVCenterDeployVMFlow._validate_deploy_app(self, app)
+            ValidationActions(self._si, conf).validate_deploy_app_from_image(app)
+
+        conf = self._resource_config
+        key = self._key(
+            "native import validation",
+            *get_source_key(app),
+            app.vm_location or conf.vm_location,
+            app.vm_cluster or conf.vm_cluster,
+            app.vm_storage or conf.vm_storage,
+        )
+        shared_preparation.get(key, validate)
+
+    def _create_vm(
+        self,
+        deploy_app: VMFromImageDeployApp,
+        vm_name: str,
+        vm_resource_pool: ResourcePoolHandler,
+        vm_storage: DatastoreHandler,
+        vm_folder: FolderHandler,
+        dc: DcHandler,
+    ) -> VmHandler:
+        options = self._get_import_options(deploy_app)
+        if options is None:
+            return super()._create_vm(
+                deploy_app, vm_name, vm_resource_pool, vm_storage, vm_folder, dc
+            )
+
+        if settings.OVF_IMAGE_TEMPLATES:
+            vm_template = self._get_image_template(
+                deploy_app, options, vm_resource_pool, vm_storage, dc
+            )
+            return CloneVMCommand(
+                rollback_manager=self._rollback_manager,
+                cancellation_manager=self._cancellation_manager,
+                on_task_progress=self._on_task_progress,
+                vm_template=vm_template,
+                vm_name=vm_name,
+                vm_resource_pool=vm_resource_pool,
+                vm_storage=vm_storage,
+                vm_folder=vm_folder,
+            ).execute()
+
+        importer = self._get_importer()
+        return ImportVMCommand(
+            rollback_manager=self._rollback_manager,
+            cancellation_manager=self._cancellation_manager,
+            import_vm=lambda: importer.import_vm(
+                deploy_app.vcenter_image,
+                options,
+                vm_name,
+                vm_resource_pool,
+                vm_storage,
+                vm_folder,
+                dc,
+                self._get_import_progress_reporter(vm_name),
+            ),
+        ).execute()
+
+    def _get_image_template(
+        self,
+        app: VMFromImageDeployApp,
+        options: OvfImportOptions,
+        vm_resource_pool: ResourcePoolHandler,
+        vm_storage: DatastoreHandler,
+        dc: DcHandler,
+    ) -> VmHandler:
+        image = os.path.abspath(app.vcenter_image)
+        stat = os.stat(image)
+        placement_key = (
+            image,
+            vm_resource_pool.get_vc_obj()._moId,
+            vm_storage.get_vc_obj()._moId,
+        )
+        version_key = (
+            stat.st_size,
+            stat.st_mtime_ns,
+            tuple(app.vcenter_image_arguments),
+        )
+        name = get_image_template_name(image, placement_key, version_key)
+        image_modified = datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+
+        def get_template():
+            return self._import_image_template(
+                app, options, name, image_modified, vm_resource_pool, vm_storage, dc
+            ).get_vc_obj()
+
+        vc_vm = shared_preparation.get(
+            self._key("image template", *placement_key, *version_key), get_template
+        )
+        return VmHandler(rebind(vc_vm, self._si), self._si)
+
+    def _import_image_template(
+        self,
+        app: VMFromImageDeployApp,
+        options: OvfImportOptions,
+        name: str,
+        image_modified: datetime,
+        vm_resource_pool: ResourcePoolHandler,
+        vm_storage: DatastoreHandler,
+        dc: DcHandler,
+    ) -> VmHandler:
+        folder_path = VcenterPath(app.vm_location or self._resource_config.vm_location)
+        folder_path.append(settings.OVF_IMAGE_TEMPLATE_FOLDER)
+        folder = dc.get_or_create_vm_folder(folder_path)
+
+        if vm := self._find_image_template(folder, name):
+            logger.info(f"Cloning from the image template {vm}")
+            return vm
+
+        # other Execution Servers can import the same image at the same time,
+        # the template gets its name only when it's ready
+        import_name = f"{name}{IMPORTING_MARK}{uuid.uuid4().hex[:8]}"
+        vm = self._get_importer().import_vm(
+            app.vcenter_image,
+            options,
+            import_name,
+            vm_resource_pool,
+            vm_storage,
+            folder,
+            dc,
+            self._get_import_progress_reporter(import_name),
+        )
+        try:
+            vm.get_vc_obj().MarkAsTemplate()
+            (task,) = wait_for_tasks(self._si, [vm.get_vc_obj().Rename_Task(name)])
+            if task.state is not TaskState.success:
+                if existing := self._find_image_template(folder, name):
+                    logger.info(f"The image is already imported as the {existing}")
+                    vm.delete()
+                    return existing
+                raise TaskFailed(task)
+        except Exception:
+            vm.delete()
+            raise
+        logger.info(f"The image {app.vcenter_image} is imported as the template {vm}")
+
+        try:
+            self._delete_old_image_templates(folder, name, image_modified)
+        except Exception:
+            logger.warning("Failed to delete the old image templates", exc_info=True)
+        return vm
+
+    def _find_image_template(
+        self, folder: FolderHandler, name: str
+    ) -> VmHandler | None:
+        vc_vm = folder.find_child(name)
+        if vc_vm is None:
+            return None
+        props = retrieve_properties(
+            self._si, [vc_vm], vim.VirtualMachine, ["config.template"]
+        )
+        if props.get(vc_vm, {}).get("config.template"):
+            return VmHandler(vc_vm, self._si)
+        return None
+
+    def _delete_old_image_templates(
+        self, folder: FolderHandler, name: str, image_modified: datetime
+    ) -> None:
+        """Delete the templates of the replaced image and stale unfinished imports.
+
+        A template of the same image and placement created before the image was
+        modified is replaced. An import running longer than the max import time
+        was interrupted after its lease completed, otherwise vCenter would have
+        removed the VM.
+        """
+        vc_vms = [
+            vc_obj
+            for vc_obj in folder.get_vc_obj().childEntity
+            if isinstance(vc_obj, vim.VirtualMachine)
+        ]
+        objs_props = retrieve_properties(
+            self._si,
+            vc_vms,
+            vim.VirtualMachine,
+            ["name", "config.template", "config.createDate"],
+        )
+        versions_prefix = f"{name.rsplit('-', 1)[0]}-"
+        max_import_time = timedelta(seconds=settings.OVF_IMAGE_IMPORT_MAX_TIME)
+        now = self._si.get_vc_obj().CurrentTime()
+        for vc_vm, props in objs_props.items():
+            vm_name, created = props.get("name") or "", props.get("config.createDate")
+            if created is None or vm_name == name:
+                continue
+            if IMPORTING_MARK in vm_name:
+                is_old = now - created > max_import_time
+            else:
+                is_old = (
+                    vm_name.startswith(versions_prefix)
+                    and props.get("config.template")
+                    and created < image_modified
+                )
+            if is_old:
+                vm = VmHandler(vc_vm, self._si)
+                try:
+                    vm.delete()
+                except Exception as e:
+                    # it can be used by a running clone
+                    logger.warning(f"Failed to delete the {vm}. {e}")
+
+
+class DeployVMFromLinkedCloneFlow(StandbyPoolMixin, VCenterDeployVMFromLinkedCloneFlow):
+    pass
+
+
+class DeployVMFromVMFlow(SharedSourceMixin, VCenterDeployVMFromVMFlow):
+    pass
+
+
+class DeployVMFromTemplateFlow(SharedSourceMixin, VCenterDeployVMFromTemplateFlow):
+    pass
+
+
+class DeployVMFromImageFlow(NativeImageImportMixin, VCenterDeployVMFromImageFlow):
+    pass
+
+
+DEPLOY_APP_TO_FLOW = (
+    (deploy_app.VMFromLinkedCloneDeployApp, DeployVMFromLinkedCloneFlow),
+    (deploy_app.VMFromVMDeployApp, DeployVMFromVMFlow),
+    (deploy_app.VMFromImageDeployApp, DeployVMFromImageFlow),
+    (deploy_app.VMFromTemplateDeployApp, DeployVMFromTemplateFlow),
+)
+
+
+def get_deploy_flow(request_action) -> type[AbstractVCenterDeployVMFlow]:
+    da = request_action.deploy_app
+    for deploy_class, deploy_flow in DEPLOY_APP_TO_FLOW:
+        if isinstance(da, deploy_class):
+            return deploy_flow
+    raise NotImplementedError(f"Not supported deployment type {type(da)}")
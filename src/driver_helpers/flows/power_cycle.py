@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import logging
+import time
+
+from attrs import define
+from cloudshell.cp.core.cancellation_manager import CancellationContextManager
+
+from driver_helpers.bulk import BulkResults
+from driver_helpers.flows.bulk_power import BulkPowerFlow
+from driver_helpers.si_pool import SiPool
+
+from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+logger = logging.getLogger(__name__)
+
+CANCELLATION_CHECK_INTERVAL = 1
+
+
+@define
+class PowerCycleFlow:
+    """Power cycles all the VMs together.
+
+    The vCenter session is returned to the pool during the delay, so it isn't
+    held while the command only waits.
+    """
+
+    _si_pool: SiPool
+    _resource_config: VCenterResourceConfig
+    _cancellation_manager: CancellationContextManager
+
+    def power_cycle(self, vm_uuids: dict[str, str], delay: float) -> BulkResults:
+        """Power cycles the VMs.
+
+        :param vm_uuids: VM UUIDs by deployed App names
+        :param delay: seconds to wait between power off and power on
+        """
+        start = time.monotonic()
+        with self._si_pool.session(self._resource_config) as si:
+            results = BulkPowerFlow(si, self._resource_config).power_off(vm_uuids)
+        powered_off = time.monotonic()
+
+        self._wait(delay)
+        waited = time.monotonic()
+
+        # power on only the VMs that were powered off
+        vm_uuids = {name: vm_uuids[name] for name in results.succeeded}
+        if vm_uuids:
+            with self._si_pool.session(self._resource_config) as si:
+                on_results = BulkPowerFlow(si, self._resource_config).power_on(vm_uuids)
+            for result in on_results.failed:
+                results.fail(result.app_name, result.error)
+        end = time.monotonic()
+
+        logger.info(
+            f"Power Cycle of {len(results.succeeded)} App(s) took {end - start:.1f}s: "
+            f"power off {powered_off - start:.1f}s, delay {waited - powered_off:.1f}s, "
+            f"power on {end - waited:.1f}s"
+        )
+        return results
+
+    def _wait(self, delay: float) -> None:
+        deadline = time.monotonic() + delay
+        while (left := deadline - time.monotonic()) > 0:
+            with self._cancellation_manager:
+                time.sleep(min(left, CANCELLATION_CHECK_INTERVAL))
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import logging
+import math
+import time
+from types import SimpleNamespace
+
+from cloudshell.cp.core.cancellation_manager import CancellationContextManager
+from pyVmomi import vim
+
+from driver_helpers.inventory_index import IndexedInventory
+from driver_helpers.ip_watcher import GUEST_PROPERTIES, get_guest_info, ip_watchers
+from driver_helpers.property_collector import PrefetchedObj, retrieve_properties
+
+from cloudshell.cp.vcenter.actions.vm_network import (
+    VMNetworkActions,
+    get_ip_regex_match_func,
+)
+from cloudshell.cp.vcenter.constants import IPProtocol
+from cloudshell.cp.vcenter.exceptions import VMIPNotFoundException
+from cloudshell.cp.vcenter.handlers.network_handler import NetworkHandler
+from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+from cloudshell.cp.vcenter.handlers.vm_handler import VmHandler, VmIsNotPowered
+from cloudshell.cp.vcenter.models.deployed_app import (
+    BaseVCenterDeployedApp,
+    StaticVCenterDeployedApp,
+)
+from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+logger = logging.getLogger(__name__)
+
+CANCELLATION_CHECK_INTERVAL = 1
+# VM properties read when looking for the IP, besides the guest info
+VM_PROPERTIES = ("name", "config.hardware.device", "network")
+
+
+class WatchedVMNetworkActions(VMNetworkActions):
+    """Waits for the VM IP with the IP watcher instead of polling the guest."""
+
+    def __init__(
+        self,
+        si: SiHandler,
+        resource_conf: VCenterResourceConfig,
+        cancellation_manager: CancellationContextManager,
+    ):
+        super().__init__(resource_conf, cancellation_manager)
+        self._si = si
+
+    def get_vm_ip(
+        self,
+        vm: VmHandler,
+        ip_regex: str | None = None,
+        timeout: int = 0,
+        skip_networks: list[NetworkHandler] | None = None,
+        ip_protocol_version: str = IPProtocol.IPv4,
+    ) -> str:
+        logger.info(f"Getting IP address for the VM {vm.name} from the vCenter")
+        deadline = time.monotonic() + timeout
+        is_ip_pass_regex = get_ip_regex_match_func(ip_regex)
+        skip_networks = skip_networks or []
+
+        def find_ip(guest: SimpleNamespace) -> str | None:
+            vm_props = {
+                "name": props.get("name"),
+                "config": SimpleNamespace(
+                    hardware=SimpleNamespace(
+                        device=props.get("config.hardware.device") or []
+                    )
+                ),
+                "network": props.get("network") or [],
+                "guest": guest,
+            }
+            with self._cancellation_manager:
+                return self._find_vm_ip(
+                    vm=VmHandler(PrefetchedObj(vc_vm, vm_props), vm.si),
+                    skip_networks=skip_networks,
+                    is_ip_pass_regex=is_ip_pass_regex,
+                    ip_protocol_version=ip_protocol_version,
+                )
+
+        vc_vm = vm.get_vc_obj()
+        props = retrieve_properties(
+            self._si, [vc_vm], vim.VirtualMachine, GUEST_PROPERTIES + VM_PROPERTIES
+        ).get(vc_vm, {})
+        ip = find_ip(get_guest_info(props))
+        if ip or timeout <= 0:
+            return self._check_ip(ip, ip_regex)
+
+        with ip_watchers.get(self._resource_conf).watch(vc_vm) as waiter:
+            version = 0
+            while True:
+                # the waiter wakes up to check the cancellation and the deadline,
+                # the IP is looked for only when the guest info has changed
+                if waiter.version != version:
+                    version = waiter.version
+                    if ip := find_ip(waiter.guest):
+                        break
+                else:
+                    with self._cancellation_manager:
+                        pass
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if waiter.failed:
+                    logger.warning("IP watcher failed, polling the guest info")
+                    return super().get_vm_ip(
+                        vm,
+                        ip_regex,
+                        math.ceil(remaining),
+                        skip_networks,
+                        ip_protocol_version,
+                    )
+                waiter.wait(min(remaining, CANCELLATION_CHECK_INTERVAL))
+        return self._check_ip(ip, ip_regex)
+
+    @staticmethod
+    def _check_ip(ip: str | None, ip_regex: str | None) -> str:
+        if not ip:
+            raise VMIPNotFoundException(ip_regex)
+        return ip
+
+
+def refresh_ip(
+    si: SiHandler,
+    deployed_app: BaseVCenterDeployedApp | StaticVCenterDeployedApp,
+    resource_conf: VCenterResourceConfig,
+    cancellation_manager: CancellationContextManager,
+) -> str:
+    dc = IndexedInventory(si, resource_conf).get_dc()
+    vm = dc.get_vm_by_uuid(deployed_app.vmdetails.uid)
+    if vm.power_state is not vm.power_state.ON:
+        raise VmIsNotPowered(vm)
+
+    actions = WatchedVMNetworkActions(si, resource_conf, cancellation_manager)
+    if isinstance(deployed_app, StaticVCenterDeployedApp):
+        ip = actions.get_vm_ip(
+            vm=vm, ip_protocol_version=deployed_app.ip_protocol_version
+        )
+    else:
+        default_net = dc.get_network(resource_conf.holding_network)
+        ip = actions.get_vm_ip(
+            vm,
+            ip_regex=deployed_app.ip_regex,
+            timeout=deployed_app.refresh_ip_timeout,
+            skip_networks=[default_net],
+            ip_protocol_version=deployed_app.ip_protocol_version,
+        )
+    if ip != deployed_app.private_ip:
+        deployed_app.update_private_ip(deployed_app.name, ip)
+    return ip
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import json
+import logging
+from collections.abc import Iterable
+from datetime import datetime
+
+from attrs import define
+from cloudshell.api.cloudshell_api import CloudShellAPISession
+from cloudshell.shell.core.orchestration_save_restore import OrchestrationSaveRestore
+
+from driver_helpers.bulk import BulkResults, get_vms
+from driver_helpers.flows.bulk_power import BulkPowerFlow
+from driver_helpers.inventory_index import IndexedInventory
+from driver_helpers.task_waiter import wait_for_tasks
+
+from cloudshell.cp.vcenter.exceptions import BaseVCenterException, InvalidCommandParam
+from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+from cloudshell.cp.vcenter.handlers.snapshot_handler import (
+    SnapshotHandler,
+    SnapshotNotFoundInSnapshotTree,
+)
+from cloudshell.cp.vcenter.handlers.task import TaskState
+from cloudshell.cp.vcenter.handlers.vcenter_path import VcenterPath
+from cloudshell.cp.vcenter.handlers.vm_handler import (
+    DuplicatedSnapshotName,
+    PowerState,
+    VmHandler,
+)
+from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+logger = logging.getLogger(__name__)
+
+SANDBOX_SNAPSHOT_TYPE = "vcenter_sandbox_snapshot"
+SNAPSHOT_DESCRIPTION = "Created by CloudShell vCenterShell"
+
+
+class InvalidSandboxSnapshotType(BaseVCenterException):
+    def __init__(self, type_: str):
+        msg = f"Invalid saved details type '{type_}', expect {SANDBOX_SNAPSHOT_TYPE}"
+        super().__init__(msg)
+
+
+def parse_yes_no(param_name: str, value: str) -> bool:
+    expected_values = ("Yes", "No")
+    if value not in expected_values:
+        raise InvalidCommandParam(param_name, value, expected_values)
+    return value == "Yes"
+
+
+def parse_power_on_order(power_on_order: str) -> list[list[str]]:
+    """Groups of App names separated by ';', names in a group separated by ','."""
+    groups = []
+    for group in power_on_order.split(";"):
+        if names := [name.strip() for name in group.split(",") if name.strip()]:
+            groups.append(names)
+    return groups
+
+
+def get_new_snapshot_path(vm: VmHandler, snapshot_name: str) -> VcenterPath:
+    """Path of the snapshot that would be created for the VM."""
+    current_snapshot = vm.current_snapshot
+    if not current_snapshot:
+        return VcenterPath(snapshot_name)
+
+    path = current_snapshot.path + snapshot_name
+    try:
+        SnapshotHandler.get_vm_snapshot_by_path(vm.get_vc_obj(), path)
+    except SnapshotNotFoundInSnapshotTree:
+        return path
+    raise DuplicatedSnapshotName(snapshot_name)
+
+
+@define
+class SandboxSnapshotFlow:
+    """Takes and restores snapshots of many deployed Apps together.
+
+    Snapshot tasks of all the VMs are started at once, so the snapshots are taken
+    at about the same time. If any of them fails, the created snapshots are
+    removed. Saved details of all the Apps are returned as one blob.
+    """
+
+    _si: SiHandler
+    _resource_config: VCenterResourceConfig
+
+    def save(
+        self,
+        vm_uuids: dict[str, str],
+        snapshot_name: str,
+        dump_memory: bool,
+        quiesce: bool,
+    ) -> str:
+        """Takes snapshots of the VMs.
+
+        :param vm_uuids: VM UUIDs by deployed App names
+        :return: saved details of the snapshots
+        """
+        if not snapshot_name:
+            snapshot_name = datetime.now().strftime("%y_%m_%d %H_%M_%S_%f")
+        results = BulkResults.from_names(vm_uuids)
+        vms = get_vms(self._get_dc(), vm_uuids, results)
+        paths = {}
+        for name, vm in vms.items():
+            try:
+                paths[name] = get_new_snapshot_path(vm, snapshot_name)
+            except Exception as e:
+                results.fail(name, e)
+        results.raise_on_failures()
+
+        powered_on = {name: vm.power_state is PowerState.ON for name, vm in vms.items()}
+        logger.info(f"Creating snapshot '{snapshot_name}' of {len(vms)} VMs")
+        vc_tasks = {}
+        for name, vm in vms.items():
+            try:
+                vc_tasks[name] = vm.get_vc_obj().CreateSnapshot(
+                    snapshot_name, SNAPSHOT_DESCRIPTION, dump_memory, quiesce
+                )
+            except Exception as e:
+                results.fail(name, e)
+        tasks = dict(zip(vc_tasks, wait_for_tasks(self._si, vc_tasks.values())))
+        results.check_tasks(tasks)
+
+        if results.failed:
+            self._remove_snapshots(
+                task.result
+                for task in tasks.values()
+                if task.state is TaskState.success
+            )
+            results.raise_on_failures()
+
+        apps = [
+            {
+                "app_name": name,
+                "vm_uuid": vm_uuids[name],
+                "snapshot_path": str(paths[name]),
+                "powered_on": powered_on[name],
+            }
+            for name in vms
+        ]
+        details = {"snapshot_name": snapshot_name, "memory": dump_memory, "apps": apps}
+        return OrchestrationSaveRestore(
+            self._resource_config.name
+        ).prepare_orchestration_save_result(
+            f"{SANDBOX_SNAPSHOT_TYPE}:{json.dumps(details)}"
+        )
+
+    def restore(
+        self,
+        saved_details: str,
+        cs_api: CloudShellAPISession,
+        power_on_order: list[list[str]],
+    ) -> BulkResults:
+        """Reverts the VMs to the snapshots and powers them on.
+
+        All VMs are reverted at once. VMs that were powered on when the snapshot
+        was taken are powered on group by group in the power on order, Apps not
+        in the order are powered on last.
+        """
+        details = self._parse_saved_details(saved_details)
+        apps = {app["app_name"]: app for app in details["apps"]}
+        vm_uuids = {name: app["vm_uuid"] for name, app in apps.items()}
+        results = BulkResults.from_names(vm_uuids)
+        vms = get_vms(self._get_dc(), vm_uuids, results)
+
+        logger.info(f"Reverting {len(vms)} VMs to '{details['snapshot_name']}'")
+        vc_tasks = {}
+        for name, vm in vms.items():
+            try:
+                snapshot = vm.get_snapshot_by_path(apps[name]["snapshot_path"])
+                vc_tasks[name] = snapshot.revert_to_snapshot_task()
+            except Exception as e:
+                results.fail(name, e)
+        tasks = dict(zip(vc_tasks, wait_for_tasks(self._si, vc_tasks.values())))
+        results.check_tasks(tasks)
+
+        if not details["memory"]:
+            for name in results.succeeded:
+                cs_api.SetResourceLiveStatus(name, "Offline", "Powered Off")
+
+        to_power_on = [name for name in results.succeeded if apps[name]["powered_on"]]
+        for group in self._get_power_on_groups(to_power_on, power_on_order):
+            logger.info(f"Powering on the Apps {', '.join(group)}")
+            group_results = BulkPowerFlow(self._si, self._resource_config).power_on(
+                {name: vm_uuids[name] for name in group}
+            )
+            for result in group_results.failed:
+                results.fail(result.app_name, result.error)
+        return results
+
+    def _get_dc(self):
+        return IndexedInventory(self._si, self._resource_config).get_dc()
+
+    def _parse_saved_details(self, saved_details: str) -> dict:
+        result = OrchestrationSaveRestore(
+            self._resource_config.name
+        ).parse_orchestration_save_result(saved_details)
+        type_, details = result["path"].split(":", 1)
+        if type_ != SANDBOX_SNAPSHOT_TYPE:
+            raise InvalidSandboxSnapshotType(type_)
+        return json.loads(details)
+
+    def _remove_snapshots(self, vc_snapshots: Iterable) -> None:
+        vc_tasks = [
+            vc_snapshot.RemoveSnapshot_Task(removeChildren=False)
+            for vc_snapshot in vc_snapshots
+        ]
+        logger.info(f"Removing {len(vc_tasks)} created snapshots")
+        for task in wait_for_tasks(self._si, vc_tasks):
+            if task.state is not TaskState.success:
+                logger.warning(f"Failed to remove a snapshot: {task.error_msg}")
+
+    @staticmethod
+    def _get_power_on_groups(
+        app_names: list[str], power_on_order: list[list[str]]
+    ) -> list[list[str]]:
+        left = set(app_names)
+        groups = []
+        for group in power_on_order:
+            if names := [name for name in group if name in left]:
+                groups.append(names)
+                left -= set(names)
+        if rest := [name for name in app_names if name in left]:
+            groups.append(rest)
+        return groups
@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import chain
+from threading import Lock
+from typing import TypeVar
+
+from attrs import define, field
+from cloudshell.cp.core.request_actions import DriverResponse
+from cloudshell.cp.core.request_actions.models import (
+    DeleteSavedApp,
+    DeleteSavedAppResult,
+    SaveApp,
+    SaveAppResult,
+)
+from pyVmomi import vim
+
+from driver_helpers.bulk import BulkResults, run_tasks
+from driver_helpers.deploy_pipeline import clone_limits
+from driver_helpers.flows.connectivity import get_connect_spec
+from driver_helpers.si_pool import get_vcenter_key
+from driver_helpers.task_waiter import wait_for_tasks
+
+from cloudshell.cp.vcenter.actions.vm_network import VMNetworkActions
+from cloudshell.cp.vcenter.flows.save_restore_app import (
+    SNAPSHOT_NAME,
+    SaveRestoreAppFlow,
+)
+from cloudshell.cp.vcenter.handlers.config_spec_handler import ConfigSpecHandler
+from cloudshell.cp.vcenter.handlers.datastore_handler import DatastoreHandler
+from cloudshell.cp.vcenter.handlers.folder_handler import FolderHandler
+from cloudshell.cp.vcenter.handlers.resource_pool import ResourcePoolHandler
+from cloudshell.cp.vcenter.handlers.task import Task, TaskState
+from cloudshell.cp.vcenter.handlers.vm_handler import PowerState, VmHandler, VmNotFound
+from cloudshell.cp.vcenter.models.deploy_app import VMFromVMDeployApp
+
+logger = logging.getLogger(__name__)
+
+ATTR_NAMES = VMFromVMDeployApp.ATTR_NAMES
+
+T = TypeVar("T")
+R = TypeVar("R")
+ResultT = TypeVar("ResultT", SaveAppResult, DeleteSavedAppResult)
+
+
+@define
+class SaveTarget:
+    """Source VM and placement of the clone of one saved App."""
+
+    action: SaveApp
+    vm: VmHandler
+    app_attrs: dict[str, str]
+    vm_resource_pool: ResourcePoolHandler
+    vm_storage: DatastoreHandler
+    vm_folder: FolderHandler
+    cloned_vm: VmHandler | None = None
+
+    @property
+    def power_off(self) -> bool:
+        return self.app_attrs[ATTR_NAMES.behavior_during_save] == "Power Off"
+
+
+@define
+class Progress:
+    """Logs how many Apps are processed."""
+
+    name: str
+    total: int
+    _done: int = field(init=False, default=0)
+    _lock: Lock = field(init=False, factory=Lock)
+
+    def done(self, app_name: str) -> None:
+        with self._lock:
+            self._done += 1
+            logger.info(f"{self.name} {app_name}: {self._done} of {self.total} done")
+
+
+class BulkSaveRestoreAppFlow(SaveRestoreAppFlow):
+    """Saves and deletes saved Apps concurrently.
+
+    All source VMs that should be powered off are powered off first, then all of
+    them are cloned and then powered on again. Clones share the per datastore
+    limits with Deploy. A failed App doesn't fail the others.
+    """
+
+    def save_apps(self, save_actions: Iterable[SaveApp]) -> str:
+        save_actions = {a.actionId: a for a in save_actions}
+        results = BulkResults.from_names(save_actions)
+        info = defaultdict(str)
+
+        with ThreadPoolExecutor() as executor:
+            targets = self._run(executor, self._get_save_target, save_actions, results)
+            vms_to_power_on = self._power_off_sources(targets.values(), results)
+            progress = Progress("Saved App", len(targets))
+            try:
+                self._run(
+                    executor,
+                    lambda target: self._save_target(target, progress),
+                    {
+                        a_id: target
+                        for a_id, target in targets.items()
+                        if not results.is_failed(a_id)
+                    },
+                    results,
+                )
+            finally:
+                self._power_on_sources(vms_to_power_on, targets.values(), info)
+
+        response = []
+        for action_id, action in save_actions.items():
+            if results.is_failed(action_id):
+                result = self._get_failed_result(SaveAppResult, action_id, results)
+            else:
+                result = self._prepare_result(targets[action_id].cloned_vm, action)
+            result.infoMessage = info[action_id]
+            response.append(result)
+        return DriverResponse(response).to_driver_response_json()
+
+    def delete_saved_apps(self, delete_saved_app_actions: list[DeleteSavedApp]) -> str:
+        actions = {a.actionId: a for a in delete_saved_app_actions}
+        results = BulkResults.from_names(actions)
+
+        with ThreadPoolExecutor() as executor:
+            vms = self._run(executor, self._get_saved_vms, actions, results)
+
+        vms = {a_id: a_vms for a_id, a_vms in vms.items() if a_vms}
+        to_power_off = {
+            a_id: [vm for vm in a_vms if vm.power_state is not PowerState.OFF]
+            for a_id, a_vms in vms.items()
+        }
+        self._run_tasks(to_power_off, lambda vm: vm.get_vc_obj().PowerOff(), results)
+        to_delete = {
+            a_id: a_vms for a_id, a_vms in vms.items() if not results.is_failed(a_id)
+        }
+        self._run_tasks(to_delete, lambda vm: vm.get_vc_obj().Destroy_Task(), results)
+
+        self._delete_folders(delete_saved_app_actions)
+        response = [
+            self._get_failed_result(DeleteSavedAppResult, action_id, results)
+            if results.is_failed(action_id)
+            else DeleteSavedAppResult(actionId=action_id)
+            for action_id in actions
+        ]
+        return DriverResponse(response).to_driver_response_json()
+
+    def _run(
+        self,
+        executor: ThreadPoolExecutor,
+        func: Callable[[T], R],
+        items: dict[str, T],
+        results: BulkResults,
+    ) -> dict[str, R]:
+        """Run the function for the item of every action concurrently.
+
+        Returns results of the actions that didn't fail.
+        """
+
+        def run(action_id: str) -> R | None:
+            try:
+                return func(items[action_id])
+            except Exception as e:
+                logger.exception(f"Failed to process the action {action_id}")
+                results.fail(action_id, e)
+
+        return {
+            action_id: result
+            for action_id, result in zip(items, executor.map(run, items))
+            if not results.is_failed(action_id)
+        }
+
+    def _get_save_target(self, save_action: SaveApp) -> SaveTarget:
+        logger.info(f"Preparing save app {save_action.actionParams.sourceAppName}")
+        with self._cancellation_manager:
+            vm = self._dc.get_vm_by_uuid(save_action.actionParams.sourceVmUuid)
+            app_attrs = self._get_app_attrs(save_action, str(vm.path))
+            vm_resource_pool = self._get_vm_resource_pool(app_attrs)
+            vm_storage = self._dc.get_datastore(app_attrs[ATTR_NAMES.vm_storage])
+        with self._cancellation_manager:
+            vm_folder = self._prepare_folders(
+                app_attrs[ATTR_NAMES.vm_location],
+                save_action.actionParams.savedSandboxId,
+            )
+        return SaveTarget(
+            save_action, vm, app_attrs, vm_resource_pool, vm_storage, vm_folder
+        )
+
+    def _save_target(self, target: SaveTarget, progress: Progress) -> None:
+        vm, app_attrs = target.vm, target.app_attrs
+        config_spec = ConfigSpecHandler(None, None, [], None)
+        if app_attrs.get(ATTR_NAMES.copy_source_uuid, False):
+            config_spec.bios_uuid = vm.bios_uuid
+
+        with clone_limits.slot(
+            get_vcenter_key(self._resource_conf, "datastore", target.vm_storage.name),
+            get_vcenter_key(
+                self._resource_conf, "host", app_attrs[ATTR_NAMES.vm_cluster]
+            ),
+            self._cancellation_manager,
+        ):
+            target.cloned_vm = self._clone_vm(
+                vm,
+                f"Clone of {vm.name[0:32]}",
+                target.vm_resource_pool,
+                target.vm_storage,
+                target.vm_folder,
+                config_spec,
+            )
+        try:
+            self._disconnect_quali_networks(target.cloned_vm)
+            target.cloned_vm.create_snapshot(
+                SNAPSHOT_NAME,
+                dump_memory=False,
+                on_task_progress=self._on_task_progress,
+            )
+        except Exception:
+            target.cloned_vm.delete()
+            raise
+        progress.done(target.action.actionParams.sourceAppName)
+
+    def _disconnect_quali_networks(self, vm: VmHandler) -> None:
+        net_actions = VMNetworkActions(self._resource_conf, self._cancellation_manager)
+        specs = [
+            get_connect_spec(vnic, self._holding_network)
+            for vnic in vm.vnics
+            if net_actions.is_quali_network(vnic.network.name)
+        ]
+        if specs:
+            vm._reconfigure(vim.vm.ConfigSpec(deviceChange=specs))
+
+    def _power_off_sources(
+        self, targets: Iterable[SaveTarget], results: BulkResults
+    ) -> list[VmHandler]:
+        """Power off the source VMs of the Apps saved powered off.
+
+        Returns the VMs that were powered on.
+        """
+        to_power_off = defaultdict(list)
+        vms = {}
+        for target in filter(lambda t: t.power_off, targets):
+            if target.vm.power_state is PowerState.ON:
+                vms[target.vm.uuid] = target.vm
+                to_power_off[target.action.actionId].append(target.vm)
+        tasks = self._run_tasks(
+            to_power_off, lambda vm: vm.get_vc_obj().PowerOff(), results
+        )
+        return [vm for uuid, vm in vms.items() if uuid in tasks]
+
+    def _power_on_sources(
+        self,
+        vms: list[VmHandler],
+        targets: Iterable[SaveTarget],
+        info: dict[str, str],
+    ) -> None:
+        if not vms:
+            return
+        logger.info(f"Powering on {len(vms)} source VMs")
+        tasks = wait_for_tasks(self._si, [vm.get_vc_obj().PowerOn() for vm in vms])
+        for vm, task in zip(vms, tasks):
+            if task.state is not TaskState.success:
+                msg = f"Failed to power on the {vm}. {task.error_msg}"
+                logger.warning(msg)
+                for target in targets:
+                    if target.vm.uuid == vm.uuid:
+                        info[target.action.actionId] = msg
+
+    def _run_tasks(
+        self,
+        vms: dict[str, list[VmHandler]],
+        start_task: Callable[[VmHandler], vim.Task],
+        results: BulkResults,
+    ) -> dict[str, Task]:
+        """Run the tasks of the VMs of every action together.
+
+        VMs used by several actions get one task.
+        Returns the tasks that succeeded by the VM UUIDs.
+        """
+        unique_vms = {vm.uuid: vm for vm in chain.from_iterable(vms.values())}
+        vm_results = BulkResults.from_names(unique_vms)
+        tasks = run_tasks(
+            self._si,
+            {uuid: partial(start_task, vm) for uuid, vm in unique_vms.items()},
+            vm_results,
+            cancellation_manager=self._cancellation_manager,
+        )
+        errors = {result.app_name: result.error for result in vm_results.failed}
+        for action_id, action_vms in vms.items():
+            for vm in filter(lambda v: v.uuid in errors, action_vms):
+                results.fail(action_id, errors[vm.uuid])
+        return tasks
+
+    def _get_saved_vms(self, action: DeleteSavedApp) -> list[VmHandler]:
+        vms = []
+        for artifact in action.actionParams.artifacts:
+            with self._cancellation_manager:
+                try:
+                    vms.append(self._dc.get_vm_by_uuid(artifact.artifactRef))
+                except VmNotFound:
+                    continue
+        return vms
+
+    @staticmethod
+    def _get_failed_result(
+        result_cls: type[ResultT], action_id: str, results: BulkResults
+    ) -> ResultT:
+        error = next(r.error for r in results if r.app_name == action_id)
+        return result_cls(actionId=action_id, success=False, errorMessage=error)
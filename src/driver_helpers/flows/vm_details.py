@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import jsonpickle
+from cloudshell.cp.core.request_actions.models import VmDetailsData
+from pyVmomi import vim
+
+from driver_helpers import settings
+from driver_helpers.inventory_index import IndexedInventory
+from driver_helpers.property_collector import PrefetchedObj, retrieve_properties
+
+from cloudshell.cp.vcenter.actions.vm_details import VMDetailsActions
+from cloudshell.cp.vcenter.flows.vm_details import VCenterGetVMDetailsFlow
+from cloudshell.cp.vcenter.handlers.dc_handler import DcHandler
+from cloudshell.cp.vcenter.handlers.vm_handler import VmHandler, VmNotFound
+from cloudshell.cp.vcenter.models.deployed_app import (
+    BaseVCenterDeployedApp,
+    VCenterGetVMDetailsRequestActions,
+)
+
+logger = logging.getLogger(__name__)
+
+# VM properties read by VMDetailsActions
+VM_DETAILS_PROPERTIES = ("name", "config", "summary", "guest", "network", "runtime")
+
+
+class BulkVMDetailsFlow(VCenterGetVMDetailsFlow):
+    """Gets VM details of many VMs at once.
+
+    Properties of every batch of VMs are retrieved with one call, details that
+    need more calls (networks, VLAN IDs) are prepared by a pool of workers.
+    """
+
+    def get_vm_details(self, request_actions: VCenterGetVMDetailsRequestActions) -> str:
+        deployed_apps = request_actions.deployed_apps
+        batch_size = settings.VM_DETAILS_BATCH_SIZE
+        dc = IndexedInventory(self._si, self._resource_conf).get_dc()
+        results = []
+
+        with ThreadPoolExecutor(settings.VM_DETAILS_WORKERS) as executor:
+            for i in range(0, len(deployed_apps), batch_size):
+                with self._cancellation_manager:
+                    batch = deployed_apps[i : i + batch_size]
+                    vms = self._get_prefetched_vms(executor, dc, batch)
+                results.extend(
+                    executor.map(self._create_vm_details, [dc] * len(batch), batch, vms)
+                )
+
+        json_data = jsonpickle.encode(results, unpicklable=False)
+        logger.debug(f"VM details: {json_data}")
+        return json_data
+
+    def _get_prefetched_vms(
+        self,
+        executor: ThreadPoolExecutor,
+        dc: DcHandler,
+        deployed_apps: list[BaseVCenterDeployedApp],
+    ) -> list[VmHandler | None]:
+        # the searches by UUID run concurrently, they take up to 2 calls per VM
+        vc_vms = list(
+            executor.map(
+                lambda app: self._si.find_by_uuid(
+                    dc.get_vc_obj(), app.vmdetails.uid, vm_search=True
+                ),
+                deployed_apps,
+            )
+        )
+        objs_props = retrieve_properties(
+            self._si,
+            filter(None, vc_vms),
+            vim.VirtualMachine,
+            VM_DETAILS_PROPERTIES,
+        )
+        return [
+            VmHandler(PrefetchedObj(vc_vm, objs_props.get(vc_vm, {})), self._si)
+            if vc_vm
+            else None
+            for vc_vm in vc_vms
+        ]
+
+    def _create_vm_details(
+        self,
+        dc: DcHandler,
+        deployed_app: BaseVCenterDeployedApp,
+        vm: VmHandler | None,
+    ) -> VmDetailsData:
+        if vm is None:
+            error = VmNotFound(dc, uuid=deployed_app.vmdetails.uid)
+            return VmDetailsData(appName=deployed_app.name, errorMessage=str(error))
+
+        return VMDetailsActions(
+            self._si,
+            self._resource_conf,
+            self._cancellation_manager,
+        ).create(vm, deployed_app)
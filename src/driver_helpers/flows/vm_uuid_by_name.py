@@ -0,0 +1,15 @@
+from driver_helpers.inventory_index import IndexedInventory
+
+from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+
+def get_vm_uuid_by_name(
+    si: SiHandler,
+    resource_conf: VCenterResourceConfig,
+    vm_name: str,
+) -> str:
+    inventory = IndexedInventory(si, resource_conf)
+    dc = inventory.get_dc()
+    vm = inventory.get_vm_by_path(dc, vm_name)
+    return vm.uuid
@@ -0,0 +1,87 @@
+"""Process-wide cache of the attribute hints.
+
+Get Attribute Hints and Validate Attributes are called while an App template is
+edited, so the same inventory lists are requested again and again. The results
+are kept for a short time in the driver process and a vCenter session is opened
+only when a value isn't cached.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from threading import Lock
+from typing import Any
+
+from attrs import define, field
+
+from driver_helpers import settings
+
+logger = logging.getLogger(__name__)
+
+
+@define
+class HintsCache:
+    """TTL and LRU cache, values of one key are loaded once at a time."""
+
+    ttl: float = settings.ATTRIBUTE_HINTS_TTL
+    max_size: int = settings.ATTRIBUTE_HINTS_CACHE_SIZE
+    hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+    _lock: Lock = field(init=False, factory=Lock)
+    _entries: OrderedDict[Hashable, tuple[Any, float]] = field(
+        init=False, factory=OrderedDict
+    )
+    _load_locks: dict[Hashable, Lock] = field(init=False, factory=dict)
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Cached value or the loaded one.
+
+        Concurrent requests of the same key wait for one load.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, Lock())
+        try:
+            with load_lock:
+                # could be loaded while waiting for the lock
+                with self._lock:
+                    entry = self._entries.get(key)
+                if entry and entry[1] > time.monotonic():
+                    return entry[0]
+                value = load()
+                self.put(key, value)
+                return value
+        finally:
+            with self._lock:
+                if not load_lock.locked():
+                    self._load_locks.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._load_locks.clear()
+
+
+hints_cache = HintsCache()
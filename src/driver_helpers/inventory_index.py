@@ -0,0 +1,321 @@
+"""Process-wide index of vCenter inventory paths.
+
+Resolving the names from the resource config walks the inventory and reads the
+name of every checked object. The index keeps inventory paths of managed objects
+in memory, it is populated once from a ContainerView and every indexed object is
+watched with WaitForUpdatesEx, so a renamed, moved or deleted object drops its
+path and the paths below it.
+"""
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from contextlib import suppress
+from threading import Event, Lock, Thread
+
+from attrs import define, field
+from pyVmomi import vim, vmodl
+
+from driver_helpers import settings
+from driver_helpers.property_collector import rebind, retrieve_container_properties
+from driver_helpers.si_pool import PoolKey, disconnect, get_pool_key
+
+from cloudshell.cp.vcenter.handlers.cluster_handler import (
+    BasicComputeEntityHandler,
+    ClusterHandler,
+    HostHandler,
+)
+from cloudshell.cp.vcenter.handlers.datastore_handler import DatastoreHandler
+from cloudshell.cp.vcenter.handlers.dc_handler import DcHandler
+from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+from cloudshell.cp.vcenter.handlers.vcenter_path import VcenterPath
+from cloudshell.cp.vcenter.handlers.vm_handler import VmHandler
+from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+logger = logging.getLogger(__name__)
+
+PC = vmodl.query.PropertyCollector
+
+# VMs are not populated upfront, they are indexed when looked up
+POPULATED_TYPES = [
+    vim.Datacenter,
+    vim.Folder,
+    vim.ComputeResource,
+    vim.HostSystem,
+    vim.ResourcePool,
+    vim.Datastore,
+    vim.Network,
+    vim.DistributedVirtualSwitch,
+]
+
+
+def get_inventory_paths(
+    objs_props: dict[vim.ManagedEntity, dict],
+) -> dict[vim.ManagedEntity, str]:
+    """Build inventory paths from the names and parents of the objects."""
+    paths = {}
+
+    def get_path(vc_obj: vim.ManagedEntity | None) -> str | None:
+        if vc_obj is None or vc_obj not in objs_props:
+            return None  # the root folder
+        if vc_obj not in paths:
+            props = objs_props[vc_obj]
+            parent_path = get_path(props["parent"])
+            name = props["name"]
+            paths[vc_obj] = f"{parent_path}/{name}" if parent_path else name
+        return paths[vc_obj]
+
+    for obj in objs_props:
+        get_path(obj)
+    return paths
+
+
+@define
+class InventoryIndex:
+    """LRU bounded index of inventory paths to managed objects of one vCenter.
+
+    The watcher runs in its own session. Until the index is populated, or if the
+    watcher fails, lookups go straight to the vCenter.
+    """
+
+    _resource_conf: VCenterResourceConfig
+    max_size: int = settings.INVENTORY_INDEX_SIZE
+    hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+    _lock: Lock = field(init=False, factory=Lock)
+    _entries: OrderedDict[str, vim.ManagedEntity] = field(
+        init=False, factory=OrderedDict
+    )
+    _paths: dict[vim.ManagedEntity, str] = field(init=False, factory=dict)
+    _list_view: vim.view.ListView | None = field(init=False, default=None)
+    _watching: Event = field(init=False, factory=Event)
+    _failed: Event = field(init=False, factory=Event)
+    _stop: Event = field(init=False, factory=Event)
+
+    @property
+    def failed(self) -> bool:
+        return self._failed.is_set()
+
+    def start(self) -> None:
+        thread = Thread(target=self._watch, name="inventory-index", daemon=True)
+        thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+
+    def find(self, si: SiHandler, path: str | VcenterPath) -> vim.ManagedEntity | None:
+        path = str(path)
+        with self._lock:
+            vc_obj = self._entries.get(path) if self._watching.is_set() else None
+            if vc_obj is not None:
+                self._entries.move_to_end(path)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if vc_obj is not None:
+            return rebind(vc_obj, si)
+
+        vc_obj = si.get_vc_obj().content.searchIndex.FindByInventoryPath(path)
+        if vc_obj is not None and self._watching.is_set():
+            self._add({vc_obj: path})
+        return vc_obj
+
+    def get_path(self, si: SiHandler, vc_obj: vim.ManagedEntity) -> str:
+        """Inventory path of the object, e.g. of a datacenter inside a folder."""
+        with self._lock:
+            path = self._paths.get(vc_obj) if self._watching.is_set() else None
+        if path is not None:
+            return path
+
+        names = []
+        vc_parent = rebind(vc_obj, si)
+        # the root folder has no parent and isn't a part of the path
+        while vc_parent.parent is not None:
+            names.append(vc_parent.name)
+            vc_parent = vc_parent.parent
+        path = "/".join(reversed(names))
+        if self._watching.is_set():
+            self._add({vc_obj: path})
+        return path
+
+    def _add(self, paths: dict[vim.ManagedEntity, str]) -> None:
+        evicted = []
+        with self._lock:
+            for vc_obj, path in paths.items():
+                self._entries[path] = vc_obj
+                self._entries.move_to_end(path)
+                self._paths[vc_obj] = path
+            while len(self._entries) > self.max_size:
+                _, old_obj = self._entries.popitem(last=False)
+                self._paths.pop(old_obj, None)
+                evicted.append(old_obj)
+        self._modify_list_view(add=list(paths), remove=evicted)
+
+    def _invalidate(self, vc_obj: vim.ManagedEntity) -> None:
+        removed = []
+        with self._lock:
+            path = self._paths.get(vc_obj)
+            if path is None:
+                return
+            for old_path in list(self._entries):
+                if old_path == path or old_path.startswith(f"{path}/"):
+                    old_obj = self._entries.pop(old_path)
+                    self._paths.pop(old_obj, None)
+                    removed.append(old_obj)
+        logger.debug(f"Inventory path '{path}' changed, dropped {len(removed)} paths")
+        self._modify_list_view(remove=removed)
+
+    def _modify_list_view(self, add=(), remove=()) -> None:
+        if add or remove:
+            with suppress(vmodl.fault.ManagedObjectNotFound):
+                self._list_view.ModifyListView(add=add, remove=remove)
+
+    def _watch(self) -> None:
+        try:
+            si = SiHandler.from_config(self._resource_conf)
+        except Exception:
+            logger.exception("Failed to start the inventory index")
+            self._failed.set()
+            return
+
+        pc = None
+        try:
+            content = si.get_vc_obj().content
+            self._list_view = content.viewManager.CreateListView([])
+            self._populate(si, content.rootFolder)
+            pc = content.propertyCollector.CreatePropertyCollector()
+            pc.CreateFilter(self._get_filter_spec(), partialUpdates=True)
+            self._watching.set()
+            self._wait_for_updates(pc)
+        except Exception:
+            logger.exception("Inventory index watcher failed")
+        finally:
+            self._failed.set()
+            self._watching.clear()
+            if pc is not None:
+                with suppress(Exception):
+                    pc.DestroyPropertyCollector()
+            if self._list_view is not None:
+                with suppress(Exception):
+                    self._list_view.DestroyView()
+            disconnect(si)
+
+    def _populate(self, si: SiHandler, root_folder: vim.Folder) -> None:
+        objs_props = retrieve_container_properties(
+            si, root_folder, POPULATED_TYPES, ["name", "parent"]
+        )
+        paths = get_inventory_paths(objs_props)
+        # parents first, so the deepest paths are evicted if there are too many
+        paths = dict(sorted(paths.items(), key=lambda item: item[1].count("/")))
+        self._add(dict(list(paths.items())[: self.max_size]))
+        logger.info(f"Inventory index populated with {len(self._entries)} paths")
+
+    def _get_filter_spec(self) -> PC.FilterSpec:
+        traversal_spec = PC.TraversalSpec(
+            name="traverseList", path="view", skip=False, type=vim.view.ListView
+        )
+        return PC.FilterSpec(
+            objectSet=[
+                PC.ObjectSpec(
+                    obj=self._list_view, skip=True, selectSet=[traversal_spec]
+                )
+            ],
+            propSet=[
+                PC.PropertySpec(type=vim.ManagedEntity, pathSet=["name", "parent"])
+            ],
+        )
+
+    def _wait_for_updates(self, pc: vim.PropertyCollector) -> None:
+        options = PC.WaitOptions(maxWaitSeconds=settings.TASK_WAIT_POLL_SECONDS)
+        version = ""
+        while not self._stop.is_set():
+            update = pc.WaitForUpdatesEx(version, options)
+            if update is None:
+                continue
+            version = update.version
+            for filter_set in update.filterSet:
+                for obj_set in filter_set.objectSet:
+                    if obj_set.kind != PC.ObjectUpdate.Kind.enter:
+                        self._invalidate(obj_set.obj)
+
+
+@define
+class InventoryIndexes:
+    """Inventory indexes of every vCenter shared by the driver commands."""
+
+    _lock: Lock = field(init=False, factory=Lock)
+    _indexes: dict[PoolKey, InventoryIndex] = field(init=False, factory=dict)
+
+    def get(self, conf: VCenterResourceConfig) -> InventoryIndex:
+        key = get_pool_key(conf)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None or index.failed:
+                index = InventoryIndex(conf)
+                self._indexes[key] = index
+                index.start()
+        return index
+
+    def close(self) -> None:
+        with self._lock:
+            indexes = list(self._indexes.values())
+            self._indexes.clear()
+        for index in indexes:
+            index.close()
+
+
+inventory_indexes = InventoryIndexes()
+
+
+@define
+class IndexedInventory:
+    """Resolves entities of the resource config through the inventory index.
+
+    Falls back to the regular lookups if the path is not in the inventory as is,
+    e.g. the datastore is in a datastore cluster.
+    """
+
+    _si: SiHandler
+    _resource_conf: VCenterResourceConfig
+    _index: InventoryIndex = field(init=False)
+    _dc_paths: dict[vim.Datacenter, str] = field(init=False, factory=dict)
+
+    def __attrs_post_init__(self):
+        self._index = inventory_indexes.get(self._resource_conf)
+
+    def get_dc(self) -> DcHandler:
+        name = self._resource_conf.default_datacenter
+        vc_dc = self._index.find(self._si, name)
+        if isinstance(vc_dc, vim.Datacenter):
+            return DcHandler(vc_dc, self._si)
+        return DcHandler.get_dc(name, self._si)
+
+    def get_vm_by_path(self, dc: DcHandler, path: str | VcenterPath) -> VmHandler:
+        vc_vm = self._index.find(self._si, f"{self._get_dc_path(dc)}/vm/{path}")
+        if isinstance(vc_vm, vim.VirtualMachine):
+            return VmHandler(vc_vm, self._si)
+        return dc.get_vm_by_path(path)
+
+    def get_compute_entity(
+        self, dc: DcHandler, path: str | VcenterPath
+    ) -> BasicComputeEntityHandler:
+        vc_obj = self._index.find(self._si, f"{self._get_dc_path(dc)}/host/{path}")
+        if isinstance(vc_obj, vim.ComputeResource):
+            return ClusterHandler(vc_obj, self._si)
+        if isinstance(vc_obj, vim.HostSystem):
+            return HostHandler(vc_obj, self._si)
+        return dc.get_compute_entity(path)
+
+    def get_datastore(self, dc: DcHandler, path: str | VcenterPath) -> DatastoreHandler:
+        name = VcenterPath(str(path)).name
+        vc_ds = self._index.find(self._si, f"{self._get_dc_path(dc)}/datastore/{name}")
+        if isinstance(vc_ds, vim.Datastore):
+            return DatastoreHandler(vc_ds, self._si)
+        return dc.get_datastore(path)
+
+    def _get_dc_path(self, dc: DcHandler) -> str:
+        # the datacenter can be inside a folder, its name is not the whole path
+        vc_dc = dc.get_vc_obj()
+        if vc_dc not in self._dc_paths:
+            self._dc_paths[vc_dc] = self._index.get_path(self._si, vc_dc)
+        return self._dc_paths[vc_dc]
@@ -0,0 +1,200 @@
+"""Process-wide watcher of the guest IP addresses of the VMs waiting for an IP.
+
+Instead of polling the guest info of every VM, all the waiting VMs of one vCenter
+are put into a ListView watched by one property collector filter, so a single
+WaitForUpdatesEx long-poll wakes the waiters when the guest IPs change.
+"""
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
+from threading import Event, Lock, Thread
+from types import SimpleNamespace
+from typing import Any
+
+from attrs import define, field
+from pyVmomi import vim, vmodl
+
+from driver_helpers import settings
+from driver_helpers.si_pool import PoolKey, get_pool_key, si_pool
+
+from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+logger = logging.getLogger(__name__)
+
+PC = vmodl.query.PropertyCollector
+
+GUEST_PROPERTIES = ("guest.net", "guest.ipAddress")
+
+
+def get_guest_info(props: dict[str, Any]) -> SimpleNamespace:
+    """Guest info with the properties read when looking for the VM IP."""
+    return SimpleNamespace(
+        ipAddress=props.get("guest.ipAddress"), net=props.get("guest.net") or []
+    )
+
+
+@define
+class IpWaiter:
+    guest: SimpleNamespace = field(factory=lambda: get_guest_info({}))
+    # incremented on every guest info update
+    version: int = 0
+    failed: bool = False
+    _updated: Event = field(init=False, factory=Event)
+
+    def wait(self, timeout: float) -> None:
+        """Wait for the guest info to change."""
+        self._updated.wait(timeout)
+        self._updated.clear()
+
+    def update(self, guest: SimpleNamespace) -> None:
+        self.guest = guest
+        self.version += 1
+        self._updated.set()
+
+    def fail(self) -> None:
+        self.failed = True
+        self._updated.set()
+
+
+@define
+class IpWatcher:
+    """Watches the guest IPs of the waiting VMs of one vCenter.
+
+    The watcher thread runs while there are waiters and uses a pooled session.
+    """
+
+    _resource_conf: VCenterResourceConfig
+    _lock: Lock = field(init=False, factory=Lock)
+    _waiters: dict[vim.VirtualMachine, list[IpWaiter]] = field(init=False, factory=dict)
+    _guests: dict[vim.VirtualMachine, dict[str, Any]] = field(init=False, factory=dict)
+    _list_view: vim.view.ListView | None = field(init=False, default=None)
+    _running: bool = field(init=False, default=False)
+
+    @contextmanager
+    def watch(self, vc_vm: vim.VirtualMachine) -> Iterator[IpWaiter]:
+        waiter = IpWaiter()
+        with self._lock:
+            waiters = self._waiters.setdefault(vc_vm, [])
+            waiters.append(waiter)
+            if vc_vm in self._guests:
+                waiter.update(get_guest_info(self._guests[vc_vm]))
+            elif len(waiters) == 1 and not self._modify_list_view(add=[vc_vm]):
+                waiter.fail()
+            if not self._running:
+                self._running = True
+                Thread(target=self._watch, name="ip-watcher", daemon=True).start()
+        try:
+            yield waiter
+        finally:
+            with self._lock:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._waiters[vc_vm]
+                    self._guests.pop(vc_vm, None)
+                    self._modify_list_view(remove=[vc_vm])
+
+    def _modify_list_view(self, add=(), remove=()) -> bool:
+        if self._list_view is not None:
+            try:
+                self._list_view.ModifyListView(add=add, remove=remove)
+            except vmodl.fault.ManagedObjectNotFound:
+                pass
+            except Exception:
+                logger.warning("Failed to modify the watched VMs", exc_info=True)
+                return False
+        return True
+
+    def _watch(self) -> None:
+        list_view = pc = None
+        try:
+            with si_pool.session(self._resource_conf) as si:
+                content = si.get_vc_obj().content
+                try:
+                    pc = content.propertyCollector.CreatePropertyCollector()
+                    with self._lock:
+                        list_view = content.viewManager.CreateListView(
+                            list(self._waiters)
+                        )
+                        self._list_view = list_view
+                    pc.CreateFilter(self._get_filter_spec(list_view), False)
+                    self._wait_for_updates(pc)
+                finally:
+                    with self._lock:
+                        if self._list_view is list_view:
+                            self._list_view = None
+                    if pc is not None:
+                        with suppress(Exception):
+                            pc.DestroyPropertyCollector()
+                    if list_view is not None:
+                        with suppress(Exception):
+                            list_view.DestroyView()
+        except Exception:
+            logger.exception("IP watcher failed")
+            with self._lock:
+                self._running = False
+                self._guests.clear()
+                for waiter in (w for ws in self._waiters.values() for w in ws):
+                    waiter.fail()
+
+    @staticmethod
+    def _get_filter_spec(list_view: vim.view.ListView) -> PC.FilterSpec:
+        traversal_spec = PC.TraversalSpec(
+            name="traverseList", path="view", skip=False, type=vim.view.ListView
+        )
+        return PC.FilterSpec(
+            objectSet=[
+                PC.ObjectSpec(obj=list_view, skip=True, selectSet=[traversal_spec])
+            ],
+            propSet=[
+                PC.PropertySpec(type=vim.VirtualMachine, pathSet=list(GUEST_PROPERTIES))
+            ],
+        )
+
+    def _wait_for_updates(self, pc: vim.PropertyCollector) -> None:
+        options = PC.WaitOptions(maxWaitSeconds=settings.TASK_WAIT_POLL_SECONDS)
+        version = ""
+        while True:
+            with self._lock:
+                if not self._waiters:
+                    self._running = False
+                    return
+            update = pc.WaitForUpdatesEx(version, options)
+            if update is None:
+                continue
+            version = update.version
+            for filter_set in update.filterSet:
+                for obj_set in filter_set.objectSet:
+                    self._update(obj_set)
+
+    def _update(self, obj_set: PC.ObjectUpdate) -> None:
+        with self._lock:
+            if obj_set.kind == PC.ObjectUpdate.Kind.leave:
+                self._guests.pop(obj_set.obj, None)
+                return
+            props = self._guests.setdefault(obj_set.obj, {})
+            for change in obj_set.changeSet:
+                props[change.name] = None if change.op == "remove" else change.val
+            guest = get_guest_info(props)
+            for waiter in self._waiters.get(obj_set.obj, []):
+                waiter.update(guest)
+
+
+@define
+class IpWatchers:
+    """IP watchers of every vCenter shared by the driver commands."""
+
+    _lock: Lock = field(init=False, factory=Lock)
+    _watchers: dict[PoolKey, IpWatcher] = field(init=False, factory=dict)
+
+    def get(self, conf: VCenterResourceConfig) -> IpWatcher:
+        key = get_pool_key(conf)
+        with self._lock:
+            watcher = self._watchers.get(key)
+            if watcher is None:
+                watcher = self._watchers[key] = IpWatcher(conf)
+        return watcher
+
+
+ip_watchers = IpWatchers()
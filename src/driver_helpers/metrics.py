@@ -0,0 +1,335 @@
+"""Timing of the driver commands and the vCenter calls they make.
+
+Every command records the duration of its phases (resource config, vCenter
+session, task wait), the number of vCenter round trips, bytes sent and received
+and the number of task polls. The numbers are logged as one JSON line when the
+command ends and optionally aggregated into a Prometheus text file.
+
+vCenter calls are counted by the pyVmomi stub of the pooled session the command
+uses, so calls made from worker threads of the command are counted too.
+"""
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock, local
+from typing import TYPE_CHECKING, Any, TypeVar
+from weakref import WeakKeyDictionary
+
+from attrs import define, field
+
+from driver_helpers import settings
+
+if TYPE_CHECKING:
+    from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+DURATION_BUCKETS = (0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800)
+TASK_POLL_METHODS = ("WaitForUpdatesEx", "WaitForUpdates")
+COUNTERS = {
+    "errors": "Number of failed commands",
+    "api_seconds": "Time of the vCenter calls",
+    "round_trips": "Number of the vCenter calls",
+    "bytes_sent": "Bytes sent to the vCenter",
+    "bytes_received": "Bytes received from the vCenter",
+    "task_polls": "Number of the task polls",
+}
+
+
+@define
+class CommandMetrics:
+    command: str
+    resource_name: str
+    started: float = field(factory=time.perf_counter)
+    duration: float = 0.0
+    success: bool = True
+    phases: Counter[str] = field(factory=Counter)
+    calls: Counter[str] = field(factory=Counter)
+    round_trips: int = 0
+    api_time: float = 0.0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    task_polls: int = 0
+    _lock: Lock = field(factory=Lock)
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[name] += seconds
+
+    def add_call(self, mo: Any, method_name: str, seconds: float) -> None:
+        from pyVmomi import vim
+
+        with self._lock:
+            self.round_trips += 1
+            self.api_time += seconds
+            self.calls[method_name] += 1
+            if method_name in TASK_POLL_METHODS or isinstance(mo, vim.Task):
+                self.task_polls += 1
+
+    def add_bytes(self, sent: int = 0, received: int = 0) -> None:
+        with self._lock:
+            self.bytes_sent += sent
+            self.bytes_received += received
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "command": self.command,
+                "resource": self.resource_name,
+                "success": self.success,
+                "duration": round(self.duration, 3),
+                "phases": {k: round(v, 3) for k, v in self.phases.items()},
+                "round_trips": self.round_trips,
+                "api_time": round(self.api_time, 3),
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "task_polls": self.task_polls,
+                "top_calls": dict(self.calls.most_common(10)),
+            }
+
+
+_current: ContextVar[CommandMetrics | None] = ContextVar(
+    "command_metrics", default=None
+)
+_stubs: WeakKeyDictionary[Any, CommandMetrics] = WeakKeyDictionary()
+_call = local()
+
+
+def _get_stub(si: SiHandler) -> Any:
+    return si.get_vc_obj()._stub
+
+
+def _get_metrics(si: SiHandler | None = None) -> CommandMetrics | None:
+    metrics = _current.get()
+    if metrics is None and si is not None:
+        metrics = _stubs.get(_get_stub(si))
+    return metrics
+
+
+@contextmanager
+def phase(name: str, si: SiHandler | None = None) -> Iterator[None]:
+    """Adds the time spent in the block to the phase of the current command.
+
+    Worker threads don't see the current command, pass the session they use.
+    """
+    metrics = _get_metrics(si)
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_phase(name, time.perf_counter() - start)
+
+
+@contextmanager
+def bind_session(si: SiHandler) -> Iterator[None]:
+    """Counts vCenter calls of the session for the current command."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    _install_stub_hooks()
+    stub = _get_stub(si)
+    _stubs[stub] = metrics
+    try:
+        yield
+    finally:
+        _stubs.pop(stub, None)
+
+
+def command_metrics(func: F) -> F:
+    """Measures the driver command, the first argument is the command context."""
+    if not settings.METRICS_ENABLED:
+        return func
+
+    @functools.wraps(func)
+    def wrapped(self, context, *args, **kwargs):
+        metrics = CommandMetrics(func.__name__, _get_resource_name(context))
+        token = _current.set(metrics)
+        try:
+            return func(self, context, *args, **kwargs)
+        except BaseException:
+            metrics.success = False
+            raise
+        finally:
+            _current.reset(token)
+            metrics.duration = time.perf_counter() - metrics.started
+            _report(metrics)
+
+    return wrapped
+
+
+def _get_resource_name(context) -> str:
+    resource = getattr(context, "resource", None)
+    return getattr(resource, "name", "") or ""
+
+
+def _report(metrics: CommandMetrics) -> None:
+    try:
+        logger.info(f"Command metrics: {json.dumps(metrics.to_dict())}")
+        if settings.METRICS_FILE:
+            metrics_registry.observe(metrics)
+            metrics_registry.write(settings.METRICS_FILE)
+    except Exception:
+        logger.warning("Failed to report command metrics", exc_info=True)
+
+
+@define
+class MetricsRegistry:
+    """Totals of all commands since the driver started, per command name."""
+
+    _lock: Lock = field(init=False, factory=Lock)
+    _counters: dict[str, Counter] = field(
+        init=False, factory=lambda: defaultdict(Counter)
+    )
+    _phases: dict[tuple[str, str], float] = field(
+        init=False, factory=lambda: defaultdict(float)
+    )
+    _buckets: dict[str, Counter] = field(
+        init=False, factory=lambda: defaultdict(Counter)
+    )
+
+    def observe(self, metrics: CommandMetrics) -> None:
+        data = metrics.to_dict()
+        with self._lock:
+            counters = self._counters[metrics.command]
+            counters["count"] += 1
+            counters["errors"] += not metrics.success
+            counters["duration"] += metrics.duration
+            counters["api_seconds"] += metrics.api_time
+            for name in ("round_trips", "bytes_sent", "bytes_received", "task_polls"):
+                counters[name] += data[name]
+            for name, seconds in metrics.phases.items():
+                self._phases[(metrics.command, name)] += seconds
+            for bucket in DURATION_BUCKETS:
+                if metrics.duration <= bucket:
+                    self._buckets[metrics.command][bucket] += 1
+
+    def to_prometheus(self) -> str:
+        lines = []
+
+        def add_header(name: str, type_: str, help_: str) -> None:
+            lines.append(f"# HELP vcenter_command_{name} {help_}")
+            lines.append(f"# TYPE vcenter_command_{name} {type_}")
+
+        with self._lock:
+            commands = sorted(self._counters)
+            add_header("duration_seconds", "histogram", "Duration of the commands")
+            for cmd in commands:
+                counters = self._counters[cmd]
+                for bucket in DURATION_BUCKETS:
+                    count = self._buckets[cmd][bucket]
+                    lines.append(
+                        f'vcenter_command_duration_seconds_bucket{{command="{cmd}",'
+                        f'le="{bucket}"}} {count}'
+                    )
+                lines.extend(
+                    (
+                        f'vcenter_command_duration_seconds_bucket{{command="{cmd}",'
+                        f'le="+Inf"}} {counters["count"]}',
+                        f'vcenter_command_duration_seconds_sum{{command="{cmd}"}} '
+                        f'{round(counters["duration"], 3)}',
+                        f'vcenter_command_duration_seconds_count{{command="{cmd}"}} '
+                        f'{counters["count"]}',
+                    )
+                )
+            for name, help_ in COUNTERS.items():
+                add_header(f"{name}_total", "counter", help_)
+                for cmd in commands:
+                    value = round(self._counters[cmd][name], 3)
+                    lines.append(
+                        f'vcenter_command_{name}_total{{command="{cmd}"}} {value}'
+                    )
+            add_header("phase_seconds_total", "counter", "Time of the command phases")
+            for (cmd, name), seconds in sorted(self._phases.items()):
+                lines.append(
+                    f'vcenter_command_phase_seconds_total{{command="{cmd}",'
+                    f'phase="{name}"}} {round(seconds, 3)}'
+                )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        text = self.to_prometheus()
+        with self._lock:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+
+
+metrics_registry = MetricsRegistry()
+
+_hooks_lock = Lock()
+_hooks_installed = False
+
+
+def _install_stub_hooks() -> None:
+    """Count calls, bytes and time of every pyVmomi SOAP call of bound sessions.
+
+    Installed when the first session is bound, so pyVmomi isn't imported with
+    the driver.
+    """
+    global _hooks_installed
+    with _hooks_lock:
+        if _hooks_installed:
+            return
+        _hooks_installed = True
+
+    from pyVmomi import SoapAdapter
+
+    invoke_method = SoapAdapter.SoapStubAdapter.InvokeMethod
+    serialize_request = SoapAdapter.SoapStubAdapterBase.SerializeRequest
+    deserialize = SoapAdapter.SoapResponseDeserializer.Deserialize
+
+    @functools.wraps(invoke_method)
+    def _invoke_method(self, mo, info, args, outerStub=None):  # noqa: N803
+        metrics = _stubs.get(self)
+        if metrics is None:
+            return invoke_method(self, mo, info, args, outerStub)
+        _call.metrics = metrics
+        start = time.perf_counter()
+        try:
+            return invoke_method(self, mo, info, args, outerStub)
+        finally:
+            _call.metrics = None
+            metrics.add_call(mo, info.name, time.perf_counter() - start)
+
+    @functools.wraps(serialize_request)
+    def _serialize_request(self, mo, info, args):
+        req = serialize_request(self, mo, info, args)
+        if metrics := getattr(_call, "metrics", None):
+            metrics.add_bytes(sent=len(req))
+        return req
+
+    @functools.wraps(deserialize)
+    def _deserialize(self, response, *args, **kwargs):
+        if metrics := getattr(_call, "metrics", None):
+            response = _CountingReader(response, metrics)
+        return deserialize(self, response, *args, **kwargs)
+
+    SoapAdapter.SoapStubAdapter.InvokeMethod = _invoke_method
+    SoapAdapter.SoapStubAdapterBase.SerializeRequest = _serialize_request
+    SoapAdapter.SoapResponseDeserializer.Deserialize = _deserialize
+
+
+@define
+class _CountingReader:
+    _fd: Any
+    _metrics: CommandMetrics
+
+    def read(self, *args) -> bytes:
+        data = self._fd.read(*args)
+        self._metrics.add_bytes(received=len(data))
+        return data
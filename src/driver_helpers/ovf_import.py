@@ -0,0 +1,523 @@
+"""Native OVF/OVA import with ImportVApp and HttpNfcLease.
+
+The OVF Tool is a separate process per App that uploads the disks one by one.
+Here the image files are mapped into memory and streamed to the lease URLs, the
+OVA is not extracted, and the disks of the VM are uploaded in parallel. The
+lease progress is reported to vCenter, otherwise the lease expires.
+
+Like the OVF Tool, the files are checked against the digests of the manifest,
+the uploaded files are hashed while uploading, and images with EULAs are
+imported only with --acceptAllEulas.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import mmap
+import os
+import re
+import ssl
+import tarfile
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextlib import suppress
+from http.client import HTTPConnection, HTTPSConnection
+from threading import Event, Lock
+from urllib.parse import urlsplit, urlunsplit
+from xml.etree import ElementTree
+
+from attrs import define, field
+from cloudshell.cp.core.cancellation_manager import CancellationContextManager
+from pyVmomi import vim, vmodl
+
+from driver_helpers import metrics, settings
+
+from cloudshell.cp.vcenter.exceptions import BaseVCenterException
+from cloudshell.cp.vcenter.handlers.datastore_handler import DatastoreHandler
+from cloudshell.cp.vcenter.handlers.dc_handler import DcHandler
+from cloudshell.cp.vcenter.handlers.folder_handler import FolderHandler
+from cloudshell.cp.vcenter.handlers.resource_pool import ResourcePoolHandler
+from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+from cloudshell.cp.vcenter.handlers.vm_handler import VmHandler
+from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+logger = logging.getLogger(__name__)
+
+OVF_EXTENSIONS = (".ova", ".ovf")
+# OVF Tool arguments that don't change the imported VM
+IGNORED_OVF_TOOL_ARGS = {
+    "--noSSLVerify",
+    "--powerOffTarget",
+    "--quiet",
+}
+CANCELLATION_CHECK_INTERVAL = 1
+UPLOAD_TIMEOUT = 300
+# manifest lines, e.g. SHA256(disk1.vmdk)= 1f3c...
+MANIFEST_LINE = re.compile(r"(?P<algorithm>\w+)\((?P<href>.+)\)\s*=\s*(?P<digest>\w+)")
+MANIFEST_ALGORITHMS = {"SHA1": "sha1", "SHA256": "sha256", "SHA512": "sha512"}
+
+
+class UnsupportedOvfImage(BaseVCenterException):
+    """The image can't be imported natively, the OVF Tool is used."""
+
+
+class OvfImportFailed(BaseVCenterException):
+    pass
+
+
+def _map_file(path: str) -> mmap.mmap | None:
+    with open(path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return None  # an empty file can't be mapped
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class OvfPackage:
+    """OVF descriptor and the files of the image mapped into memory.
+
+    Files of an OVA are slices of the mapped archive. The digests of the manifest
+    are hashlib names and hex digests by the file hrefs.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.descriptor = ""
+        self.files: dict[str, memoryview] = {}
+        self.digests: dict[str, tuple[str, str]] = {}
+        self._descriptor_name = ""
+        self._descriptor_data = b""
+        self._manifest = b""
+        self._mmaps: list[mmap.mmap] = []
+        self._views: list[memoryview] = []
+        try:
+            if path.lower().endswith(".ova"):
+                self._open_ova()
+            else:
+                self._open_ovf()
+            self._check_references()
+            self._check_manifest()
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> OvfPackage:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def has_eulas(self) -> bool:
+        root = self._parse_descriptor()
+        return any(el.tag.rpartition("}")[2] == "EulaSection" for el in root.iter())
+
+    def close(self) -> None:
+        # views have to be released before the mapped files are closed
+        for view in reversed(self._views):
+            view.release()
+        for mapped in self._mmaps:
+            mapped.close()
+        self._views.clear()
+        self._mmaps.clear()
+        self.files.clear()
+
+    def _map(self, path: str) -> memoryview:
+        mapped = _map_file(path)
+        if mapped is None:
+            view = memoryview(b"")
+        else:
+            self._mmaps.append(mapped)
+            view = memoryview(mapped)
+        self._views.append(view)
+        return view
+
+    def _open_ova(self) -> None:
+        try:
+            # compressed archives have no file offsets to map
+            with tarfile.open(self.path, "r:") as tar:
+                members = [member for member in tar.getmembers() if member.isfile()]
+        except tarfile.TarError as e:
+            raise UnsupportedOvfImage(f"Cannot read the OVA {self.path}. {e}")
+
+        archive = self._map(self.path)
+        for member in members:
+            view = archive[member.offset_data : member.offset_data + member.size]
+            self._views.append(view)
+            self.files[member.name] = view
+
+        descriptor = next((n for n in self.files if n.lower().endswith(".ovf")), None)
+        if descriptor is None:
+            raise UnsupportedOvfImage(f"No OVF descriptor in the {self.path}")
+        self._descriptor_name = descriptor
+        self._descriptor_data = bytes(self.files[descriptor])
+        self.descriptor = self._descriptor_data.decode("utf-8-sig")
+        manifest = next((n for n in self.files if n.lower().endswith(".mf")), None)
+        if manifest is not None:
+            self._manifest = bytes(self.files[manifest])
+
+    def _open_ovf(self) -> None:
+        with open(self.path, "rb") as f:
+            self._descriptor_data = f.read()
+        self._descriptor_name = os.path.basename(self.path)
+        self.descriptor = self._descriptor_data.decode("utf-8-sig")
+        manifest_path = f"{os.path.splitext(self.path)[0]}.mf"
+        if os.path.isfile(manifest_path):
+            with open(manifest_path, "rb") as f:
+                self._manifest = f.read()
+        base_dir = os.path.dirname(self.path)
+        for href in self._get_references():
+            path = os.path.join(base_dir, href)
+            if "://" in href or not os.path.isfile(path):
+                raise UnsupportedOvfImage(f"File {href} of the {self.path} not found")
+            self.files[href] = self._map(path)
+
+    def _parse_descriptor(self) -> ElementTree.Element:
+        try:
+            return ElementTree.fromstring(self.descriptor)
+        except ElementTree.ParseError as e:
+            raise UnsupportedOvfImage(f"Invalid OVF descriptor {self.path}. {e}")
+
+    def _get_references(self) -> dict[str, dict[str, str]]:
+        """Attributes of the referenced files by their hrefs."""
+        root = self._parse_descriptor()
+        ns = root.tag[: root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+        references = {}
+        for file_el in root.iterfind(f"{ns}References/{ns}File"):
+            attrs = {key.removeprefix(ns): value for key, value in file_el.items()}
+            references[attrs["href"]] = attrs
+        return references
+
+    def _check_references(self) -> None:
+        for href, attrs in self._get_references().items():
+            if href not in self.files:
+                raise UnsupportedOvfImage(f"File {href} of the {self.path} not found")
+            if attrs.get("compression") or attrs.get("chunkSize"):
+                raise UnsupportedOvfImage(
+                    f"Compressed and chunked files are not supported, {href}"
+                )
+
+    def _check_manifest(self) -> None:
+        """Parse the manifest and check the digest of the descriptor.
+
+        The digests of the other files are checked while uploading them.
+        """
+        for line in self._manifest.decode("utf-8-sig").splitlines():
+            if not line.strip():
+                continue
+            match = MANIFEST_LINE.fullmatch(line.strip())
+            if not match:
+                raise UnsupportedOvfImage(f"Invalid manifest line of the {self.path}")
+            algorithm = MANIFEST_ALGORITHMS.get(match["algorithm"].upper())
+            if algorithm is None:
+                raise UnsupportedOvfImage(
+                    f"Manifest digest {match['algorithm']} is not supported"
+                )
+            self.digests[match["href"]] = (algorithm, match["digest"].lower())
+
+        for href in self.digests:
+            if href != self._descriptor_name and href not in self.files:
+                raise UnsupportedOvfImage(f"File {href} of the manifest not found")
+        if self._descriptor_name in self.digests:
+            algorithm, digest = self.digests[self._descriptor_name]
+            if hashlib.new(algorithm, self._descriptor_data).hexdigest() != digest:
+                raise OvfImportFailed(
+                    f"Digest of the OVF descriptor of the {self.path} doesn't match "
+                    f"the manifest"
+                )
+
+
+@define
+class OvfImportOptions:
+    """Import options taken from the OVF Tool arguments of the App."""
+
+    networks: dict[str, str] = field(factory=dict)
+    properties: dict[str, str] = field(factory=dict)
+    disk_mode: str | None = None
+    accept_all_eulas: bool = False
+
+    @classmethod
+    def from_ovf_tool_args(cls, args: list[str]) -> OvfImportOptions:
+        """Parse --net:, --prop:, --diskMode= and --acceptAllEulas arguments.
+
+        Other arguments are supported only by the OVF Tool.
+        """
+        self = cls()
+        for arg in args:
+            if arg in IGNORED_OVF_TOOL_ARGS:
+                continue
+            if arg == "--acceptAllEulas":
+                self.accept_all_eulas = True
+                continue
+            name, sep, value = arg.partition("=")
+            if name.startswith("--net:") and sep:
+                self.networks[name.removeprefix("--net:")] = value
+            elif name.startswith("--prop:") and sep:
+                self.properties[name.removeprefix("--prop:")] = value
+            elif name == "--diskMode" and sep:
+                self.disk_mode = value
+            else:
+                raise UnsupportedOvfImage(f"OVF Tool argument {arg} is not supported")
+        return self
+
+
+def get_native_import_options(
+    image: str, ovf_tool_args: list[str]
+) -> OvfImportOptions | None:
+    """Import options if the image can be imported without the OVF Tool.
+
+    Only local OVF and OVA images with uncompressed files are imported natively.
+    """
+    if not settings.OVF_NATIVE_IMPORT:
+        return None
+    if not image.lower().endswith(OVF_EXTENSIONS) or not os.path.isfile(image):
+        return None
+    try:
+        options = OvfImportOptions.from_ovf_tool_args(ovf_tool_args)
+        OvfPackage(image).close()
+    except UnsupportedOvfImage as e:
+        logger.info(f"The OVF Tool is used for the image {image}. {e}")
+        return None
+    return options
+
+
+@define
+class _Upload:
+    url: str
+    data: memoryview
+    # the file is created with PUT, existing disks are written with POST
+    create: bool
+    # hashlib name and hex digest of the manifest
+    digest: tuple[str, str] | None = None
+
+
+@define
+class _UploadProgress:
+    total: int
+    sent: int = 0
+    _lock: Lock = field(init=False, factory=Lock)
+
+    def add(self, size: int) -> None:
+        with self._lock:
+            self.sent += size
+
+    @property
+    def percent(self) -> int:
+        return min(self.sent * 100 // self.total, 99) if self.total else 99
+
+
+def _get_ssl_context() -> ssl.SSLContext:
+    # the vCenter session is also created without certificate verification
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+@define
+class OvfImporter:
+    _si: SiHandler
+    _resource_config: VCenterResourceConfig
+    _cancellation_manager: CancellationContextManager
+    _threads: int = settings.OVF_UPLOAD_THREADS
+    _chunk_size: int = settings.OVF_UPLOAD_CHUNK_SIZE
+
+    def import_vm(
+        self,
+        image: str,
+        options: OvfImportOptions,
+        vm_name: str,
+        vm_resource_pool: ResourcePoolHandler,
+        vm_storage: DatastoreHandler,
+        vm_folder: FolderHandler,
+        dc: DcHandler,
+        on_progress: Callable[[int], None] | None = None,
+    ) -> VmHandler:
+        """Import the image as a new powered off VM."""
+        logger.info(f"Importing the image {image} to the VM {vm_name}")
+        with OvfPackage(image) as package:
+            if package.has_eulas and not options.accept_all_eulas:
+                raise OvfImportFailed(
+                    f"The image {image} has EULAs, add --acceptAllEulas to the "
+                    f"OVF Tool arguments to accept them"
+                )
+            spec = self._create_import_spec(
+                package, options, vm_name, vm_resource_pool, vm_storage, dc
+            )
+            lease = vm_resource_pool.get_vc_obj().ImportVApp(
+                spec.importSpec, vm_folder.get_vc_obj()
+            )
+            try:
+                self._wait_lease_ready(lease)
+                uploads = self._get_uploads(lease, spec.fileItem or [], package)
+                with metrics.phase("ovf_upload", self._si):
+                    self._upload_files(lease, uploads, on_progress)
+            except Exception as e:
+                logger.warning(f"Failed to import the image {image}", exc_info=True)
+                with suppress(Exception):
+                    # the lease removes the partially imported VM
+                    lease.HttpNfcLeaseAbort(vmodl.fault.SystemError(reason=str(e)))
+                raise
+            lease.HttpNfcLeaseComplete()
+        vm = VmHandler(lease.info.entity, self._si)
+        logger.info(f"The image {image} is imported to the {vm}")
+        return vm
+
+    def _create_import_spec(
+        self,
+        package: OvfPackage,
+        options: OvfImportOptions,
+        vm_name: str,
+        vm_resource_pool: ResourcePoolHandler,
+        vm_storage: DatastoreHandler,
+        dc: DcHandler,
+    ) -> vim.OvfManager.CreateImportSpecResult:
+        params = vim.OvfManager.CreateImportSpecParams(
+            entityName=vm_name,
+            networkMapping=[
+                vim.OvfManager.NetworkMapping(
+                    name=ovf_network, network=dc.get_network(network).get_vc_obj()
+                )
+                for ovf_network, network in options.networks.items()
+            ],
+            propertyMapping=[
+                vim.KeyValue(key=key, value=value)
+                for key, value in options.properties.items()
+            ],
+        )
+        if options.disk_mode:
+            params.diskProvisioning = options.disk_mode
+
+        ovf_manager = self._si.get_vc_obj().content.ovfManager
+        result = ovf_manager.CreateImportSpec(
+            package.descriptor,
+            vm_resource_pool.get_vc_obj(),
+            vm_storage.get_vc_obj(),
+            params,
+        )
+        for warning in result.warning or []:
+            logger.warning(f"Import of the {package.path}: {warning.localizedMessage}")
+        if result.error:
+            errors = "; ".join(e.localizedMessage or str(e.fault) for e in result.error)
+            raise OvfImportFailed(f"Cannot import the {package.path}. {errors}")
+        return result
+
+    def _wait_lease_ready(self, lease: vim.HttpNfcLease) -> None:
+        while lease.state == vim.HttpNfcLease.State.initializing:
+            with self._cancellation_manager:
+                pass
+            time.sleep(CANCELLATION_CHECK_INTERVAL)
+        if lease.state == vim.HttpNfcLease.State.error:
+            raise OvfImportFailed(f"Import lease failed. {lease.error.msg}")
+
+    def _get_uploads(
+        self,
+        lease: vim.HttpNfcLease,
+        file_items: list[vim.OvfManager.FileItem],
+        package: OvfPackage,
+    ) -> list[_Upload]:
+        urls = {device.importKey: device.url for device in lease.info.deviceUrl}
+        uploads = []
+        for item in file_items:
+            if item.deviceId not in urls:
+                raise OvfImportFailed(f"No upload URL for the file {item.path}")
+            url = self._get_url(urls[item.deviceId])
+            uploads.append(
+                _Upload(
+                    url,
+                    package.files[item.path],
+                    bool(item.create),
+                    package.digests.get(item.path),
+                )
+            )
+        return uploads
+
+    def _get_url(self, url: str) -> str:
+        # ESXi returns '*' as the host if it doesn't know its address
+        parts = urlsplit(url)
+        if parts.hostname == "*":
+            netloc = parts.netloc.replace("*", self._resource_config.address, 1)
+            url = urlunsplit(parts._replace(netloc=netloc))
+        return url
+
+    def _upload_files(
+        self,
+        lease: vim.HttpNfcLease,
+        uploads: list[_Upload],
+        on_progress: Callable[[int], None] | None,
+    ) -> None:
+        """Upload the files in parallel and report the progress while waiting."""
+        progress = _UploadProgress(sum(len(upload.data) for upload in uploads))
+        stop = Event()
+        executor = ThreadPoolExecutor(max(self._threads, 1), "ovf-upload")
+        try:
+            futures = [
+                executor.submit(self._upload_file, upload, progress, stop)
+                for upload in uploads
+            ]
+            reported = time.monotonic()
+            while True:
+                done, not_done = wait(
+                    futures, CANCELLATION_CHECK_INTERVAL, FIRST_EXCEPTION
+                )
+                for future in done:
+                    future.result()
+                if not not_done:
+                    break
+                with self._cancellation_manager:
+                    pass
+                if time.monotonic() - reported >= settings.OVF_LEASE_PROGRESS_INTERVAL:
+                    reported = time.monotonic()
+                    lease.HttpNfcLeaseProgress(progress.percent)
+                    if on_progress is not None:
+                        on_progress(progress.percent)
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+        if on_progress is not None:
+            on_progress(100)
+
+    def _upload_file(self, upload: _Upload, progress: _UploadProgress, stop: Event):
+        parts = urlsplit(upload.url)
+        if parts.scheme == "https":
+            conn = HTTPSConnection(
+                parts.hostname,
+                parts.port,
+                timeout=UPLOAD_TIMEOUT,
+                context=_get_ssl_context(),
+            )
+        else:
+            conn = HTTPConnection(parts.hostname, parts.port, timeout=UPLOAD_TIMEOUT)
+        path = f"{parts.path}?{parts.query}" if parts.query else parts.path
+        size = len(upload.data)
+        hasher = hashlib.new(upload.digest[0]) if upload.digest else None
+        try:
+            conn.putrequest("PUT" if upload.create else "POST", path)
+            conn.putheader("Content-Type", "application/x-vnd.vmware-streamVmdk")
+            conn.putheader("Content-Length", str(size))
+            conn.putheader("Cookie", self._si.get_vc_obj()._stub.cookie)
+            conn.endheaders()
+            for offset in range(0, size, self._chunk_size):
+                if stop.is_set():
+                    raise OvfImportFailed(f"Upload to {parts.path} is stopped")
+                with upload.data[offset : offset + self._chunk_size] as chunk:
+                    if hasher:
+                        hasher.update(chunk)
+                    conn.send(chunk)
+                    progress.add(len(chunk))
+            if hasher and hasher.hexdigest() != upload.digest[1]:
+                # the lease is aborted and the imported VM is removed
+                raise OvfImportFailed(
+                    f"Digest of the file uploaded to {parts.path} doesn't match "
+                    f"the manifest"
+                )
+            response = conn.getresponse()
+            response.read()
+            if response.status not in (200, 201):
+                raise OvfImportFailed(
+                    f"Upload to {parts.path} failed. "
+                    f"{response.status} {response.reason}"
+                )
+            logger.debug(f"Uploaded {size} bytes to {parts.path}")
+        finally:
+            conn.close()
@@ -0,0 +1,113 @@
+"""Bulk retrieval of managed object properties.
+
+pyVmomi fetches every property of a managed object with a separate call. These
+helpers retrieve the needed properties of many objects in one call.
+"""
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from typing import Any
+
+from pyVmomi import vim, vmodl
+
+from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+
+logger = logging.getLogger(__name__)
+
+PC = vmodl.query.PropertyCollector
+
+
+def retrieve_properties(
+    si: SiHandler,
+    vc_objs: Iterable[vim.ManagedEntity],
+    vim_type: type[vim.ManagedEntity],
+    path_set: Iterable[str],
+) -> dict[vim.ManagedEntity, dict[str, Any]]:
+    """Retrieve properties of the objects with one RetrievePropertiesEx call.
+
+    :return: properties by the objects. Properties that are not set have None
+        value, properties that failed to be retrieved are missing.
+    """
+    vc_objs = list(vc_objs)
+    path_set = list(path_set)
+    if not vc_objs:
+        return {}
+
+    filter_spec = PC.FilterSpec(
+        objectSet=[PC.ObjectSpec(obj=vc_obj) for vc_obj in vc_objs],
+        propSet=[PC.PropertySpec(type=vim_type, pathSet=path_set)],
+    )
+    return _retrieve(si, filter_spec, path_set)
+
+
+def retrieve_container_properties(
+    si: SiHandler,
+    container: vim.ManagedEntity,
+    vim_types: list[type[vim.ManagedEntity]],
+    path_set: Iterable[str],
+) -> dict[vim.ManagedEntity, dict[str, Any]]:
+    """Retrieve properties of all the objects of the types inside the container."""
+    path_set = list(path_set)
+    view_manager = si.get_vc_obj().content.viewManager
+    view = view_manager.CreateContainerView(container, vim_types, True)
+    try:
+        traversal_spec = PC.TraversalSpec(
+            name="traverseView", path="view", skip=False, type=vim.view.ContainerView
+        )
+        filter_spec = PC.FilterSpec(
+            objectSet=[PC.ObjectSpec(obj=view, skip=True, selectSet=[traversal_spec])],
+            propSet=[
+                PC.PropertySpec(type=vim_type, pathSet=path_set)
+                for vim_type in vim_types
+            ],
+        )
+        return _retrieve(si, filter_spec, path_set)
+    finally:
+        view.DestroyView()
+
+
+def rebind(vc_obj: vim.ManagedEntity, si: SiHandler) -> vim.ManagedEntity:
+    """Bind the managed object reference to the session."""
+    return type(vc_obj)(vc_obj._moId, si.get_vc_obj()._stub)
+
+
+def _retrieve(
+    si: SiHandler, filter_spec: PC.FilterSpec, path_set: list[str]
+) -> dict[vim.ManagedEntity, dict[str, Any]]:
+    pc = si.get_vc_obj().content.propertyCollector
+    result = pc.RetrievePropertiesEx([filter_spec], PC.RetrieveOptions())
+    objs_props = {}
+    while result:
+        for obj_content in result.objects:
+            props = dict.fromkeys(path_set)
+            props.update({prop.name: prop.val for prop in obj_content.propSet})
+            for missing in obj_content.missingSet or []:
+                props.pop(missing.path, None)
+            objs_props[obj_content.obj] = props
+        if not result.token:
+            break
+        result = pc.ContinueRetrievePropertiesEx(result.token)
+    logger.debug(f"Retrieved properties of {len(objs_props)} objects")
+    return objs_props
+
+
+class PrefetchedObj:
+    """Managed object proxy that serves retrieved properties without calls.
+
+    Properties that were not retrieved are read from the managed object.
+    Should only be used for reading, pass the real object to the API methods.
+    """
+
+    def __init__(self, vc_obj: vim.ManagedEntity, props: dict[str, Any]):
+        self._vc_obj = vc_obj
+        self._props = props
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._props[name]
+        except KeyError:
+            return getattr(self._vc_obj, name)
+
+    def __repr__(self) -> str:
+        return f"Prefetched {self._vc_obj!r}"
@@ -0,0 +1,97 @@
+"""Driver tuning knobs.
+
+Every value can be overridden on the Execution Server with an environment variable
+of the same name prefixed with ``VCENTER_``, e.g. ``VCENTER_SI_POOL_SIZE=10``.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+
+
+def _get_int(name: str, default: int) -> int:
+    return int(os.environ.get(f"VCENTER_{name}", default))
+
+
+def _get_float(name: str, default: float) -> float:
+    return float(os.environ.get(f"VCENTER_{name}", default))
+
+
+def _get_str(name: str, default: str) -> str:
+    return os.environ.get(f"VCENTER_{name}", default)
+
+
+# max number of idle vCenter sessions kept per vCenter address and user
+SI_POOL_SIZE = _get_int("SI_POOL_SIZE", 5)
+# idle sessions are pinged with this interval so vCenter doesn't expire them
+SI_KEEP_ALIVE_INTERVAL = _get_float("SI_KEEP_ALIVE_INTERVAL", 300)
+# a session idle for longer than this is checked before it is reused
+SI_VALIDATE_AFTER = _get_float("SI_VALIDATE_AFTER", 60)
+# idle sessions older than this are logged out
+SI_MAX_IDLE_TIME = _get_float("SI_MAX_IDLE_TIME", 1800)
+# CloudShell API session is reused for this long, the parsed resource config
+# is reused until the resource attributes change
+CONTEXT_CACHE_TTL = _get_float("CONTEXT_CACHE_TTL", 300)
+CONTEXT_CACHE_SIZE = _get_int("CONTEXT_CACHE_SIZE", 32)
+# max time of one property collector long-poll, cancellation is checked between them
+TASK_WAIT_POLL_SECONDS = _get_int("TASK_WAIT_POLL_SECONDS", 10)
+# VMs of GetVmDetails whose properties are retrieved with one call
+VM_DETAILS_BATCH_SIZE = _get_int("VM_DETAILS_BATCH_SIZE", 50)
+# workers preparing the VM details that need more calls
+VM_DETAILS_WORKERS = _get_int("VM_DETAILS_WORKERS", 8)
+# max number of tasks and guest OS customizations of one bulk command run at once
+BULK_TASKS_LIMIT = _get_int("BULK_TASKS_LIMIT", 20)
+# VMs of one bulk command searched by UUID at once
+VM_SEARCH_WORKERS = _get_int("VM_SEARCH_WORKERS", 8)
+# max number of inventory paths kept in the inventory index
+INVENTORY_INDEX_SIZE = _get_int("INVENTORY_INDEX_SIZE", 10000)
+# lookups prepared by one Deploy are reused by Apps deployed together for this long
+DEPLOY_PREPARATION_TTL = _get_float("DEPLOY_PREPARATION_TTL", 120)
+# max number of clones running at once on one datastore and on one cluster or host
+DEPLOY_CLONES_PER_DATASTORE = _get_int("DEPLOY_CLONES_PER_DATASTORE", 4)
+DEPLOY_CLONES_PER_HOST = _get_int("DEPLOY_CLONES_PER_HOST", 8)
+# standby linked clones kept per source, 0 disables the standby pools
+STANDBY_POOL_SIZE = _get_int("STANDBY_POOL_SIZE", 0)
+# max number of the most recently deployed sources that keep standby pools
+STANDBY_POOL_SOURCES = _get_int("STANDBY_POOL_SOURCES", 5)
+# standby pools not claimed from for this long are deleted
+STANDBY_POOL_MAX_IDLE_TIME = _get_float("STANDBY_POOL_MAX_IDLE_TIME", 4 * 3600)
+STANDBY_POOL_CHECK_INTERVAL = _get_float("STANDBY_POOL_CHECK_INTERVAL", 60)
+# folder inside the VM location with the standby clones
+STANDBY_POOL_FOLDER = _get_str("STANDBY_POOL_FOLDER", "Standby VMs")
+# local OVF/OVA images are imported with ImportVApp instead of the OVF Tool
+OVF_NATIVE_IMPORT = _get_int("OVF_NATIVE_IMPORT", 1)
+# disks of one image uploaded at once and the size of one upload write
+OVF_UPLOAD_THREADS = _get_int("OVF_UPLOAD_THREADS", 4)
+OVF_UPLOAD_CHUNK_SIZE = _get_int("OVF_UPLOAD_CHUNK_SIZE", 1024 * 1024)
+# the import progress is reported to vCenter with this interval,
+# the lease expires if it isn't updated for 5 minutes
+OVF_LEASE_PROGRESS_INTERVAL = _get_float("OVF_LEASE_PROGRESS_INTERVAL", 10)
+# an image is imported once as a template and the Apps are cloned from it
+OVF_IMAGE_TEMPLATES = _get_int("OVF_IMAGE_TEMPLATES", 1)
+# folder inside the VM location with the image templates
+OVF_IMAGE_TEMPLATE_FOLDER = _get_str("OVF_IMAGE_TEMPLATE_FOLDER", "Image Templates")
+# unfinished image template imports older than this are deleted
+OVF_IMAGE_IMPORT_MAX_TIME = _get_float("OVF_IMAGE_IMPORT_MAX_TIME", 24 * 3600)
+# cluster usage is sampled with this interval while Get Cluster Usage is called,
+# 0 queries the vCenter on every call
+CLUSTER_USAGE_REFRESH_INTERVAL = _get_float("CLUSTER_USAGE_REFRESH_INTERVAL", 30)
+# sampling stops when the usage isn't requested for this long
+CLUSTER_USAGE_MAX_IDLE_TIME = _get_float("CLUSTER_USAGE_MAX_IDLE_TIME", 600)
+# number of the last usage samples kept for the history
+CLUSTER_USAGE_HISTORY_SIZE = _get_int("CLUSTER_USAGE_HISTORY_SIZE", 120)
+# attribute hints and successful attribute validations are reused for this long
+ATTRIBUTE_HINTS_TTL = _get_float("ATTRIBUTE_HINTS_TTL", 120)
+ATTRIBUTE_HINTS_CACHE_SIZE = _get_int("ATTRIBUTE_HINTS_CACHE_SIZE", 256)
+# hints that don't depend on other attributes are loaded when the driver starts
+ATTRIBUTE_HINTS_PREFETCH = _get_int("ATTRIBUTE_HINTS_PREFETCH", 1)
+# Autoload validates only the attributes changed since the last successful one
+AUTOLOAD_INCREMENTAL = _get_int("AUTOLOAD_INCREMENTAL", 0)
+# fingerprints of the last successful Autoload of every resource
+AUTOLOAD_STATE_DIR = _get_str(
+    "AUTOLOAD_STATE_DIR", os.path.join(tempfile.gettempdir(), "vcenter-autoload")
+)
+# every command logs its phase durations and vCenter calls
+METRICS_ENABLED = _get_int("METRICS_ENABLED", 1)
+# totals of the commands are written to this Prometheus text file if it's set
+METRICS_FILE = _get_str("METRICS_FILE", "")
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from collections import defaultdict, deque
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
+from threading import Event, Lock, Thread
+from typing import TYPE_CHECKING, Any
+
+from attrs import define, field
+
+from driver_helpers import metrics, settings
+
+if TYPE_CHECKING:
+    from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+    from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+logger = logging.getLogger(__name__)
+
+PoolKey = tuple[str, str, str]
+
+
+def get_pool_key(conf: VCenterResourceConfig) -> PoolKey:
+    password_hash = hashlib.sha256(conf.password.encode()).hexdigest()
+    return conf.address, conf.user, password_hash
+
+
+def get_vcenter_key(conf: VCenterResourceConfig, *parts: Any) -> tuple:
+    """Key of the vCenter objects shared by the commands of the same vCenter."""
+    return (get_pool_key(conf), conf.default_datacenter, *parts)
+
+
+def is_session_alive(si: SiHandler) -> bool:
+    try:
+        session_manager = si.get_vc_obj().content.sessionManager
+        return session_manager.currentSession is not None
+    except Exception:
+        return False
+
+
+def disconnect(si: SiHandler) -> None:
+    from pyVim.connect import Disconnect
+
+    vc_obj = si.get_vc_obj()
+    with suppress(Exception):
+        Disconnect(vc_obj)
+    # Disconnect makes session not valid but left opened socket
+    vc_obj._stub.DropConnections()
+
+
+@define
+class _PooledSi:
+    si: SiHandler
+    last_used: float = field(factory=time.monotonic)
+
+    def idle_time(self) -> float:
+        return time.monotonic() - self.last_used
+
+    def touch(self) -> None:
+        self.last_used = time.monotonic()
+
+
+@define
+class SiPool:
+    """Process-wide pool of logged in vCenter sessions.
+
+    Sessions are keyed by vCenter address, user and password hash, so changing
+    the credentials of the resource never reuses an old session. Each command gets
+    exclusive use of a session; if there is no idle session a new one is opened,
+    and on release at most max_size idle sessions per key are kept.
+    """
+
+    max_size: int = settings.SI_POOL_SIZE
+    keep_alive_interval: float = settings.SI_KEEP_ALIVE_INTERVAL
+    validate_after: float = settings.SI_VALIDATE_AFTER
+    max_idle_time: float = settings.SI_MAX_IDLE_TIME
+    _lock: Lock = field(init=False, factory=Lock)
+    _idle: dict[PoolKey, deque[_PooledSi]] = field(
+        init=False, factory=lambda: defaultdict(deque)
+    )
+    _keep_alive_stop: Event | None = field(init=False, default=None)
+
+    @contextmanager
+    def session(self, conf: VCenterResourceConfig) -> Iterator[SiHandler]:
+        key = get_pool_key(conf)
+        with metrics.phase("session"):
+            pooled = self._acquire(key, conf)
+        try:
+            with metrics.bind_session(pooled.si):
+                yield pooled.si
+        finally:
+            self._release(key, pooled)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._keep_alive_stop:
+                self._keep_alive_stop.set()
+                self._keep_alive_stop = None
+            sessions = [pooled.si for idle in self._idle.values() for pooled in idle]
+            self._idle.clear()
+
+        logger.info(f"Closing {len(sessions)} pooled vCenter sessions")
+        for si in sessions:
+            disconnect(si)
+
+    def _acquire(self, key: PoolKey, conf: VCenterResourceConfig) -> _PooledSi:
+        while pooled := self._pop_idle(key):
+            if pooled.idle_time() < self.validate_after or is_session_alive(pooled.si):
+                logger.debug(f"Reusing pooled vCenter session for {conf.address}")
+                return pooled
+            logger.info(f"Pooled vCenter session for {conf.address} expired")
+            disconnect(pooled.si)
+
+        from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+
+        self._start_keep_alive()
+        return _PooledSi(SiHandler.from_config(conf))
+
+    def _release(self, key: PoolKey, pooled: _PooledSi) -> None:
+        pooled.touch()
+        with self._lock:
+            idle = self._idle[key]
+            if len(idle) < self.max_size:
+                idle.append(pooled)
+                return
+        disconnect(pooled.si)
+
+    def _pop_idle(self, key: PoolKey) -> _PooledSi | None:
+        with self._lock:
+            idle = self._idle.get(key)
+            # the most recently used session is the most likely to be alive
+            return idle.pop() if idle else None
+
+    def _start_keep_alive(self) -> None:
+        with self._lock:
+            if self._keep_alive_stop:
+                return
+            self._keep_alive_stop = stop = Event()
+        thread = Thread(
+            target=self._keep_alive, args=(stop,), name="si-keep-alive", daemon=True
+        )
+        thread.start()
+
+    def _keep_alive(self, stop: Event) -> None:
+        while not stop.wait(self.keep_alive_interval):
+            with self._lock:
+                keys = list(self._idle)
+            for key in keys:
+                self._keep_alive_key(key)
+
+    def _keep_alive_key(self, key: PoolKey) -> None:
+        with self._lock:
+            idle = self._idle.get(key, deque())
+            sessions = list(idle)
+            idle.clear()
+
+        alive = []
+        for pooled in sessions:
+            if pooled.idle_time() < self.max_idle_time and is_session_alive(pooled.si):
+                alive.append(pooled)
+            else:
+                disconnect(pooled.si)
+
+        with self._lock:
+            idle = self._idle[key]
+            while alive and len(idle) < self.max_size:
+                idle.appendleft(alive.pop())
+        for pooled in alive:
+            disconnect(pooled.si)
+
+
+si_pool = SiPool()
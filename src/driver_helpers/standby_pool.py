@@ -0,0 +1,373 @@
+"""Standby pools of linked clones ready to be claimed by Deploy.
+
+A pool keeps powered off linked clones of one source snapshot in its own folder
+under the standby folder, placed on the same resource pool and datastore as the
+deployed VMs. Deploy claims a clone from the pool and a background thread clones
+new ones. Pools are created on the first Deploy of a source; only the most
+recently used sources keep their pools, and pools that weren't claimed from for
+a while are deleted. Clones left in the pool folders are adopted after restart.
+
+Several processes can share a pool folder, so a clone is claimed in the vCenter:
+the claim mark is added with a config change that fails if the clone changed
+since it was checked to be unclaimed and still in the pool folder. A pool is
+drained when the source snapshot changes.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from collections.abc import Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext, suppress
+from threading import Event, Lock, Thread
+
+from attrs import define, field
+from pyVmomi import vim, vmodl
+
+from driver_helpers import settings
+from driver_helpers.deploy_pipeline import clone_limits
+from driver_helpers.inventory_index import IndexedInventory
+from driver_helpers.property_collector import rebind, retrieve_properties
+from driver_helpers.si_pool import si_pool
+from driver_helpers.task_waiter import wait_for_tasks
+
+from cloudshell.cp.vcenter.handlers.folder_handler import (
+    FolderHandler,
+    FolderIsNotEmpty,
+)
+from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+from cloudshell.cp.vcenter.handlers.task import TaskState
+from cloudshell.cp.vcenter.handlers.vcenter_path import VcenterPath
+from cloudshell.cp.vcenter.handlers.vm_handler import VmHandler
+from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+logger = logging.getLogger(__name__)
+
+# extra config option of the claimed standby clones
+CLAIM_MARK = "cloudshell.standby.claim"
+
+
+def get_standby_folder_path(vm_location: str, source_key: Hashable) -> VcenterPath:
+    source_hash = hashlib.sha1(repr(source_key).encode()).hexdigest()[:12]
+    path = VcenterPath(vm_location)
+    path.append(settings.STANDBY_POOL_FOLDER)
+    path.append(source_hash)
+    return path
+
+
+def get_claimed_vm_spec(vm_name: str) -> vim.vm.ConfigSpec:
+    """Config spec renaming the claimed clone and removing the claim mark.
+
+    Should be applied after the clone was moved out of the pool folder.
+    """
+    # an empty value removes the option
+    return vim.vm.ConfigSpec(
+        name=vm_name, extraConfig=[vim.option.OptionValue(key=CLAIM_MARK, value="")]
+    )
+
+
+@define
+class StandbySource:
+    """Source snapshot and placement of the standby clones."""
+
+    vc_vm: vim.VirtualMachine
+    vc_snapshot: vim.vm.Snapshot
+    vc_resource_pool: vim.ResourcePool
+    vc_datastore: vim.Datastore
+    folder_path: VcenterPath
+    # clone slots shared with Deploy, see clone_limits
+    datastore_key: Hashable
+    host_key: Hashable
+
+    def get_clone_spec(self, si: SiHandler) -> vim.vm.CloneSpec:
+        location = vim.vm.RelocateSpec(
+            datastore=rebind(self.vc_datastore, si),
+            pool=rebind(self.vc_resource_pool, si),
+            diskMoveType="createNewChildDiskBacking",
+        )
+        return vim.vm.CloneSpec(
+            powerOn=False,
+            template=False,
+            snapshot=rebind(self.vc_snapshot, si),
+            location=location,
+        )
+
+
+@define
+class StandbyPool:
+    """Standby clones of one source."""
+
+    name: str
+    _resource_conf: VCenterResourceConfig
+    _source: StandbySource
+    size: int = settings.STANDBY_POOL_SIZE
+    hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+    last_used: float = field(init=False, factory=time.monotonic)
+    _lock: Lock = field(init=False, factory=Lock)
+    _ready: deque[vim.VirtualMachine] = field(init=False, factory=deque)
+    _adopted: bool = field(init=False, default=False)
+
+    _vc_folder: vim.Folder | None = field(init=False, default=None)
+
+    @property
+    def resource_conf(self) -> VCenterResourceConfig:
+        return self._resource_conf
+
+    @property
+    def source(self) -> StandbySource:
+        return self._source
+
+    def idle_time(self) -> float:
+        return time.monotonic() - self.last_used
+
+    def claim(self, si: SiHandler) -> VmHandler | None:
+        """Take a standby clone out of the pool.
+
+        The clone should be moved out of the pool folder and then reconfigured
+        with the get_claimed_vm_spec.
+        """
+        self.last_used = time.monotonic()
+        while vc_vm := self._pop_ready():
+            vc_vm = rebind(vc_vm, si)
+            if not self._mark_claimed(si, vc_vm):
+                continue
+            vm = VmHandler(vc_vm, si)
+            logger.info(f"Claimed {vm} from the {self}")
+            self.hits += 1
+            logger.info(f"Stats of the {self}: {self._stats}")
+            return vm
+
+        self.misses += 1
+        logger.info(f"The {self} is empty, {self._stats}")
+        return None
+
+    def refill(self, si: SiHandler) -> None:
+        folder = self._get_folder(si)
+        if not self._adopted:
+            self._adopt(folder)
+
+        with self._lock:
+            missing = self.size - len(self._ready)
+        if missing <= 0:
+            return
+
+        logger.info(f"Cloning {missing} standby VMs for the {self}")
+        vc_vm = rebind(self._source.vc_vm, si)
+        spec = self._source.get_clone_spec(si)
+        vc_folder = folder.get_vc_obj()
+
+        def clone() -> None:
+            # every clone takes a slot like a deployed VM,
+            # so refills don't overload the datastore of the Apps being deployed
+            with clone_limits.slot(
+                self._source.datastore_key, self._source.host_key, nullcontext()
+            ):
+                vc_task = vc_vm.Clone(
+                    folder=vc_folder, name=self._new_vm_name(), spec=spec
+                )
+                (task,) = wait_for_tasks(si, [vc_task])
+            if task.state is TaskState.success:
+                with self._lock:
+                    self._ready.append(task.result)
+            else:
+                logger.warning(f"Failed to clone a standby VM for the {self}: {task}")
+
+        workers = min(missing, clone_limits.per_datastore)
+        with ThreadPoolExecutor(workers) as executor:
+            for future in [executor.submit(clone) for _ in range(missing)]:
+                future.result()
+
+    def drain(self, si: SiHandler) -> None:
+        """Delete the standby clones and the pool folder.
+
+        Clones are claimed before deleting, so the clones claimed by other
+        processes aren't deleted.
+        """
+        with self._lock:
+            vc_vms = list(self._ready)
+            self._ready.clear()
+        vc_vms = [
+            vc_vm
+            for vc_vm in (rebind(vc_vm, si) for vc_vm in vc_vms)
+            if self._mark_claimed(si, vc_vm)
+        ]
+        logger.info(f"Deleting {len(vc_vms)} standby VMs of the {self}")
+        tasks = wait_for_tasks(si, [vc_vm.Destroy_Task() for vc_vm in vc_vms])
+        failed = [task for task in tasks if task.state is not TaskState.success]
+        if failed:
+            logger.warning(f"Failed to delete {len(failed)} standby VMs of the {self}")
+        else:
+            # other processes can have clones in the folder
+            with suppress(FolderIsNotEmpty):
+                self._get_folder(si).destroy()
+
+    def __repr__(self) -> str:
+        return f"Standby Pool '{self.name}'"
+
+    @property
+    def _stats(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {len(self._ready)} ready"
+
+    def _pop_ready(self) -> vim.VirtualMachine | None:
+        with self._lock:
+            # the oldest clones first
+            return self._ready.popleft() if self._ready else None
+
+    def _get_folder(self, si: SiHandler) -> FolderHandler:
+        dc = IndexedInventory(si, self._resource_conf).get_dc()
+        folder = dc.get_or_create_vm_folder(self._source.folder_path)
+        self._vc_folder = folder.get_vc_obj()
+        return folder
+
+    def _mark_claimed(self, si: SiHandler, vc_vm: vim.VirtualMachine) -> bool:
+        """Add the claim mark to the clone if it's still unclaimed in the pool.
+
+        The config change fails if the clone was changed since it was checked,
+        e.g. another process claimed it.
+        """
+        try:
+            props = retrieve_properties(
+                si,
+                [vc_vm],
+                vim.VirtualMachine,
+                ["parent", "config.changeVersion", "config.extraConfig"],
+            ).get(vc_vm, {})
+            if not props.get("config.changeVersion"):
+                logger.info(f"Standby VM {vc_vm._moId} of the {self} was deleted")
+                return False
+            claimed = any(
+                option.key == CLAIM_MARK
+                for option in props.get("config.extraConfig") or []
+            )
+            if claimed or props.get("parent") != self._vc_folder:
+                logger.info(f"Standby VM {vc_vm._moId} of the {self} was claimed")
+                return False
+
+            spec = vim.vm.ConfigSpec(
+                changeVersion=props["config.changeVersion"],
+                extraConfig=[
+                    vim.option.OptionValue(key=CLAIM_MARK, value=uuid.uuid4().hex)
+                ],
+            )
+            (task,) = wait_for_tasks(si, [vc_vm.ReconfigVM_Task(spec)])
+        except vmodl.fault.ManagedObjectNotFound:
+            logger.info(f"Standby VM {vc_vm._moId} of the {self} was deleted")
+            return False
+
+        if task.state is not TaskState.success:
+            logger.info(f"Failed to claim the standby VM {vc_vm._moId}: {task}")
+            return False
+        return True
+
+    def _adopt(self, folder: FolderHandler) -> None:
+        vc_vms = [
+            vc_obj
+            for vc_obj in folder.get_vc_obj().childEntity
+            if isinstance(vc_obj, vim.VirtualMachine)
+        ]
+        with self._lock:
+            self._ready.extend(vc_vms)
+        self._adopted = True
+        if vc_vms:
+            logger.info(f"Adopted {len(vc_vms)} standby VMs of the {self}")
+
+    def _new_vm_name(self) -> str:
+        return f"{self.name}-standby-{uuid.uuid4().hex[:8]}"
+
+
+@define
+class StandbyPools:
+    """Standby pools of the most recently deployed linked-clone sources."""
+
+    size: int = settings.STANDBY_POOL_SIZE
+    max_sources: int = settings.STANDBY_POOL_SOURCES
+    max_idle_time: float = settings.STANDBY_POOL_MAX_IDLE_TIME
+    check_interval: float = settings.STANDBY_POOL_CHECK_INTERVAL
+    _lock: Lock = field(init=False, factory=Lock)
+    _pools: OrderedDict[Hashable, StandbyPool] = field(init=False, factory=OrderedDict)
+    _evicted: list[StandbyPool] = field(init=False, factory=list)
+    _wake: Event = field(init=False, factory=Event)
+    _stop: Event | None = field(init=False, default=None)
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0 and self.max_sources > 0
+
+    def get(
+        self,
+        key: Hashable,
+        source: StandbySource,
+        create: Callable[[], StandbyPool],
+    ) -> StandbyPool:
+        """Get the pool of the source, the pool of another snapshot is drained."""
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool and pool.source.vc_snapshot != source.vc_snapshot:
+                logger.info(f"The source snapshot of the {pool} changed")
+                del self._pools[key]
+                self._evicted.append(pool)
+                pool = None
+            if pool is None:
+                pool = self._pools[key] = create()
+                logger.info(f"Created the {pool}")
+            self._pools.move_to_end(key)
+            while len(self._pools) > self.max_sources:
+                _, evicted = self._pools.popitem(last=False)
+                self._evicted.append(evicted)
+        self._start_maintenance()
+        return pool
+
+    def refill_soon(self) -> None:
+        self._wake.set()
+
+    def close(self) -> None:
+        """Stop the maintenance, standby clones are adopted after restart."""
+        with self._lock:
+            if self._stop:
+                self._stop.set()
+                self._stop = None
+            self._pools.clear()
+        self._wake.set()
+
+    def _start_maintenance(self) -> None:
+        with self._lock:
+            if self._stop:
+                return
+            self._stop = stop = Event()
+        thread = Thread(
+            target=self._maintain, args=(stop,), name="standby-pools", daemon=True
+        )
+        thread.start()
+
+    def _maintain(self, stop: Event) -> None:
+        while not stop.is_set():
+            self._wake.clear()
+            with self._lock:
+                for key, pool in list(self._pools.items()):
+                    if pool.idle_time() > self.max_idle_time:
+                        del self._pools[key]
+                        self._evicted.append(pool)
+                evicted, self._evicted = self._evicted, []
+                pools = list(self._pools.values())
+
+            for pool in evicted:
+                self._run(pool, pool.drain)
+            for pool in pools:
+                if not stop.is_set():
+                    self._run(pool, pool.refill)
+            self._wake.wait(self.check_interval)
+
+    @staticmethod
+    def _run(pool: StandbyPool, func: Callable[[SiHandler], None]) -> None:
+        try:
+            with si_pool.session(pool.resource_conf) as si:
+                func(si)
+        except Exception:
+            logger.exception(f"Failed to maintain the {pool}")
+
+
+standby_pools = StandbyPools()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from contextlib import nullcontext
+
+from cloudshell.cp.core.cancellation_manager import CancellationContextManager
+from pyVmomi import vim, vmodl
+
+from driver_helpers import metrics, settings
+
+from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+from cloudshell.cp.vcenter.handlers.task import Task
+
+logger = logging.getLogger(__name__)
+
+_FINISHED_STATES = (vim.TaskInfo.State.success, vim.TaskInfo.State.error)
+
+
+def wait_for_tasks(
+    si: SiHandler,
+    vc_tasks: Iterable[vim.Task],
+    cancellation_manager: CancellationContextManager | None = None,
+) -> list[Task]:
+    """Wait for all the tasks with one property collector instead of polling each.
+
+    A dedicated property collector is used so concurrent waiters in the same
+    session don't consume each other's updates. Failed tasks are not raised,
+    check the state of the returned tasks.
+    """
+    vc_tasks = list(vc_tasks)
+    if not vc_tasks:
+        return []
+
+    logger.debug(f"Waiting for {len(vc_tasks)} tasks")
+    with metrics.phase("task_wait", si):
+        _wait_for_tasks(si, vc_tasks, cancellation_manager)
+    return [Task(vc_task) for vc_task in vc_tasks]
+
+
+def _wait_for_tasks(
+    si: SiHandler,
+    vc_tasks: list[vim.Task],
+    cancellation_manager: CancellationContextManager | None,
+) -> None:
+    pc = si.get_vc_obj().content.propertyCollector.CreatePropertyCollector()
+    try:
+        pc.CreateFilter(_get_tasks_filter_spec(vc_tasks), partialUpdates=True)
+        pending = {str(vc_task) for vc_task in vc_tasks}
+        options = vmodl.query.PropertyCollector.WaitOptions(
+            maxWaitSeconds=settings.TASK_WAIT_POLL_SECONDS
+        )
+        version = ""
+        while pending:
+            with cancellation_manager or nullcontext():
+                update = pc.WaitForUpdatesEx(version, options)
+            if update is None:
+                continue
+            version = update.version
+            for filter_set in update.filterSet:
+                for obj_set in filter_set.objectSet:
+                    if _is_finished(obj_set):
+                        pending.discard(str(obj_set.obj))
+    finally:
+        pc.DestroyPropertyCollector()
+
+
+def _get_tasks_filter_spec(
+    vc_tasks: list[vim.Task],
+) -> vmodl.query.PropertyCollector.FilterSpec:
+    pc_spec = vmodl.query.PropertyCollector
+    return pc_spec.FilterSpec(
+        objectSet=[pc_spec.ObjectSpec(obj=vc_task) for vc_task in vc_tasks],
+        propSet=[pc_spec.PropertySpec(type=vim.Task, pathSet=["info.state"])],
+    )
+
+
+def _is_finished(obj_set: vmodl.query.PropertyCollector.ObjectUpdate) -> bool:
+    return any(
+        change.name == "info.state" and change.val in _FINISHED_STATES
+        for change in obj_set.changeSet
+    )
@@ -0,0 +1,146 @@
+"""Process-wide samples of the cluster and datastore usage.
+
+Get Cluster Usage is called before placement decisions, often many times a minute.
+The usage of the VM cluster and the datastore is sampled in the background while
+it is requested, so the command returns the latest sample instead of querying
+the vCenter every time. The last samples are kept for trend queries.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections import deque
+from collections.abc import Callable
+from threading import Event, Lock, Thread
+from typing import Any
+
+from attrs import define, field
+
+from driver_helpers import settings
+from driver_helpers.si_pool import get_vcenter_key, si_pool
+
+from cloudshell.cp.vcenter.handlers.si_handler import SiHandler
+from cloudshell.cp.vcenter.resource_config import VCenterResourceConfig
+
+logger = logging.getLogger(__name__)
+
+
+@define
+class UsageSample:
+    usage: dict[str, Any]
+    timestamp: float = field(factory=time.time)
+
+    @property
+    def age(self) -> float:
+        return max(time.time() - self.timestamp, 0)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**self.usage, "timestamp": self.timestamp, "age": round(self.age, 1)}
+
+
+@define
+class UsageSampler:
+    """Samples the usage of one cluster and datastore.
+
+    The sampling thread runs while the usage is requested and uses a pooled
+    session.
+    """
+
+    _resource_conf: VCenterResourceConfig
+    _get_usage: Callable[[SiHandler], dict[str, Any]]
+    interval: float = settings.CLUSTER_USAGE_REFRESH_INTERVAL
+    max_idle_time: float = settings.CLUSTER_USAGE_MAX_IDLE_TIME
+    _samples: deque[UsageSample] = field(
+        init=False, factory=lambda: deque(maxlen=settings.CLUSTER_USAGE_HISTORY_SIZE)
+    )
+    _lock: Lock = field(init=False, factory=Lock)
+    _refresh_lock: Lock = field(init=False, factory=Lock)
+    _last_used: float = field(init=False, factory=time.monotonic)
+    _stop: Event | None = field(init=False, default=None)
+
+    def get(self, si: SiHandler, force_refresh: bool = False) -> UsageSample:
+        """The latest sample, refreshed if it's too old or forced."""
+        self._last_used = time.monotonic()
+        requested = time.time()
+        sample = self._latest()
+        if force_refresh or sample is None or sample.age > self.interval:
+            with self._refresh_lock:
+                # a refresh started after the request is good enough
+                sample = self._latest()
+                if sample is None or sample.timestamp < requested:
+                    sample = self._refresh(si)
+        self._start()
+        return sample
+
+    def history(self, count: int) -> list[UsageSample]:
+        with self._lock:
+            return list(self._samples)[-count:] if count > 0 else []
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._stop:
+                self._stop.set()
+                self._stop = None
+
+    def _latest(self) -> UsageSample | None:
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
+    def _refresh(self, si: SiHandler) -> UsageSample:
+        sample = UsageSample(self._get_usage(si))
+        with self._lock:
+            self._samples.append(sample)
+        return sample
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._stop or self.interval <= 0:
+                return
+            self._stop = stop = Event()
+        Thread(
+            target=self._sample, args=(stop,), name="usage-sampler", daemon=True
+        ).start()
+
+    def _sample(self, stop: Event) -> None:
+        while not stop.wait(self.interval):
+            if time.monotonic() - self._last_used > self.max_idle_time:
+                with self._lock:
+                    if self._stop is stop:
+                        self._stop = None
+                logger.debug("Usage isn't requested anymore, stop sampling")
+                return
+            try:
+                with self._refresh_lock, si_pool.session(self._resource_conf) as si:
+                    self._refresh(si)
+            except Exception:
+                logger.warning("Failed to sample the cluster usage", exc_info=True)
+
+
+@define
+class UsageSamplers:
+    """Usage samplers of every cluster and datastore shared by the commands."""
+
+    _lock: Lock = field(init=False, factory=Lock)
+    _samplers: dict[tuple, UsageSampler] = field(init=False, factory=dict)
+
+    def get(
+        self,
+        conf: VCenterResourceConfig,
+        datastore_name: str,
+        get_usage: Callable[[SiHandler], dict[str, Any]],
+    ) -> UsageSampler:
+        key = get_vcenter_key(conf, "usage", conf.vm_cluster, datastore_name)
+        with self._lock:
+            sampler = self._samplers.get(key)
+            if sampler is None:
+                sampler = self._samplers[key] = UsageSampler(conf, get_usage)
+        return sampler
+
+    def close(self) -> None:
+        with self._lock:
+            for sampler in self._samplers.values():
+                sampler.stop()
+            self._samplers.clear()
+
+
+usage_samplers = UsageSamplers()
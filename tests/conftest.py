@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# the driver is not installed, it's imported from the sources like on the
+# Execution Server
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
@@ -0,0 +1,80 @@
+from unittest.mock import Mock
+
+import pytest
+from pyVmomi import vim, vmodl
+
+from driver_helpers.flows import affinity_rules
+from driver_helpers.flows.affinity_rules import BatchAffinityRulesFlow
+
+from cloudshell.cp.vcenter.handlers.cluster_handler import ClusterHandler
+
+PC = vmodl.query.PropertyCollector
+
+
+def check_path(vim_type: type, path: str) -> None:
+    # vCenter checks the path against the declared property types
+    for name in path.split("."):
+        prop_types = {prop.name: prop.type for prop in vim_type._GetPropertyList()}
+        if name not in prop_types:
+            raise vmodl.query.InvalidProperty(name=path)
+        vim_type = prop_types[name]
+
+
+@pytest.fixture
+def vc_cluster():
+    return vim.ClusterComputeResource("domain-c1")
+
+
+@pytest.fixture
+def vc_rules():
+    vc_vm = vim.VirtualMachine("vm-1")
+    return [
+        vim.cluster.AffinityRuleSpec(name="web", enabled=True, vm=[vc_vm]),
+        vim.cluster.AntiAffinityRuleSpec(name="db", enabled=False, vm=[vc_vm]),
+    ]
+
+
+@pytest.fixture
+def si(vc_cluster, vc_rules):
+    def retrieve(filter_specs, options):
+        (filter_spec,) = filter_specs
+        (prop_spec,) = filter_spec.propSet
+        for path in prop_spec.pathSet:
+            check_path(prop_spec.type, path)
+        return PC.RetrieveResult(
+            objects=[
+                PC.ObjectContent(
+                    obj=vc_cluster,
+                    propSet=[
+                        vmodl.DynamicProperty(
+                            name=path, val=vim.cluster.RuleInfo.Array(vc_rules)
+                        )
+                        for path in prop_spec.pathSet
+                    ],
+                )
+            ]
+        )
+
+    si = Mock()
+    pc = si.get_vc_obj.return_value.content.propertyCollector
+    pc.RetrievePropertiesEx.side_effect = retrieve
+    return si
+
+
+@pytest.fixture
+def flow(si, monkeypatch):
+    # the inventory index connects to the vCenter in the background
+    monkeypatch.setattr(affinity_rules, "IndexedInventory", Mock())
+    return BatchAffinityRulesFlow(si, Mock(), "reservation id")
+
+
+def test_get_vc_rules(flow, si, vc_cluster, vc_rules):
+    rules = flow._get_vc_rules(ClusterHandler(vc_cluster, si))
+
+    assert rules == {"web": vc_rules[0], "db": vc_rules[1]}
+
+
+def test_new_rule_name_is_not_taken(flow):
+    taken = {"reservation id", "reservation id (1)"}
+
+    assert flow._get_new_rule_name(taken) == "reservation id (2)"